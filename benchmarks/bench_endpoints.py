@@ -0,0 +1,276 @@
+"""
+Latency, throughput and peak memory of every route on a generated catalog.
+
+The catalog is generated once into --database and copied for each run, so runs start from the same rows.
+Each route runs --iterations times in a row for latency and throughput, then a few more times under tracemalloc
+for peak memory. Results are written as JSON, --compare prints the change against an earlier results file.
+Run from the repository root:
+PYTHONPATH=src python benchmarks/bench_endpoints.py --database /tmp/books-1m.db --output results.json
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from common import make_bench_app, latency_summary, run_metadata, write_results, UNREACHABLE_IMAGE_URL
+from datagen import generate, BENCH_PASSWORD
+
+from db.database import db
+from models.book import Book
+from utilities.catalog_cache import catalog_cache
+from utilities.image_validation import image_validator
+
+BENCH_USER = 'user1@example.com'
+BENCH_USER_ID = 1
+
+
+class BookPool:
+    """Ids of books in a known state, each handed out once so mutating routes never repeat a book."""
+
+    def __init__(self, app, *conditions, size):
+        with app.app_context():
+            self.ids = list(db.session.execute(
+                db.select(Book.id).where(*conditions).order_by(Book.id).limit(size)).scalars())
+
+    def take(self):
+        if not self.ids:
+            raise RuntimeError("Book pool ran out, generate a bigger catalog or run fewer iterations")
+        return self.ids.pop()
+
+
+class Scenario:
+    """One measured route. prepare(number) runs untimed and returns method, url and request keyword arguments."""
+
+    def __init__(self, name, rule, prepare, status=200, iterations=None, client='user'):
+        self.name = name
+        self.rule = rule
+        self.prepare = prepare
+        self.status = status
+        self.iterations = iterations
+        self.client = client
+
+
+def log_in(client, email=BENCH_USER):
+    response = client.post('/user_api/login', json={'email': email, 'password': BENCH_PASSWORD})
+    assert response.status_code == 202, response.get_json()
+
+
+def build_scenarios(app, clients, iterations, heavy_iterations):
+    # Each lending scenario takes one book per measured and memory run
+    pool_size = (iterations + 10) * 8
+    foreign = BookPool(app, Book.active == True, Book.reserved == False,  # noqa: E712
+                       Book.owner_id != BENCH_USER_ID, size=pool_size)
+    own = BookPool(app, Book.active == True, Book.reserved == False,  # noqa: E712
+                   Book.owner_id == BENCH_USER_ID, size=pool_size)
+    user = clients['user']
+
+    def reserved_book():
+        book_id = foreign.take()
+        user.patch(f'/book_api/reserve_book/{book_id}')
+        return book_id
+
+    def received_book():
+        book_id = reserved_book()
+        user.patch(f'/book_api/receive_book/{book_id}')
+        return book_id
+
+    def fresh_client(number):
+        clients['other'] = app.test_client()
+        log_in(clients['other'], f'user{2 + number % 50}@example.com')
+        return 'POST', '/user_api/logout', {}
+
+    def uncached(url):
+        def prepare(number):
+            catalog_cache.clear()
+            return 'GET', url, {}
+        return prepare
+
+    return [
+        Scenario('fetch_books all', '/book_api/fetch_books', uncached('/book_api/fetch_books'),
+                 iterations=heavy_iterations),
+        Scenario('fetch_books page', '/book_api/fetch_books', uncached('/book_api/fetch_books?limit=50')),
+        Scenario('fetch_books page cached', '/book_api/fetch_books',
+                 lambda number: ('GET', '/book_api/fetch_books?limit=50', {})),
+        Scenario('fetch_books filtered page', '/book_api/fetch_books',
+                 uncached('/book_api/fetch_books?limit=50&reserved=false&active=true')),
+        Scenario('overdue page', '/book_api/overdue', lambda number: ('GET', '/book_api/overdue?limit=50', {})),
+        Scenario('export', '/book_api/export', lambda number: ('GET', '/book_api/export', {}),
+                 iterations=heavy_iterations),
+        Scenario('search', '/book_api/search', lambda number: ('GET', '/book_api/search?q=secret garden', {})),
+        Scenario('change_duration', '/user_api/change_duration/<int:user_id>',
+                 lambda number: ('PATCH', f'/user_api/change_duration/{BENCH_USER_ID}',
+                                 {'json': {'duration': 14 + number % 2}})),
+        Scenario('reserve_book', '/book_api/reserve_book/<int:book_id>',
+                 lambda number: ('PATCH', f'/book_api/reserve_book/{foreign.take()}', {})),
+        Scenario('cancel_reservation', '/book_api/cancel_reservation/<int:book_id>',
+                 lambda number: ('PATCH', f'/book_api/cancel_reservation/{reserved_book()}', {})),
+        Scenario('receive_book', '/book_api/receive_book/<int:book_id>',
+                 lambda number: ('PATCH', f'/book_api/receive_book/{reserved_book()}', {}), status=202),
+        Scenario('return_book', '/book_api/return_book/<int:book_id>',
+                 lambda number: ('PATCH', f'/book_api/return_book/{received_book()}', {})),
+        Scenario('activity', '/book_api/activity/<int:book_id>',
+                 lambda number: ('PATCH', f'/book_api/activity/{own.take()}', {})),
+        Scenario('batch_lending', '/book_api/batch_lending',
+                 lambda number: ('PATCH', '/book_api/batch_lending',
+                                 {'json': [{'bookId': foreign.take(), 'action': 'reserve'}
+                                           for _ in range(5)]})),
+        Scenario('remove_book', '/book_api/remove_book/<int:book_id>',
+                 lambda number: ('DELETE', f'/book_api/remove_book/{own.take()}', {})),
+        Scenario('add_new_book', '/book_api/add_new_book',
+                 lambda number: ('POST', '/book_api/add_new_book',
+                                 {'json': {'title': f'Benchmark Book {time.time_ns()}', 'author': 'Bench Author',
+                                           'imageUrl': UNREACHABLE_IMAGE_URL.format('new')}}), status=201),
+        Scenario('import_books', '/book_api/import_books',
+                 lambda number: ('POST', '/book_api/import_books',
+                                 {'json': [{'title': f'Imported Book {time.time_ns()} {row}',
+                                            'author': 'Bench Author', 'imageUrl': UNREACHABLE_IMAGE_URL.format(row)}
+                                           for row in range(100)]})),
+        Scenario('current_user', '/user_api/current_user', lambda number: ('GET', '/user_api/current_user', {})),
+        Scenario('my_books', '/user_api/my_books', lambda number: ('GET', '/user_api/my_books', {})),
+        Scenario('my_books page', '/user_api/my_books/<kind>',
+                 lambda number: ('GET', '/user_api/my_books/owned?limit=50', {})),
+        Scenario('register', '/user_api/register',
+                 lambda number: ('POST', '/user_api/register',
+                                 {'json': {'firstName': 'Bench', 'lastName': 'User', 'password': BENCH_PASSWORD,
+                                           'email': f'register{time.time_ns()}@example.com'}}),
+                 status=201, client='anonymous'),
+        Scenario('login', '/user_api/login',
+                 lambda number: ('POST', '/user_api/login', {'json': {'email': BENCH_USER,
+                                                                      'password': BENCH_PASSWORD}}),
+                 status=202, client='anonymous'),
+        Scenario('logout', '/user_api/logout', fresh_client, client='other'),
+        Scenario('metrics', '/metrics', lambda number: ('GET', '/metrics', {})),
+    ]
+
+
+def call(clients, scenario, number):
+    method, url, kwargs = scenario.prepare(number)
+    client = clients[scenario.client]
+    started = time.perf_counter()
+    response = client.open(url, method=method, **kwargs)
+    response.get_data()
+    elapsed = time.perf_counter() - started
+    return elapsed, response.status_code == scenario.status
+
+
+def measure(clients, scenario, iterations, memory_iterations):
+    latencies = []
+    errors = 0
+    for number in range(iterations):
+        elapsed, ok = call(clients, scenario, number)
+        latencies.append(elapsed)
+        errors += not ok
+
+    tracemalloc.start()
+    peak = 0
+    for number in range(memory_iterations):
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        call(clients, scenario, iterations + number)
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+    return {
+        "route": scenario.rule,
+        "iterations": iterations,
+        "errors": errors,
+        # Sequential requests on one client, untimed preparation left out
+        "requestsPerSecond": round(iterations / sum(latencies), 2),
+        **latency_summary(latencies),
+        "peakMemoryKiB": round(peak / 1024, 1),
+    }
+
+
+def prepare_database(path, users, books, seed):
+    """Generate the catalog into path unless it already holds one made with the same parameters."""
+    parameters = {"users": users, "books": books, "seed": seed}
+    description = f'{path}.json'
+    if os.path.exists(path) and os.path.exists(description):
+        with open(description) as file:
+            if json.load(file) == parameters:
+                return
+    for leftover in (path, f'{path}-wal', f'{path}-shm'):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+    app = make_bench_app(path)
+    elapsed = generate(app, users, books, seed)
+    with app.app_context():
+        db.engine.dispose()
+    print(f'Generated {users} users and {books} books in {elapsed:.1f} s', file=sys.stderr)
+    with open(description, 'w') as file:
+        json.dump(parameters, file)
+
+
+def compare(results, baseline_path, fail_over):
+    """Print p50 change per scenario against the baseline file, return True if any got slower than fail_over."""
+    with open(baseline_path) as file:
+        baseline = json.load(file)["scenarios"]
+    regressed = False
+    print(f"{'scenario':28} {'baseline p50':>13} {'p50':>10} {'change':>8}")
+    for name, result in results["scenarios"].items():
+        before = baseline.get(name, {}).get("p50Ms")
+        if not before or result["p50Ms"] is None:
+            print(f"{name:28} {'-':>13} {result['p50Ms']:>10}")
+            continue
+        change = result["p50Ms"] / before - 1
+        regressed = regressed or change > fail_over
+        print(f"{name:28} {before:>13} {result['p50Ms']:>10} {change:>+8.1%}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--books', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database', default=os.path.join(tempfile.gettempdir(), 'books-bench-catalog.db'),
+                        help='generated catalog, reused while users, books and seed stay the same')
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--heavy-iterations', type=int, default=3,
+                        help='iterations of routes that return the whole catalog')
+    parser.add_argument('--memory-iterations', type=int, default=2)
+    parser.add_argument('--only', nargs='*', help='run only these scenarios')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--compare', help='results file of an earlier run to compare with')
+    parser.add_argument('--fail-over', type=float, default=0.25,
+                        help='exit with 1 if a p50 latency grew more than this fraction against --compare')
+    args = parser.parse_args()
+
+    prepare_database(args.database, args.users, args.books, args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, 'bench.db')
+        shutil.copy(args.database, database)
+        app = make_bench_app(database)
+        clients = {'user': app.test_client(), 'anonymous': app.test_client()}
+        log_in(clients['user'])
+        scenarios = build_scenarios(app, clients, args.iterations, args.heavy_iterations)
+        measured = {rule.rule for rule in app.url_map.iter_rules() if rule.endpoint != 'static'}
+        missing = measured - {scenario.rule for scenario in scenarios}
+        if missing:
+            print(f'Routes without a scenario: {sorted(missing)}', file=sys.stderr)
+
+        results = {"metadata": run_metadata(users=args.users, books=args.books, seed=args.seed,
+                                            iterations=args.iterations), "scenarios": {}}
+        for scenario in scenarios:
+            if args.only and scenario.name not in args.only:
+                continue
+            result = measure(clients, scenario, scenario.iterations or args.iterations, args.memory_iterations)
+            results["scenarios"][scenario.name] = result
+            # Background image validation of added books must not slow down the next scenario
+            image_validator.wait()
+            print(json.dumps({"scenario": scenario.name, **result}))
+        image_validator.shutdown(wait_for_pending=False)
+        with app.app_context():
+            db.engine.dispose()
+
+    if args.output:
+        write_results(args.output, results)
+    if args.compare and compare(results, args.compare, args.fail_over):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
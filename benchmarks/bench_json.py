@@ -0,0 +1,108 @@
+"""
+Serialization cost of a whole-catalog fetch_books response: ORM instances against Core rows, stdlib against orjson.
+
+Each variant loads the books, builds the response dicts and encodes them, timed separately. Then the whole
+fetch_books request is timed with each JSON provider and the response cache cleared.
+Run from the repository root: PYTHONPATH=src python benchmarks/bench_json.py --books 100000
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from datetime import date
+
+from common import make_bench_app, run_metadata, write_results
+from datagen import generate
+
+from flask.json.provider import DefaultJSONProvider
+
+from db.database import db
+from models.book import Book, BOOK_ROW_COLUMNS, book_row_dict
+from utilities.catalog_cache import catalog_cache
+from utilities.json_provider import FastJSONProvider, orjson
+
+
+def load_orm(today):
+    books = db.session.execute(db.select(Book).order_by(Book.id)).scalars()
+    payload = [book.to_dict(today) for book in books]
+    db.session.expunge_all()
+    return payload
+
+
+def load_core(today):
+    rows = db.session.execute(db.select(*BOOK_ROW_COLUMNS).order_by(Book.id))
+    return [book_row_dict(row, today) for row in rows]
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def median_ms(values):
+    return round(statistics.median(values) * 1000, 1)
+
+
+def bench_variants(app, repeat):
+    today = date.today()
+    providers = {'stdlib': DefaultJSONProvider(app), 'fast': FastJSONProvider(app)}
+    results = {}
+    with app.app_context():
+        for loader_name, loader in (('orm', load_orm), ('core', load_core)):
+            for provider_name, provider in providers.items():
+                load_times, encode_times = [], []
+                for _ in range(repeat):
+                    payload, load_time = timed(loader, today)
+                    body, encode_time = timed(lambda: provider.response(payload).get_data())
+                    load_times.append(load_time)
+                    encode_times.append(encode_time)
+                results[f'{loader_name}+{provider_name}'] = {
+                    "loadMs": median_ms(load_times), "encodeMs": median_ms(encode_times),
+                    "totalMs": median_ms([a + b for a, b in zip(load_times, encode_times)]),
+                    "bytes": len(body)}
+    return results
+
+
+def bench_requests(app, repeat):
+    results = {}
+    client = app.test_client()
+    for name, provider in (('stdlib', DefaultJSONProvider(app)), ('fast', FastJSONProvider(app))):
+        app.json = provider
+        latencies = []
+        for _ in range(repeat):
+            catalog_cache.clear()
+            started = time.perf_counter()
+            response = client.get('/book_api/fetch_books')
+            response.get_data()
+            latencies.append(time.perf_counter() - started)
+        results[f'fetch_books {name}'] = {"p50Ms": median_ms(latencies), "status": response.status_code}
+    app.json = FastJSONProvider(app)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--books', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        app = make_bench_app(os.path.join(directory, 'json.db'))
+        generate(app, args.users, args.books)
+        results = {"metadata": run_metadata(users=args.users, books=args.books, repeat=args.repeat,
+                                            orjson=orjson.__version__ if orjson else None),
+                   "variants": bench_variants(app, args.repeat), "requests": bench_requests(app, args.repeat)}
+        with app.app_context():
+            db.engine.dispose()
+    print(json.dumps(results, indent=2))
+    if args.output:
+        write_results(args.output, results)
+
+
+if __name__ == '__main__':
+    main()
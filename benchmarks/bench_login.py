@@ -0,0 +1,105 @@
+"""
+Login throughput under concurrency, with password hashing inline and on the process pool.
+
+While the logins run, another thread polls fetch_books to show how much hashing slows down other requests.
+Run from the repository root: PYTHONPATH=src python benchmarks/bench_login.py
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from common import make_bench_app, percentile, write_results
+
+from werkzeug.security import generate_password_hash
+
+from constants import PASSWORD_HASH_METHOD
+from db.database import db
+from models.user import User
+from utilities.passwords import password_hasher
+
+
+def make_app(database_path):
+    app = make_bench_app(database_path)
+    with app.app_context():
+        password_hash = generate_password_hash('123456', method=PASSWORD_HASH_METHOD, salt_length=8)
+        db.session.add_all([User(first_name=f'User{number}', last_name='Bench', email=f'user{number}@example.com',
+                                 password=password_hash) for number in range(64)])
+        db.session.commit()
+    return app
+
+
+def run(app, workers, threads, logins_per_thread):
+    app.config['PASSWORD_HASH_WORKERS'] = workers
+    if workers:
+        with app.app_context():
+            password_hasher.run(workers, len, 'warm up the pool')
+    login_latencies = []
+    poll_latencies = []
+    done = threading.Event()
+
+    def log_in(number):
+        with app.test_client() as client:
+            for _ in range(logins_per_thread):
+                started = time.perf_counter()
+                response = client.post('/user_api/login', json={'email': f'user{number}@example.com',
+                                                                 'password': '123456'})
+                login_latencies.append(time.perf_counter() - started)
+                assert response.status_code == 202, response.json
+
+    def poll():
+        with app.test_client() as client:
+            while not done.is_set():
+                started = time.perf_counter()
+                client.get('/book_api/fetch_books?limit=10')
+                poll_latencies.append(time.perf_counter() - started)
+                time.sleep(0.005)
+
+    poller = threading.Thread(target=poll)
+    poller.start()
+    started = time.perf_counter()
+    login_threads = [threading.Thread(target=log_in, args=(number,)) for number in range(threads)]
+    for thread in login_threads:
+        thread.start()
+    for thread in login_threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    poller.join()
+    password_hasher.shutdown()
+    return {
+        "hashWorkers": workers,
+        "threads": threads,
+        "logins": len(login_latencies),
+        "loginsPerSecond": round(len(login_latencies) / elapsed, 2),
+        "loginP50Ms": round(statistics.median(login_latencies) * 1000, 1),
+        "loginP95Ms": round(percentile(login_latencies, 0.95) * 1000, 1),
+        "pollP50Ms": round(statistics.median(poll_latencies) * 1000, 2) if poll_latencies else None,
+        "pollP95Ms": round(percentile(poll_latencies, 0.95) * 1000, 2) if poll_latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--threads', type=int, default=8, help='concurrent login threads')
+    parser.add_argument('--logins', type=int, default=4, help='logins per thread')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='hashing pool processes')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        app = make_app(os.path.join(directory, 'bench.db'))
+        results = [run(app, workers, args.threads, args.logins) for workers in (0, args.workers)]
+        with app.app_context():
+            db.engine.dispose()
+    for result in results:
+        print(json.dumps(result))
+    if args.output:
+        write_results(args.output, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Shared setup of the benchmarks: application on a SQLite file, percentiles and result files.
+
+Import this module before anything from src, it points the test logger to a temporary file.
+"""
+import json
+import os
+import platform
+import subprocess
+import tempfile
+from datetime import datetime, timezone
+
+os.environ.setdefault('LOGGER_TEST', os.path.join(tempfile.gettempdir(), 'books-bench.log'))
+
+from configuration.config import TestConfig  # noqa: E402
+from constants import PASSWORD_HASH_METHOD  # noqa: E402
+from main import create_app  # noqa: E402
+
+# Nothing listens on the discard port, image validation fails fast without leaving the machine
+UNREACHABLE_IMAGE_URL = 'http://127.0.0.1:9/covers/{}.jpg'
+
+
+def make_bench_app(database_path, **settings):
+    """Production-like app on a SQLite file: real password hashing, image validation in the background."""
+    config_class = type('BenchConfig', (TestConfig,), {
+        'TESTING': False,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database_path}',
+        'PASSWORD_HASH_METHOD': PASSWORD_HASH_METHOD,
+        'IMAGE_VALIDATION_SYNC': False,
+        **settings,
+    })
+    return create_app(config_class=config_class)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def latency_summary(latencies):
+    """Latency percentiles and mean of a list of seconds, in milliseconds."""
+    if not latencies:
+        return {"p50Ms": None, "p95Ms": None, "p99Ms": None, "meanMs": None}
+    return {
+        "p50Ms": round(percentile(latencies, 0.5) * 1000, 2),
+        "p95Ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99Ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "meanMs": round(sum(latencies) / len(latencies) * 1000, 2),
+    }
+
+
+def run_metadata(**parameters):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "startedAt": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        **parameters,
+    }
+
+
+def write_results(path, results):
+    with open(path, 'w') as file:
+        json.dump(results, file, indent=2)
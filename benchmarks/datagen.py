@@ -0,0 +1,132 @@
+"""
+Seeded synthetic catalog: users and books in every lending state.
+
+The same seed and sizes always produce the same rows. Rows go in with executemany Core inserts in batches, so
+a million books take minutes, not hours. Run from the repository root to build a database file once:
+PYTHONPATH=src python benchmarks/datagen.py --users 10000 --books 1000000 --database /tmp/books-1m.db
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from common import make_bench_app, UNREACHABLE_IMAGE_URL
+
+from werkzeug.security import generate_password_hash
+
+from constants import MIN_LEND_DURATION, MAX_LEND_DURATION, DEFAULT_LEND_DURATION
+from db.database import db
+from db.search import create_search_index, drop_search_index
+from models.book import Book
+from models.user import User
+from utilities.catalog_cache import bump_catalog_version
+
+BATCH_SIZE = 10000
+BENCH_PASSWORD = '123456'
+WORDS = ('rich', 'dad', 'poor', 'secret', 'garden', 'history', 'river', 'night', 'winter', 'kingdom', 'stone',
+         'shadow', 'light', 'ocean', 'forest', 'island', 'empire', 'journey', 'silent', 'golden', 'broken', 'last',
+         'city', 'dragon', 'code', 'mind', 'money', 'habit', 'war', 'peace', 'star', 'road', 'house', 'lost')
+FIRST_NAMES = ('Juhan', 'Priit', 'Toomas', 'Mari', 'Kadri', 'Liis', 'Andres', 'Kati', 'Jaan', 'Eva', 'Robert',
+               'Joanne', 'George', 'Agatha', 'Stephen', 'Ursula', 'Terry', 'Neil')
+LAST_NAMES = ('Viik', 'Kruus', 'Tamm', 'Saar', 'Mets', 'Kask', 'Kiyosaki', 'Rowling', 'Orwell', 'Christie',
+              'King', 'Le Guin', 'Pratchett', 'Gaiman', 'Kivirähk', 'Tammsaare')
+# Share of books in each state, the rest are available
+STATES = (('inactive', 0.05), ('reserved', 0.10), ('lent_out', 0.12), ('overdue', 0.03))
+
+
+def user_rows(count, password_hash, rng):
+    for number in range(1, count + 1):
+        yield {
+            'id': number,
+            'first_name': rng.choice(FIRST_NAMES),
+            'last_name': rng.choice(LAST_NAMES),
+            'email': f'user{number}@example.com',
+            'password': password_hash,
+            'duration': rng.choice((MIN_LEND_DURATION, DEFAULT_LEND_DURATION, MAX_LEND_DURATION)),
+        }
+
+
+def pick_state(rng):
+    draw = rng.random()
+    for state, share in STATES:
+        if draw < share:
+            return state
+        draw -= share
+    return 'available'
+
+
+def book_rows(count, users, today, rng):
+    for number in range(1, count + 1):
+        owner_id = rng.randint(1, users)
+        lender_id = rng.randint(1, users - 1)
+        if lender_id >= owner_id:
+            lender_id += 1
+        state = pick_state(rng)
+        row = {
+            'id': number,
+            'title': f"{' '.join(rng.sample(WORDS, 3)).title()} {number}",
+            'author': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            'description': ' '.join(rng.choices(WORDS, k=12)) if rng.random() < 0.3 else None,
+            'image_url': UNREACHABLE_IMAGE_URL.format(number),
+            'owner_id': owner_id,
+            'lender_id': None,
+            'return_date': None,
+            'reserved': False,
+            'lent_out': False,
+            'active': state != 'inactive',
+        }
+        if state in ('reserved', 'lent_out', 'overdue'):
+            row.update(lender_id=lender_id, reserved=True)
+        if state == 'lent_out':
+            row.update(lent_out=True, return_date=today + timedelta(days=rng.randint(1, MAX_LEND_DURATION)))
+        elif state == 'overdue':
+            row.update(lent_out=True, return_date=today - timedelta(days=rng.randint(1, 60)))
+        yield row
+
+
+def insert_batches(statement, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            db.session.execute(statement, batch)
+            batch = []
+    if batch:
+        db.session.execute(statement, batch)
+
+
+def generate(app, users, books, seed=42, today=None):
+    """Fill the empty database of app with users and books, return the number of seconds it took."""
+    if users < 2:
+        raise ValueError("At least two users are needed for lending states")
+    rng = random.Random(seed)
+    today = today or date.today()
+    started = time.perf_counter()
+    password_hash = generate_password_hash(BENCH_PASSWORD, method=app.config['PASSWORD_HASH_METHOD'],
+                                           salt_length=8)
+    with app.app_context():
+        # Filling the search index once at the end is much faster than a trigger per row
+        drop_search_index(db.session.connection())
+        insert_batches(User.__table__.insert(), user_rows(users, password_hash, rng))
+        insert_batches(Book.__table__.insert(), book_rows(books, users, today, rng))
+        create_search_index(db.session.connection())
+        bump_catalog_version()
+        db.session.commit()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--books', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database', required=True, help='SQLite file to create')
+    args = parser.parse_args()
+
+    app = make_bench_app(args.database)
+    elapsed = generate(app, args.users, args.books, args.seed)
+    print(f'Generated {args.users} users and {args.books} books in {elapsed:.1f} s')
+
+
+if __name__ == '__main__':
+    main()
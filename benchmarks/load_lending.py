@@ -0,0 +1,266 @@
+"""
+Concurrent load on the lending path: many users polling the catalog and competing for a few popular books.
+
+Every virtual user logs in once, then polls fetch_books or tries to reserve a popular book. A user who wins a
+reservation receives and returns it, or cancels it. The owner of the popular books sometimes takes a book back.
+The server runs in this process on a SQLite file, or pass --url and --database of an already running server,
+for example gunicorn, to size its workers.
+
+A trigger on the database records every change of the lending columns in commit order. From it the run checks:
+- double reservations: a reserved book handed to another lender without being released first
+- lost reservations: reserve responses with 200 that don't match a recorded reservation
+- lent out books without a lender, and lent out books that aren't reserved
+Run from the repository root: PYTHONPATH=src python benchmarks/load_lending.py --users 32 --seconds 30
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+
+from common import make_bench_app, latency_summary, run_metadata, write_results
+from datagen import generate, BENCH_PASSWORD
+
+import requests
+from sqlalchemy import create_engine, event, text
+from werkzeug.serving import make_server
+
+from db.database import db
+from utilities.image_validation import image_validator
+
+OWNER_ID = 1
+AUDIT_STATEMENTS = (
+    """CREATE TABLE IF NOT EXISTS lending_audit (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT, book_id INTEGER NOT NULL,
+        old_reserved BOOLEAN, new_reserved BOOLEAN, old_lender_id INTEGER, new_lender_id INTEGER,
+        new_lent_out BOOLEAN)""",
+    "DELETE FROM lending_audit",
+    """CREATE TRIGGER IF NOT EXISTS lending_audit_update AFTER UPDATE OF reserved, lender_id, lent_out ON books
+    BEGIN
+        INSERT INTO lending_audit (book_id, old_reserved, new_reserved, old_lender_id, new_lender_id, new_lent_out)
+        VALUES (new.id, old.reserved, new.reserved, old.lender_id, new.lender_id, new.lent_out);
+    END""",
+)
+WRITE_PREFIXES = ('UPDATE', 'INSERT', 'DELETE')
+
+
+class LockWatch:
+    """
+    Time spent in write statements of an in-process server, and 'database is locked' errors.
+
+    SQLite waits for the write lock inside the first write statement of a transaction, so slow writes are lock waits.
+    """
+
+    def __init__(self, engine):
+        self.lock = threading.Lock()
+        self.write_seconds = []
+        self.locked_errors = 0
+        event.listen(engine, 'before_cursor_execute', self._before)
+        event.listen(engine, 'after_cursor_execute', self._after)
+        event.listen(engine, 'handle_error', self._error)
+        self.commit_started = threading.local()
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info['load_started'] = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(WRITE_PREFIXES):
+            self._record(time.perf_counter() - conn.info['load_started'])
+
+    def _error(self, context):
+        if 'database is locked' in str(context.original_exception):
+            with self.lock:
+                self.locked_errors += 1
+
+    def _record(self, seconds):
+        with self.lock:
+            self.write_seconds.append(seconds)
+
+    def summary(self):
+        with self.lock:
+            writes = list(self.write_seconds)
+            return {"lockedErrors": self.locked_errors, "writes": len(writes),
+                    "writesOver10Ms": sum(seconds > 0.01 for seconds in writes),
+                    "writeWaitMsTotal": round(sum(writes) * 1000, 1),
+                    "write": latency_summary(writes)}
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.reserved = Counter()
+
+    def request(self, session, operation, method, url, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = session.request(method, url, timeout=30, **kwargs)
+            status = response.status_code
+        except requests.RequestException:
+            status = 'connection error'
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.latencies[operation].append(elapsed)
+            self.statuses[operation][status] += 1
+        return status
+
+    def summary(self, seconds):
+        operations = {}
+        total = errors = 0
+        for operation, latencies in sorted(self.latencies.items()):
+            statuses = self.statuses[operation]
+            failed = sum(count for status, count in statuses.items() if status == 'connection error' or status >= 500)
+            total += len(latencies)
+            errors += failed
+            operations[operation] = {"count": len(latencies), "statuses": {str(status): count for status, count
+                                                                           in sorted(statuses.items(), key=str)},
+                                     "errorRate": round(failed / len(latencies), 4), **latency_summary(latencies)}
+        return {"requests": total, "requestsPerSecond": round(total / seconds, 1),
+                "errorRate": round(errors / total, 4) if total else 0.0, "operations": operations}
+
+
+def virtual_user(base_url, email, popular, recorder, stop, rng, poll_share):
+    session = requests.Session()
+    if recorder.request(session, 'login', 'POST', f'{base_url}/user_api/login',
+                        json={'email': email, 'password': BENCH_PASSWORD}) != 202:
+        return
+    while not stop.is_set():
+        if rng.random() < poll_share:
+            recorder.request(session, 'fetch_books', 'GET', f'{base_url}/book_api/fetch_books?limit=20')
+            continue
+        book_id = rng.choice(popular)
+        if recorder.request(session, 'reserve_book', 'PATCH', f'{base_url}/book_api/reserve_book/{book_id}') != 200:
+            continue
+        with recorder.lock:
+            recorder.reserved[book_id] += 1
+        if rng.random() < 0.2:
+            recorder.request(session, 'cancel_reservation', 'PATCH',
+                             f'{base_url}/book_api/cancel_reservation/{book_id}')
+            continue
+        if recorder.request(session, 'receive_book', 'PATCH', f'{base_url}/book_api/receive_book/{book_id}') == 202:
+            time.sleep(rng.uniform(0, 0.02))
+            recorder.request(session, 'return_book', 'PATCH', f'{base_url}/book_api/return_book/{book_id}')
+
+
+def owner(base_url, popular, recorder, stop, rng):
+    """The owner takes a random popular book back now and then, racing with its lender."""
+    session = requests.Session()
+    recorder.request(session, 'login', 'POST', f'{base_url}/user_api/login',
+                     json={'email': f'user{OWNER_ID}@example.com', 'password': BENCH_PASSWORD})
+    while not stop.wait(0.05):
+        recorder.request(session, 'owner_return_book', 'PATCH',
+                         f'{base_url}/book_api/return_book/{rng.choice(popular)}')
+
+
+def install_audit(engine, popular):
+    """Make the popular books free and owned by OWNER_ID, and start recording lending changes."""
+    with engine.begin() as connection:
+        connection.execute(text(
+            "UPDATE books SET owner_id = :owner, reserved = 0, lent_out = 0, lender_id = NULL, return_date = NULL, "
+            "active = 1 WHERE id IN ({})".format(', '.join(str(book_id) for book_id in popular))),
+            {'owner': OWNER_ID})
+        for statement in AUDIT_STATEMENTS:
+            connection.execute(text(statement))
+
+
+def check_invariants(engine, recorder):
+    with engine.begin() as connection:
+        double_reservations = connection.execute(text(
+            "SELECT count(*) FROM lending_audit WHERE old_reserved = 1 AND new_reserved = 1 "
+            "AND old_lender_id IS NOT NULL AND new_lender_id IS NOT old_lender_id")).scalar()
+        recorded = dict(connection.execute(text(
+            "SELECT book_id, count(*) FROM lending_audit WHERE old_reserved = 0 AND new_reserved = 1 "
+            "GROUP BY book_id")).all())
+        lent_without_lender = connection.execute(text(
+            "SELECT count(*) FROM lending_audit WHERE new_lent_out = 1 AND new_lender_id IS NULL")).scalar()
+        lent_not_reserved = connection.execute(text(
+            "SELECT count(*) FROM lending_audit WHERE new_lent_out = 1 AND new_reserved = 0")).scalar()
+        connection.execute(text("DROP TRIGGER IF EXISTS lending_audit_update"))
+    lost = sum(abs(recorder.reserved[book_id] - recorded.get(book_id, 0))
+               for book_id in set(recorder.reserved) | set(recorded))
+    return {"doubleReservations": double_reservations, "lostReservations": lost,
+            "lentOutWithoutLender": lent_without_lender, "lentOutNotReserved": lent_not_reserved}
+
+
+def run(base_url, engine, args, lock_watch=None):
+    rng = random.Random(args.seed)
+    popular = rng.sample(range(1, args.books + 1), args.popular)
+    install_audit(engine, popular)
+    recorder = Recorder()
+    stop = threading.Event()
+    threads = [threading.Thread(target=virtual_user, args=(base_url, f'user{number}@example.com', popular,
+                                                           recorder, stop, random.Random(args.seed + number),
+                                                           args.poll_share))
+               for number in range(OWNER_ID + 1, args.users + OWNER_ID + 1)]
+    threads.append(threading.Thread(target=owner, args=(base_url, popular, recorder, stop, random.Random(args.seed))))
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return {
+        "metadata": run_metadata(users=args.users, popularBooks=args.popular, seconds=args.seconds,
+                                 pollShare=args.poll_share, url=args.url),
+        **recorder.summary(elapsed),
+        "lockWaits": lock_watch.summary() if lock_watch else None,
+        "invariants": check_invariants(engine, recorder),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=32, help='concurrent virtual users')
+    parser.add_argument('--books', type=int, default=1000, help='catalog size of the generated database')
+    parser.add_argument('--popular', type=int, default=5, help='books everybody competes for')
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--poll-share', type=float, default=0.5, help='share of actions that poll fetch_books')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--url', help='base url of a running server instead of one in this process')
+    parser.add_argument('--database', help='SQLite file of the server at --url, generated with datagen.py')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    if args.url:
+        if not args.database:
+            parser.error('--url needs --database of that server to check the invariants')
+        engine = create_engine(f'sqlite:///{args.database}', connect_args={'timeout': 30})
+        results = run(args.url.rstrip('/'), engine, args)
+        engine.dispose()
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            app = make_bench_app(os.path.join(directory, 'load.db'))
+            generate(app, args.users + OWNER_ID, args.books, args.seed)
+            with app.app_context():
+                engine = db.engine
+            lock_watch = LockWatch(engine)
+            logging.getLogger('werkzeug').setLevel(logging.WARNING)
+            server = make_server('127.0.0.1', 0, app, threaded=True)
+            server_thread = threading.Thread(target=server.serve_forever)
+            server_thread.start()
+            try:
+                results = run(f'http://127.0.0.1:{server.server_port}', engine, args, lock_watch)
+            finally:
+                server.shutdown()
+                server_thread.join()
+                image_validator.shutdown(wait_for_pending=False)
+                engine.dispose()
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        write_results(args.output, results)
+    if any(results["invariants"].values()):
+        print('Lending invariants were violated', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,24 +1,176 @@
-from datetime import datetime, timedelta
+import csv
+from datetime import date
 
-from flask import request, jsonify
+from flask import request, jsonify, current_app, Response, stream_with_context
 from flask_login import login_required, current_user, logout_user, login_user
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload, joinedload
 
-from constants import MIN_LEND_DURATION, MAX_LEND_DURATION
+from constants import (MIN_LEND_DURATION, MAX_LEND_DURATION, EXPORT_BATCH_SIZE, VALIDATION_PENDING, IMPORT_MAX_ROWS,
+                       BATCH_MAX_OPERATIONS)
 from models import user
 from db.database import db
 from models.user import User
-from models.book import Book
+from models.book import Book, BOOK_ROW_COLUMNS, book_row_dict
 from auth.routes import user_blueprint, book_blueprint
-from utilities.service import validate_image_url
+from utilities.service import is_well_formed_url
+from utilities.image_validation import image_validator
+from utilities.passwords import hash_password, verify_password, needs_rehash, hash_method
+from utilities import lending, book_import
+from utilities.lending import LendingError
+from utilities.pagination import (encode_cursor, decode_cursor, parse_limit, parse_offset, parse_book_filters,
+                                  parse_book_filter_values, filter_clauses, parse_id, is_paginated)
+from utilities.catalog_snapshot import ready_snapshot
+from db.search import search_books_query, search_terms
+from utilities.catalog_cache import bump_catalog_version, current_catalog_version, make_etag, catalog_cache
+from utilities.compression import negotiate_encoding, encoded_etag, worth_compressing, compress, set_encoded_body
 from logger.logger_config import logger
 
 
 @book_blueprint.route('/fetch_books')
 def get_all_the_books():
-    books = Book.query.all()
-    book_list = [book.to_dict() for book in books]
-    return jsonify(book_list), 200
+    """
+    Return books matching the query filters.
+
+    Without limit and cursor arguments the whole filtered list is returned as before.
+    With them the books are returned in pages ordered by id, "next" holds the cursor of the following page.
+    Responses are cached per catalog version and answered with 304 when the client's ETag is current.
+    Compressed bodies are cached next to the plain ones. Books come from the catalog snapshot when it is loaded.
+    """
+    today = date.today()
+    snapshot = ready_snapshot()
+    version = snapshot.version if snapshot else current_catalog_version()
+    cache_key = (today.isoformat(), tuple(sorted(request.args.items(multi=True))))
+    etag = make_etag(version, *cache_key)
+    encoding = negotiate_encoding()
+    body = catalog_cache.get(version, cache_key)
+    sent_encoded = bool(encoding) and request.if_none_match.contains(encoded_etag(etag, encoding))
+    if sent_encoded or request.if_none_match.contains(etag):
+        # Announce the validator the 200 response would carry, plain when the body is too small to compress
+        compressed = worth_compressing(len(body)) if encoding and body is not None else sent_encoded
+        response = Response(status=304)
+        response.set_etag(encoded_etag(etag, encoding) if compressed else etag)
+        response.vary.add('Accept-Encoding')
+        return response
+
+    if body is None:
+        try:
+            filters = parse_book_filter_values(request.args)
+            if snapshot:
+                # The snapshot may have caught up since the version was read
+                version, payload = snapshot_books(snapshot, request.args, today, filters)
+                etag = make_etag(version, *cache_key)
+            else:
+                payload = paginated_books(request.args, filter_clauses(filters), today)
+        except ValueError as e:
+            return jsonify({"message": str(e)}), 400
+        body = current_app.json.response(payload).get_data()
+        catalog_cache.set(version, cache_key, body)
+    response = Response(body, status=200, mimetype=current_app.json.mimetype)
+    response.set_etag(etag)
+    if encoding and worth_compressing(len(body)):
+        # Compressed once per catalog version, repeated downloads only copy the cached bytes
+        compressed_key = (cache_key, encoding)
+        compressed = catalog_cache.get(version, compressed_key)
+        if compressed is None:
+            compressed = compress(body, encoding)
+            catalog_cache.set(version, compressed_key, compressed)
+        set_encoded_body(response, compressed, encoding)
+    return response
+
+
+def paginated_books(args, filters, today):
+    """
+    Return books matching filters, as a list or, if the args ask for a page, as a page with the next cursor.
+
+    Raise ValueError on wrong pagination arguments.
+    """
+    if not is_paginated(args):
+        rows = db.session.execute(db.select(*BOOK_ROW_COLUMNS).where(*filters).order_by(Book.id))
+        return [book_row_dict(row, today) for row in rows]
+    limit = parse_limit(args.get('limit'))
+    cursor = args.get('cursor')
+    after_id = decode_cursor(cursor) if cursor else 0
+
+    query = db.select(*BOOK_ROW_COLUMNS).where(Book.id > after_id, *filters).order_by(Book.id).limit(limit + 1)
+    rows = db.session.execute(query).all()
+    next_cursor = encode_cursor(rows[limit - 1].id) if len(rows) > limit else None
+    return {"data": [book_row_dict(row, today) for row in rows[:limit]], "next": next_cursor}
+
+
+def snapshot_books(snapshot, args, today, filters, where=None):
+    """
+    Return (version, books) like paginated_books() from the catalog snapshot, without SQL.
+
+    filters are column values as returned by parse_book_filter_values(), where an optional function of a record.
+    """
+    if not is_paginated(args):
+        version, records = snapshot.select(filters, where)
+        return version, [record.to_dict(today) for record in records]
+    limit = parse_limit(args.get('limit'))
+    cursor = args.get('cursor')
+    after_id = decode_cursor(cursor) if cursor else 0
+    version, records = snapshot.select(filters, where, after_id=after_id, limit=limit + 1)
+    next_cursor = encode_cursor(records[limit - 1].id) if len(records) > limit else None
+    return version, {"data": [record.to_dict(today) for record in records[:limit]], "next": next_cursor}
+
+
+@book_blueprint.route('/overdue')
+def get_overdue_books():
+    """Return books lent out past their return date, optionally only books of owner_id. Paginated like fetch_books."""
+    owner_id = request.args.get('owner_id')
+    today = date.today()
+    filters = {}
+    try:
+        if owner_id is not None:
+            filters['owner_id'] = parse_id('owner_id', owner_id)
+        snapshot = ready_snapshot()
+        if snapshot:
+            _, payload = snapshot_books(snapshot, request.args, today, dict(filters, lent_out=True),
+                                        lambda record: record.return_date is not None and record.return_date < today)
+            return jsonify(payload), 200
+        return jsonify(paginated_books(request.args, [Book.overdue_clause(today), *filter_clauses(filters)],
+                                       today)), 200
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+
+@book_blueprint.route('/export')
+def export_books():
+    """Stream books matching the query filters as newline-delimited JSON, one Book.to_dict() per line."""
+    try:
+        filters = parse_book_filters(request.args)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    query = (db.select(*BOOK_ROW_COLUMNS).where(*filters).order_by(Book.id)
+             .execution_options(yield_per=EXPORT_BATCH_SIZE))
+
+    def generate():
+        dumps = current_app.json.dumps
+        today = date.today()
+        for rows in db.session.execute(query).partitions():
+            yield ''.join(f"{dumps(book_row_dict(row, today))}\n" for row in rows)
+
+    return Response(stream_with_context(generate()), status=200, mimetype='application/x-ndjson')
+
+
+@book_blueprint.route('/search')
+def search_books():
+    """Return books matching the q argument by title, author or description, best matches first."""
+    query = request.args.get('q', '').strip()
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        offset = parse_offset(request.args.get('offset'))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    if not search_terms(query):
+        return jsonify({"message": "Search query is missing"}), 400
+
+    statement = search_books_query(db.session.connection(), query).limit(limit + 1).offset(offset)
+    books = db.session.execute(statement).scalars().all()
+    next_offset = offset + limit if len(books) > limit else None
+    today = date.today()
+    return jsonify({"data": [book.to_dict(today) for book in books[:limit]], "next": next_offset}), 200
 
 
 @user_blueprint.route('/change_duration/<int:user_id>', methods=['PATCH'])
@@ -40,8 +192,8 @@ def change_duration(user_id):
         return jsonify({"message": f"Wrong duration format or value: {duration}"}), 400
     user.duration = duration
     db.session.commit()
-    logger.info(f"User id: {user_id} changed successfully his lending"
-                f" period from {previous_duration} days to {duration} days")
+    logger.info("User id: %s changed successfully his lending period from %s days to %s days",
+                user_id, previous_duration, duration)
     return jsonify({"message": f"Successfully changed user id: {user_id} book lending duration to {duration}"}), 200
 
 
@@ -56,15 +208,15 @@ def return_book(book_id):
     :param book_id: Book id
     :return: redirect to home page.
     """
-    book = db.get_or_404(Book, book_id)
-    if current_user.id not in (book.owner_id, book.lender_id):
-        return jsonify({"message": f"Unauthorized to return book id {book_id}"}), 401
-    book.return_date = None
-    book.reserved = False
-    book.lender_id = None
-    book.lent_out = False
+    try:
+        book = lending.return_book(book_id, current_user.id)
+    except LendingError as e:
+        logger.info(e.message)
+        return jsonify({"message": e.message}), e.status
+    bump_catalog_version(book.id)
     db.session.commit()
-    logger.info(f"User id: {current_user.id} returned book {book.title} (id: {book.id}) successfully to it's owner")
+    logger.info("User id: %s returned book %s (id: %s) successfully to it's owner",
+                current_user.id, book.title, book.id)
     return jsonify({"message": f"Book id {book_id} returned successfully"}), 200
 
 
@@ -72,17 +224,18 @@ def return_book(book_id):
 @login_required
 def book_activity_toggle(book_id):
     """Activate or deactivate your own book for lending out."""
-    book = db.get_or_404(Book, book_id)
-    if book.owner_id != current_user.id:
-        return jsonify({"msg": f"Current user id: {current_user.id} cannot change book id {book.id} activity toggle."
-                               f"Book owner id: {book.owner_id}"}), 401
-    if not book.lent_out:
-        book.active = not book.active
-        db.session.commit()
-        logger.info(f"(Book id: {book.id}) activity set to {book.active}")
-        return jsonify({"message": f"Book availability: {book.active}",
-                        "data": book.active}), 200
-    return jsonify(success=False, error="Unable to switch book activity toggle."), 400
+    try:
+        book = lending.toggle_activity(book_id, current_user.id)
+    except LendingError as e:
+        logger.info(e.message)
+        if e.status == 400:
+            return jsonify(success=False, error=e.message), 400
+        return jsonify({"msg": e.message}), e.status
+    bump_catalog_version(book_id)
+    db.session.commit()
+    logger.info("(Book id: %s) activity set to %s", book.id, book.active)
+    return jsonify({"message": f"Book availability: {book.active}",
+                    "data": book.active}), 200
 
 
 @book_blueprint.route('/reserve_book/<int:book_id>', methods=['PATCH'])
@@ -94,45 +247,36 @@ def reserve_book(book_id):
     :param book_id: Book.id
     :return: redirect to home page
     """
-    book = db.get_or_404(Book, book_id)
-    if not book:
-        return jsonify({"message": f"Cannot find the book by id: {book_id}"}), 400
-    if book.owner_id == current_user.id:
-        return jsonify({"message": "Book owner cannot reserve own book"}), 400
-    if not book.reserved:
-        book.reserved = True
-        book.lender_id = current_user.id
-        db.session.commit()
-        response_data = {
-            "id": book.id,
-            "lenderId": current_user.id
-        }
-        logger.info(f"Current user id: {current_user.id} reserved book id: {book.id} successfully")
-        return jsonify({"message": f"Book id: {book_id} reserved successfully to lender id: {current_user.id}",
-                        "data": response_data}), 200
-    logger.info(f"Failed to reserve book {book_id}")
-    return jsonify({"message": f"Failed to reserve book {book_id}"}), 400
+    try:
+        book = lending.reserve(book_id, current_user.id)
+    except LendingError as e:
+        logger.info(e.message)
+        return jsonify({"message": e.message}), e.status
+    bump_catalog_version(book_id)
+    db.session.commit()
+    response_data = {
+        "id": book.id,
+        "lenderId": book.lender_id
+    }
+    logger.info("Current user id: %s reserved book id: %s successfully", current_user.id, book.id)
+    return jsonify({"message": f"Book id: {book_id} reserved successfully to lender id: {book.lender_id}",
+                    "data": response_data}), 200
 
 
 @book_blueprint.route('/cancel_reservation/<int:book_id>', methods=['PATCH'])
 @login_required
 def cancel_reservation(book_id):
     """Validate that current user is book lender or book owner and cancel the reservation."""
-    book = db.get_or_404(Book, book_id)
-    message = f"Failed to cancel book id {book_id} reservation"
-    if not book.reserved:
-        message = f"Cannot cancel reservation Book id: {book_id} Book wasn't reserved"
-        logger.error(message)
-        return jsonify({"msg": message}), 400
-    if book.reserved and (book.owner_id == current_user.id or book.book_lender.id == current_user.id):
-        book.reserved = False
-        book.book_lender = None
-        db.session.commit()
-        message = f"Successfully cancelled book id {book_id} reservation"
-        logger.info(message)
-        return jsonify({"message": message}), 200
-    logger.error(message)
-    return jsonify({"message": message}), 401
+    try:
+        lending.cancel_reservation(book_id, current_user.id)
+    except LendingError as e:
+        logger.error(e.message)
+        return jsonify({"message": e.message}), e.status
+    bump_catalog_version(book_id)
+    db.session.commit()
+    message = f"Successfully cancelled book id {book_id} reservation"
+    logger.info(message)
+    return jsonify({"message": message}), 200
 
 
 @book_blueprint.route('/receive_book/<int:book_id>', methods=['PATCH'])
@@ -144,24 +288,47 @@ def receive_book(book_id):
     :param book_id: Book.id
     :return: redirect to my_reserved_books page
     """
-    book = db.get_or_404(Book, book_id)
+    try:
+        book = lending.receive(book_id, current_user.id, date.today())
+    except LendingError as e:
+        logger.info(e.message)
+        return jsonify({"message": e.message}), e.status
+    bump_catalog_version(book_id)
+    db.session.commit()
     message = f"Book id {book_id} received successfully"
-    if not book.lent_out:
-        if current_user in (book.book_owner, book.book_lender):
-            current_date = datetime.now().date()
-            book_owner = db.get_or_404(User, book.owner_id)
-            return_date = current_date + timedelta(days=book_owner.duration)
-            book.return_date = return_date
-            book.lent_out = True
-            db.session.commit()
-            logger.info(message)
-            return jsonify({"message": message, "returnDate": return_date.strftime("%d-%m-%Y")}), 202
-        message = f"Unauthorized to receive book id {book_id}"
-        logger.info(message)
-        return jsonify({"message": message}), 401
-    message = f"Book id {book_id} is already lent out"
     logger.info(message)
-    return jsonify({"message": message}), 400
+    return jsonify({"message": message, "returnDate": book.return_date.strftime("%d-%m-%Y")}), 202
+
+
+@book_blueprint.route('/batch_lending', methods=['PATCH'])
+@login_required
+def batch_lending():
+    """
+    Apply a list of {bookId, action} lending operations in one transaction and report the result of each.
+
+    Actions are reserve, cancel, receive, return and activity.
+    """
+    data = request.get_json(silent=True)
+    operations = data.get('operations') if isinstance(data, dict) else data
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"message": "Expected a list of operations"}), 400
+    if len(operations) > BATCH_MAX_OPERATIONS:
+        return jsonify({"message": f"Batch is limited to {BATCH_MAX_OPERATIONS} operations"}), 400
+    parsed = []
+    for operation in operations:
+        book_id = operation.get('bookId') if isinstance(operation, dict) else None
+        action = operation.get('action') if isinstance(operation, dict) else None
+        if not isinstance(book_id, int) or action not in lending.ACTIONS:
+            return jsonify({"message": f"Wrong operation: {operation}"}), 400
+        parsed.append((book_id, action))
+
+    results, applied = lending.apply_batch(parsed, current_user.id, date.today())
+    if applied:
+        bump_catalog_version(*{result["bookId"] for result in results if result["status"] == 200})
+    db.session.commit()
+    msg = f"Applied {applied} of {len(parsed)} lending operations"
+    logger.info("User id: %s %s", current_user.id, msg)
+    return jsonify({"message": msg, "data": results}), 200
 
 
 @book_blueprint.route('/remove_book/<int:book_id>', methods=['DELETE'])
@@ -179,6 +346,7 @@ def remove_book(book_id):
         logger.info(msg)
         return jsonify({"message": msg}), 400
     db.session.delete(book)
+    bump_catalog_version(book_id)
     db.session.commit()
     logger.info(msg)
     return jsonify({"message": msg}), 200
@@ -187,7 +355,11 @@ def remove_book(book_id):
 @book_blueprint.route('/add_new_book', methods=['POST'])
 @login_required
 def add_book():
-    """Create and add a new book to the database and lending environment."""
+    """
+    Create and add a new book to the database and lending environment.
+
+    The book is stored as pending validation and its image url is checked in the background.
+    """
     data = request.json
     title = data.get('title').title()
     author = data.get('author').title()
@@ -197,7 +369,7 @@ def add_book():
     if len(author) < 4:
         return jsonify({"msg": f"author value: {author} is too short."}), 400
 
-    if not validate_image_url(image_url):
+    if not is_well_formed_url(image_url):
         return jsonify({"msg": f"Book {title} image URL is invalid"}), 409
 
     existing_book = Book.query.filter(
@@ -216,14 +388,48 @@ def add_book():
                     lent_out=False,
                     owner_id=current_user.id,
                     active=True,
+                    validation_status=VALIDATION_PENDING,
                     description=description)
     db.session.add(new_book)
-    db.session.commit()
+    try:
+        db.session.flush()
+        bump_catalog_version(new_book.id)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        msg = f"Book {title} already exists in database"
+        logger.info(msg)
+        return jsonify({"msg": msg}), 409
+    image_validator.submit(current_app._get_current_object(), new_book.id, image_url)
     msg = f"New book: {title} added successfully."
     logger.info(msg)
     return jsonify({"message": msg, "data": new_book.to_dict()}), 201
 
 
+@book_blueprint.route('/import_books', methods=['POST'])
+@login_required
+def import_books():
+    """
+    Add many books of the current user at once from a JSON array or a CSV file.
+
+    Report the outcome of every row: created, duplicate or invalid. Image urls are validated in the background.
+    """
+    try:
+        rows = book_import.read_import_rows(request)
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        return jsonify({"msg": f"Reading import data failed: {e}"}), 400
+    if len(rows) > IMPORT_MAX_ROWS:
+        return jsonify({"msg": f"Import is limited to {IMPORT_MAX_ROWS} books, got {len(rows)}"}), 400
+
+    results, created = book_import.import_books(rows, current_user.id)
+    app = current_app._get_current_object()
+    for book_id, image_url in created:
+        image_validator.submit(app, book_id, image_url)
+    msg = f"Imported {len(created)} of {len(rows)} books."
+    logger.info("User id: %s %s", current_user.id, msg)
+    return jsonify({"message": msg, "data": results}), 200
+
+
 @user_blueprint.route('/current_user', methods=['GET'])
 def get_current_user():
     if current_user.is_authenticated:
@@ -231,6 +437,90 @@ def get_current_user():
     return jsonify({"authenticated": False}), 401
 
 
+MY_BOOK_KINDS = {
+    'owned': lambda user_id: {'owner_id': user_id},
+    'reserved': lambda user_id: {'lender_id': user_id, 'lent_out': False},
+    'borrowed': lambda user_id: {'lender_id': user_id, 'lent_out': True},
+}
+
+
+def my_book_dict(book, today):
+    """Book dict with the names of the owner and lender, whose users must already be loaded."""
+    result = book.to_dict(today)
+    result['ownerName'] = book.book_owner.first_name
+    result['lenderName'] = book.book_lender.first_name if book.book_lender else None
+    return result
+
+
+def my_record_dict(snapshot, record, today):
+    """my_book_dict() of a catalog snapshot record."""
+    result = record.to_dict(today)
+    result['ownerName'] = snapshot.user_name(record.owner_id)
+    result['lenderName'] = snapshot.user_name(record.lender_id)
+    return result
+
+
+@user_blueprint.route('/my_books', methods=['GET'])
+@login_required
+def get_my_books():
+    """
+    Return current user with owned, reserved and borrowed books.
+
+    The user and both book collections with the other party of each book are loaded in three queries,
+    or read from the catalog snapshot without queries.
+    """
+    snapshot = ready_snapshot()
+    if snapshot:
+        today = date.today()
+        _, owned = snapshot.select(MY_BOOK_KINDS['owned'](current_user.id))
+        _, lent = snapshot.select({'lender_id': current_user.id})
+        return jsonify({
+            "user": current_user.get_user_dict(),
+            "owned": [my_record_dict(snapshot, record, today) for record in owned],
+            "reserved": [my_record_dict(snapshot, record, today) for record in lent if not record.lent_out],
+            "borrowed": [my_record_dict(snapshot, record, today) for record in lent if record.lent_out],
+        }), 200
+    owner = db.session.execute(
+        db.select(User).where(User.id == current_user.id)
+        .options(selectinload(User.my_books).joinedload(Book.book_lender),
+                 selectinload(User.reserved_books).joinedload(Book.book_owner))
+        .execution_options(populate_existing=True)).scalar_one()
+    today = date.today()
+    return jsonify({
+        "user": owner.get_user_dict(),
+        "owned": [my_book_dict(book, today) for book in owner.my_books],
+        "reserved": [my_book_dict(book, today) for book in owner.reserved_books if not book.lent_out],
+        "borrowed": [my_book_dict(book, today) for book in owner.reserved_books if book.lent_out],
+    }), 200
+
+
+@user_blueprint.route('/my_books/<kind>', methods=['GET'])
+@login_required
+def get_my_books_page(kind):
+    """Return a page of the current user's owned, reserved or borrowed books, for users with many books."""
+    if kind not in MY_BOOK_KINDS:
+        return jsonify({"message": f"Unknown book list: {kind}"}), 404
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        cursor = request.args.get('cursor')
+        after_id = decode_cursor(cursor) if cursor else 0
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    today = date.today()
+    snapshot = ready_snapshot()
+    if snapshot:
+        _, records = snapshot.select(MY_BOOK_KINDS[kind](current_user.id), after_id=after_id, limit=limit + 1)
+        next_cursor = encode_cursor(records[limit - 1].id) if len(records) > limit else None
+        return jsonify({"data": [my_record_dict(snapshot, record, today) for record in records[:limit]],
+                        "next": next_cursor}), 200
+    other_party = Book.book_lender if kind == 'owned' else Book.book_owner
+    query = (db.select(Book).where(Book.id > after_id, *filter_clauses(MY_BOOK_KINDS[kind](current_user.id)))
+             .options(joinedload(other_party)).order_by(Book.id).limit(limit + 1))
+    books = db.session.execute(query).scalars().all()
+    next_cursor = encode_cursor(books[limit - 1].id) if len(books) > limit else None
+    return jsonify({"data": [my_book_dict(book, today) for book in books[:limit]], "next": next_cursor}), 200
+
+
 @user_blueprint.route('/register', methods=['POST'])
 def register():
     """
@@ -256,11 +546,7 @@ def register():
     new_user = User(first_name=first_name.title(),
                     last_name=last_name.title(),
                     email=email,
-                    password=generate_password_hash(
-                        password,
-                        method='pbkdf2:sha256',
-                        salt_length=8
-                    ))
+                    password=hash_password(password))
     db.session.add(new_user)
     db.session.commit()
     login_user(new_user)
@@ -287,11 +573,15 @@ def login():
         if not user:
             return jsonify({"message": "Please check your email"}), 401
 
-        if not check_password_hash(user.password, password):
+        if not verify_password(user.password, password):
             return jsonify({"message": "Please check your password"}), 401
+        if needs_rehash(user.password):
+            user.password = hash_password(password)
+            db.session.commit()
+            logger.info("User id: %s password hash upgraded to %s", user.id, hash_method())
 
         login_user(user)
-        logger.info(f"User id: {user.id} logged in successfully")
+        logger.info("User id: %s logged in successfully", user.id)
         return jsonify({"message": "Successfully logged in",
                         "id": user.id,
                         "name": user.first_name,
@@ -5,3 +5,11 @@ class TestConfig:
     LOGIN_DISABLED = False
     WTF_CSRF_ENABLED = False
     SECRET_KEY = "test-secret-key-test"
+    PASSWORD_HASH_METHOD = "pbkdf2:sha256:1000"
+    PASSWORD_HASH_WORKERS = 0
+    IMAGE_VALIDATION_TIMEOUT = 1
+    # In-memory test database is one connection shared by all threads
+    IMAGE_VALIDATION_SYNC = True
+    # Tests serve reads from SQL, tests of the snapshot turn it on with the catalog_snapshot fixture
+    CATALOG_SNAPSHOT = False
+    CATALOG_SNAPSHOT_SYNC = True
@@ -2,3 +2,51 @@ DEFAULT_LEND_DURATION = 28
 MIN_LEND_DURATION = 7
 MAX_LEND_DURATION = 92
 TIMEZONE = "Europe/Tallinn"
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+CATALOG_CACHE_SIZE = 64
+EXPORT_BATCH_SIZE = 1000
+VALIDATION_PENDING = "pending_validation"
+VALIDATION_VALID = "valid"
+VALIDATION_INVALID = "invalid"
+IMAGE_VALIDATION_WORKERS = 8
+IMAGE_VALIDATION_TIMEOUT = 5
+IMAGE_VALIDATION_SWEEP_INTERVAL = 5 * 60
+IMAGE_CACHE_SIZE = 10000
+IMAGE_CACHE_VALID_TTL = 24 * 60 * 60
+IMAGE_CACHE_INVALID_TTL = 10 * 60
+IMPORT_BATCH_SIZE = 1000
+IMPORT_MAX_ROWS = 100000
+BATCH_MAX_OPERATIONS = 500
+PASSWORD_HASH_METHOD = "pbkdf2:sha256:600000"
+PASSWORD_SALT_LENGTH = 8
+PASSWORD_HASH_WORKERS = 2
+USER_CACHE_SIZE = 10000
+USER_CACHE_TTL = 60
+USER_CACHE_REPORT_EVERY = 1000
+DB_POOL_SIZE = 10
+DB_MAX_OVERFLOW = 20
+DB_POOL_TIMEOUT = 30
+DB_POOL_RECYCLE = 30 * 60
+SQLITE_BUSY_TIMEOUT_MS = 5000
+SQLITE_MMAP_SIZE = 256 * 1024 * 1024
+SQLITE_CACHE_SIZE_KIB = 64 * 1024
+LOG_QUEUE_SIZE = 10000
+LOG_QUEUE_POLICY = "drop"
+LOG_QUEUE_BLOCK_TIMEOUT = 1
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+METRICS_SQL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SLOW_QUERY_THRESHOLD_MS = 200
+N_PLUS_ONE_THRESHOLD = 5
+QUERY_LOG_PARAMS_LENGTH = 500
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 5
+CATALOG_SNAPSHOT_REFRESH_INTERVAL = 1
+CATALOG_SNAPSHOT_VERIFY_INTERVAL = 10 * 60
+CATALOG_SNAPSHOT_QUERY_CHUNK = 500
+CATALOG_CHANGES_RETAIN = 10000
+CATALOG_CHANGES_PRUNE_EVERY = 100
+MAX_ID = 2 ** 63 - 1
@@ -0,0 +1,78 @@
+"""
+Engine configuration: connection pool sizing and SQLite pragmas.
+
+Pool settings come from the app config, then from environment variables of the same name, then from constants.
+SQLite connections are switched to WAL on connect, so readers see the last committed state instead of waiting
+for lending writes to finish.
+"""
+import os
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+from constants import (DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, SQLITE_BUSY_TIMEOUT_MS,
+                       SQLITE_MMAP_SIZE, SQLITE_CACHE_SIZE_KIB)
+
+POOL_SETTINGS = {
+    'DB_POOL_SIZE': ('pool_size', DB_POOL_SIZE),
+    'DB_MAX_OVERFLOW': ('max_overflow', DB_MAX_OVERFLOW),
+    'DB_POOL_TIMEOUT': ('pool_timeout', DB_POOL_TIMEOUT),
+    'DB_POOL_RECYCLE': ('pool_recycle', DB_POOL_RECYCLE),
+}
+
+
+def setting(app, name, default):
+    value = app.config.get(name, os.environ.get(name))
+    return default if value is None else int(value)
+
+
+def is_memory_database(url):
+    url = make_url(url)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def engine_options(app):
+    """Engine keyword arguments for the configured database, explicit SQLALCHEMY_ENGINE_OPTIONS take precedence."""
+    options = {'pool_pre_ping': True}
+    # In-memory SQLite runs on a single shared connection, there is no pool to size
+    database_uri = app.config.get('SQLALCHEMY_DATABASE_URI')
+    if database_uri and not is_memory_database(database_uri):
+        for name, (option, default) in POOL_SETTINGS.items():
+            options[option] = setting(app, name, default)
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    return options
+
+
+def configure_engine(app):
+    """Fill SQLALCHEMY_ENGINE_OPTIONS, call before db.init_app."""
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app)
+
+
+def sqlite_pragmas(app):
+    return {
+        'busy_timeout': setting(app, 'SQLITE_BUSY_TIMEOUT_MS', SQLITE_BUSY_TIMEOUT_MS),
+        'mmap_size': setting(app, 'SQLITE_MMAP_SIZE', SQLITE_MMAP_SIZE),
+        # Negative cache_size is in KiB instead of pages
+        'cache_size': -setting(app, 'SQLITE_CACHE_SIZE_KIB', SQLITE_CACHE_SIZE_KIB),
+        'synchronous': 'NORMAL',
+    }
+
+
+def register_sqlite_pragmas(app, engines):
+    """Apply WAL and the pragmas to every new connection of the SQLite engines."""
+    pragmas = sqlite_pragmas(app)
+    for engine in engines:
+        if engine.dialect.name != 'sqlite':
+            continue
+        use_wal = not is_memory_database(engine.url)
+
+        @event.listens_for(engine, 'connect')
+        def set_pragmas(dbapi_connection, connection_record, use_wal=use_wal):
+            cursor = dbapi_connection.cursor()
+            try:
+                if use_wal:
+                    cursor.execute('PRAGMA journal_mode=WAL')
+                for name, value in pragmas.items():
+                    cursor.execute(f'PRAGMA {name}={value}')
+            finally:
+                cursor.close()
@@ -0,0 +1,28 @@
+from sqlalchemy import Date
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+
+
+class date_add_days(FunctionElement):
+    """SQL expression for a date plus an integer number of days, evaluated in the database."""
+    type = Date()
+    inherit_cache = True
+    name = 'date_add_days'
+
+
+@compiles(date_add_days)
+def _date_add_days_default(element, compiler, **kw):
+    start, days = list(element.clauses)
+    return f"({compiler.process(start, **kw)} + {compiler.process(days, **kw)})"
+
+
+@compiles(date_add_days, 'sqlite')
+def _date_add_days_sqlite(element, compiler, **kw):
+    start, days = list(element.clauses)
+    return f"date({compiler.process(start, **kw)}, '+' || {compiler.process(days, **kw)} || ' days')"
+
+
+@compiles(date_add_days, 'mysql')
+def _date_add_days_mysql(element, compiler, **kw):
+    start, days = list(element.clauses)
+    return f"DATE_ADD({compiler.process(start, **kw)}, INTERVAL {compiler.process(days, **kw)} DAY)"
@@ -0,0 +1,85 @@
+"""
+Versioned schema migrations.
+
+db.create_all() creates missing tables but never changes existing ones. Migrations bring an existing database
+to the current model schema. Every migration checks what already exists, so on a database created by
+create_all() they only record their version. Run them with "flask --app main migrate" before starting workers.
+"""
+from datetime import datetime, timezone
+
+import click
+from sqlalchemy import Column, Integer, String, DateTime, inspect, text
+from sqlalchemy.schema import CreateIndex
+
+from db.database import db
+from db.search import create_search_index
+from utilities.catalog_cache import bump_catalog_version
+from models.book import Book
+from logger.logger_config import logger
+
+schema_migrations = db.Table(
+    'schema_migrations',
+    Column('version', Integer, primary_key=True),
+    Column('description', String(250), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+
+def _add_validation_status(connection):
+    columns = {column['name'] for column in inspect(connection).get_columns('books')}
+    if 'validation_status' not in columns:
+        connection.execute(text(
+            "ALTER TABLE books ADD COLUMN validation_status VARCHAR(20) NOT NULL DEFAULT 'valid'"))
+
+
+def _create_book_indexes(connection):
+    # Reflection skips expression indexes, so existence is left to IF NOT EXISTS
+    for index in Book.__table__.indexes:
+        connection.execute(CreateIndex(index, if_not_exists=True))
+
+
+MIGRATIONS = (
+    (1, "Add books.validation_status", _add_validation_status),
+    (2, "Add indexes for book lookups, lending state, overdue and duplicate checks", _create_book_indexes),
+    (3, "Add books full-text search index", create_search_index),
+)
+
+
+def applied_versions(connection):
+    return set(connection.execute(db.select(schema_migrations.c.version)).scalars())
+
+
+def upgrade(engine):
+    """Apply pending migrations in version order, each in its own transaction. Return applied versions."""
+    db.metadata.create_all(engine)
+    with engine.connect() as connection:
+        done = applied_versions(connection)
+    applied = []
+    for version, description, migrate in MIGRATIONS:
+        if version in done:
+            continue
+        with engine.begin() as connection:
+            migrate(connection)
+            connection.execute(db.insert(schema_migrations).values(
+                version=version, description=description, applied_at=datetime.now(timezone.utc)))
+        logger.info("Applied migration %s: %s", version, description)
+        applied.append(version)
+    return applied
+
+
+def register_commands(app):
+    @app.cli.command('migrate')
+    def migrate_command():
+        """Apply pending database migrations."""
+        applied = upgrade(db.engine)
+        click.echo(f"Applied migrations: {applied}" if applied else "Database is up to date")
+
+    @app.cli.command('rebuild-catalog-snapshot')
+    def rebuild_catalog_snapshot_command():
+        """Make the catalog snapshots of all running workers reload every book on their next catch up."""
+        if 'catalog_snapshot' not in app.extensions:
+            click.echo("Catalog snapshot is turned off")
+            return
+        bump_catalog_version()
+        db.session.commit()
+        click.echo("Catalog snapshots will reload all books")
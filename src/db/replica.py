@@ -0,0 +1,60 @@
+"""
+Read replica routing.
+
+With SQLALCHEMY_REPLICA_URI set the replica becomes the "replica" bind. Statements of GET and HEAD requests run
+on it, so catalog and user reads scale apart from the primary that takes the writes. A request that writes
+anything, or has pending changes to flush, uses the primary for the rest of the request, so it reads its own
+writes. The replica may lag, a client that wrote in one request can read older data in the next one.
+"""
+from flask import has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+REPLICA_BIND = 'replica'
+READ_METHODS = ('GET', 'HEAD')
+
+
+class RoutingSession(Session):
+    """Session that sends the statements of read requests to the replica bind."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._use_replica(clause):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _use_replica(self, clause):
+        if self.info.get('use_primary'):
+            return False
+        if self._flushing or self.new or self.dirty or self.deleted or getattr(clause, 'is_dml', False):
+            # Stay on the primary for the rest of the request to read the written rows
+            self.info['use_primary'] = True
+            return False
+        return has_request_context() and request.method in READ_METHODS and REPLICA_BIND in self._db.engines
+
+
+def configure_replica(app):
+    """Add SQLALCHEMY_REPLICA_URI as the replica bind, call before db.init_app."""
+    replica_uri = app.config.get('SQLALCHEMY_REPLICA_URI')
+    if replica_uri:
+        app.config['SQLALCHEMY_BINDS'] = {**app.config.get('SQLALCHEMY_BINDS', {}), REPLICA_BIND: replica_uri}
+
+
+def init_replica(app, db):
+    """Make replica connections read-only and start every request on the replica again."""
+    with app.app_context():
+        replica = db.engines.get(REPLICA_BIND)
+    if replica is None:
+        return
+
+    if replica.dialect.name == 'sqlite':
+        @event.listens_for(replica, 'connect')
+        def set_query_only(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            try:
+                cursor.execute('PRAGMA query_only=ON')
+            finally:
+                cursor.close()
+
+    @app.before_request
+    def _start_on_replica():
+        db.session.info.pop('use_primary', None)
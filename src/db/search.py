@@ -0,0 +1,89 @@
+import re
+
+from sqlalchemy import event, text, table, column, literal_column, func, select, or_
+
+from models.book import Book
+
+books_fts = table('books_fts', column('rowid'), column('title'), column('author'), column('description'))
+
+# bm25 weights for title, author and description columns
+TITLE_WEIGHT = 10.0
+AUTHOR_WEIGHT = 5.0
+DESCRIPTION_WEIGHT = 1.0
+
+CREATE_STATEMENTS = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+        title, author, description, content='books', content_rowid='id', tokenize='unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER IF NOT EXISTS books_fts_insert AFTER INSERT ON books BEGIN
+        INSERT INTO books_fts(rowid, title, author, description)
+        VALUES (new.id, new.title, new.author, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS books_fts_delete AFTER DELETE ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, author, description)
+        VALUES ('delete', old.id, old.title, old.author, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS books_fts_update AFTER UPDATE OF title, author, description ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, author, description)
+        VALUES ('delete', old.id, old.title, old.author, old.description);
+        INSERT INTO books_fts(rowid, title, author, description)
+        VALUES (new.id, new.title, new.author, new.description);
+    END""",
+)
+SYNC_TRIGGERS = ('books_fts_insert', 'books_fts_delete', 'books_fts_update')
+
+
+def search_index_supported(connection):
+    return connection.dialect.name == 'sqlite'
+
+
+def create_search_index(connection):
+    """Create the FTS5 index and its sync triggers. Fill the index if it didn't exist before."""
+    if not search_index_supported(connection):
+        return
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'books_fts'")).scalar()
+    for statement in CREATE_STATEMENTS:
+        connection.execute(text(statement))
+    if not exists:
+        connection.execute(text("INSERT INTO books_fts(books_fts) VALUES ('rebuild')"))
+
+
+def drop_search_index(connection):
+    """Drop the FTS5 index and its triggers. Bulk loads drop it first and recreate it once at the end."""
+    if search_index_supported(connection):
+        for trigger in SYNC_TRIGGERS:
+            connection.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+        connection.execute(text("DROP TABLE IF EXISTS books_fts"))
+
+
+@event.listens_for(Book.__table__, 'after_create')
+def _after_books_create(target, connection, **kw):
+    create_search_index(connection)
+
+
+@event.listens_for(Book.__table__, 'before_drop')
+def _before_books_drop(target, connection, **kw):
+    drop_search_index(connection)
+
+
+def search_terms(query):
+    """Return the words of free user input. Input without words has nothing to search for."""
+    return re.findall(r'\w+', query)
+
+
+def match_expression(query):
+    """Turn free user input into an FTS5 query: every word must match as a prefix."""
+    return ' '.join(f'"{term}"*' for term in search_terms(query))
+
+
+def search_books_query(connection, query):
+    """Return a select of books matching query, best matches first."""
+    if search_index_supported(connection):
+        rank = func.bm25(literal_column('books_fts'), TITLE_WEIGHT, AUTHOR_WEIGHT, DESCRIPTION_WEIGHT)
+        return (select(Book)
+                .join(books_fts, books_fts.c.rowid == Book.id)
+                .where(literal_column('books_fts').op('MATCH')(match_expression(query)))
+                .order_by(rank, Book.id))
+    clauses = [or_(Book.title.ilike(f'%{term}%'), Book.author.ilike(f'%{term}%'),
+                   Book.description.ilike(f'%{term}%')) for term in search_terms(query)]
+    return select(Book).where(*clauses).order_by(Book.id)
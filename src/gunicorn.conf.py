@@ -0,0 +1,40 @@
+"""
+Gunicorn settings for the production server: gunicorn -c src/gunicorn.conf.py wsgi:app
+
+Every setting can be changed with the environment variable named next to it.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5001')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread'
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+# Recycle workers after this many requests to bound memory growth, jitter keeps them from restarting together
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+# Load the application in the master once, workers share its memory copy-on-write
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() in ('true', '1', 'yes')
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG')
+errorlog = os.environ.get('GUNICORN_ERROR_LOG', '-')
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    from main import preload_catalog_snapshot
+    from wsgi import app
+
+    preload_catalog_snapshot(app)
+
+
+def post_fork(server, worker):
+    from main import reset_after_fork
+    from utilities.image_validation import image_validator
+    from wsgi import app
+
+    reset_after_fork(app)
+    image_validator.start_sweeper(app)
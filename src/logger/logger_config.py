@@ -1,8 +1,21 @@
+"""
+Application logger.
+
+Request threads only put records on a bounded queue, a QueueListener thread writes them to the rotating log file
+and the console. When the queue is full, LOG_QUEUE_POLICY "drop" discards records below WARNING and counts them,
+"block" waits up to LOG_QUEUE_BLOCK_TIMEOUT seconds for space. Warnings and errors always wait.
+Gunicorn workers inherit the file handler and rotate it independently, so run several workers with the
+console handler collected by the container runtime, not the rotated file, as the complete log.
+"""
+import atexit
 import logging
 import os
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 from dotenv import load_dotenv
 
+from constants import LOG_QUEUE_SIZE, LOG_QUEUE_POLICY, LOG_QUEUE_BLOCK_TIMEOUT, LOG_MAX_BYTES, LOG_BACKUP_COUNT
 from logger.utils import formatter, console_formatter
 
 load_dotenv()
@@ -10,17 +23,71 @@ load_dotenv()
 LOGGER_LOCATION = os.environ.get("LOGGER_LOCATION", "logs/app.log")
 os.makedirs(os.path.dirname(LOGGER_LOCATION), exist_ok=True)
 
+
+class BoundedQueueHandler(QueueHandler):
+    """QueueHandler that drops or waits instead of growing the queue without limit."""
+
+    def __init__(self, log_queue, policy=LOG_QUEUE_POLICY, block_timeout=LOG_QUEUE_BLOCK_TIMEOUT):
+        super().__init__(log_queue)
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            if self.policy == "block" or record.levelno >= logging.WARNING:
+                self.queue.put(record, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogWriter:
+    """Owns the queue handler and the listener thread writing its records."""
+
+    def __init__(self, handlers, max_size=LOG_QUEUE_SIZE, policy=LOG_QUEUE_POLICY):
+        self.handlers = handlers
+        self.max_size = max_size
+        self.queue_handler = BoundedQueueHandler(queue.Queue(max_size), policy)
+        self.listener = None
+
+    @property
+    def dropped(self):
+        return self.queue_handler.dropped
+
+    def start(self):
+        if self.listener is None:
+            self.listener = QueueListener(self.queue_handler.queue, *self.handlers, respect_handler_level=True)
+            self.listener.start()
+
+    def stop(self):
+        """Write out queued records and stop the listener thread."""
+        if self.listener is not None:
+            listener, self.listener = self.listener, None
+            listener.stop()
+
+    def restart_after_fork(self):
+        # The listener thread didn't survive fork and the queue locks may be held, start over with a new queue
+        self.queue_handler.queue = queue.Queue(self.max_size)
+        self.listener = None
+        self.start()
+
+
 logger = logging.getLogger("books-backend")
 logger.setLevel(logging.INFO)
 
 
-if not logger.handlers:
-    file_handler = logging.FileHandler(LOGGER_LOCATION)
-    file_handler.setFormatter(formatter)
+file_handler = RotatingFileHandler(LOGGER_LOCATION, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT)
+file_handler.setFormatter(formatter)
 
-    console_handler = logging.StreamHandler()
-    console_formatter = console_formatter
-    console_handler.setFormatter(console_formatter)
+console_handler = logging.StreamHandler()
+console_handler.setFormatter(console_formatter)
 
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+log_writer = LogWriter([file_handler, console_handler])
+
+if not logger.handlers:
+    log_writer.start()
+    logger.addHandler(log_writer.queue_handler)
+    atexit.register(log_writer.stop)
+    os.register_at_fork(after_in_child=log_writer.restart_after_fork)
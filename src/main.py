@@ -1,15 +1,26 @@
 from flask import Flask
 from dotenv import load_dotenv
+import gc
 import os
 import logging
 from db.database import db
+from db.engine import configure_engine, register_sqlite_pragmas
+from db.replica import configure_replica, init_replica
+from db.migrations import register_commands, upgrade
 from api.controller import user_blueprint, book_blueprint
 from utilities.auth import login_manager
+from utilities.image_validation import image_validator
+from utilities.metrics import init_metrics
+from utilities.query_monitor import init_query_monitor
+from utilities.json_provider import FastJSONProvider
+from utilities.compression import init_compression
+from utilities.catalog_snapshot import init_catalog_snapshot, get_snapshot
 from logger.logger_config import logger
 
 load_dotenv()
 
 DATABASE = os.environ.get('DATABASE')
+DATABASE_REPLICA = os.environ.get('DATABASE_REPLICA')
 SECRET_KEY = os.environ.get('SECRET_KEY')
 LOGGER_TEST = os.environ.get('LOGGER_TEST')
 
@@ -17,6 +28,7 @@ LOGGER_TEST = os.environ.get('LOGGER_TEST')
 def create_app(config_class=None):
     """Create and configure Flask application."""
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)
 
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['SESSION_COOKIE_HTTPONLY'] = True
@@ -30,20 +42,72 @@ def create_app(config_class=None):
         logger.setLevel(logging.DEBUG)
     else:
         app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE
+        app.config['SQLALCHEMY_REPLICA_URI'] = DATABASE_REPLICA
         app.config['SECRET_KEY'] = SECRET_KEY
 
+    configure_engine(app)
+    configure_replica(app)
     db.init_app(app)
+    init_replica(app, db)
     login_manager.init_app(app)
 
     app.register_blueprint(user_blueprint)
     app.register_blueprint(book_blueprint)
 
+    register_commands(app)
+    init_metrics(app)
+    init_query_monitor(app)
+    init_compression(app)
+    init_catalog_snapshot(app)
+
     with app.app_context():
-        db.create_all()
+        register_sqlite_pragmas(app, db.engines.values())
+        db.create_all(bind_key=None)
 
     return app
 
 
+def reset_after_fork(app):
+    """
+    Drop state a forked worker inherits from the master process.
+
+    Pooled database connections belong to the master, they are forgotten without closing them.
+    Threads don't survive fork, so thread pools and the catalog snapshot refresher start again on first use.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    image_validator.reset_after_fork()
+    snapshot = get_snapshot(app)
+    if snapshot is not None:
+        snapshot.reset_after_fork()
+        if snapshot.loaded:
+            # The snapshot loaded by the master may be behind, catch up before serving from it
+            snapshot.catch_up()
+
+
+def preload_catalog_snapshot(app):
+    """
+    Load the catalog snapshot in the gunicorn master so workers share it copy-on-write.
+
+    The loaded objects are moved out of garbage collection, whose passes would otherwise write to their pages
+    and copy them into every worker. Workers forked later, also when recycled after max_requests, catch up from
+    this snapshot instead of loading all books again.
+    """
+    snapshot = get_snapshot(app)
+    if snapshot is None:
+        return
+    snapshot.rebuild()
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+    gc.freeze()
+
+
 if __name__ == '__main__':
     app = create_app()
-    app.run(debug=True, host='0.0.0.0', port=5001)
+    with app.app_context():
+        upgrade(db.engine)
+    image_validator.start_sweeper(app)
+    # Development server only, production runs gunicorn -c src/gunicorn.conf.py wsgi:app
+    app.run(debug=os.environ.get('FLASK_DEBUG', 'false').lower() in ('true', '1'), host='0.0.0.0', port=5001)
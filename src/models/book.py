@@ -1,13 +1,20 @@
 from datetime import date
 
-from sqlalchemy import Integer, String, Date, Boolean
+from sqlalchemy import Integer, String, Date, Boolean, Index, and_, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
+from constants import VALIDATION_VALID
 from db.database import db
 
 
 class Book(db.Model):
     __tablename__ = 'books'
+    __table_args__ = (
+        Index('ix_books_owner_id', 'owner_id'),
+        Index('ix_books_lender_id', 'lender_id'),
+        Index('ix_books_state', 'active', 'reserved', 'lent_out'),
+        Index('ix_books_lent_out_return_date', 'lent_out', 'return_date'),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     title: Mapped[String] = mapped_column(String(250), nullable=False, unique=True)
     author: Mapped[String] = mapped_column(String(250), nullable=False)
@@ -17,12 +24,22 @@ class Book(db.Model):
     reserved: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
     lent_out: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
     active: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
+    validation_status: Mapped[str] = mapped_column(String(20), nullable=False, default=VALIDATION_VALID,
+                                                   server_default=VALIDATION_VALID)
     owner_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("users.id"), nullable=False)
     lender_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("users.id"), nullable=True)
     book_owner = relationship('User', foreign_keys=[owner_id], back_populates='my_books')
     book_lender = relationship('User', foreign_keys=[lender_id], back_populates='reserved_books')
 
-    def to_dict(self):
+    @classmethod
+    def overdue_clause(cls, today):
+        """SQL condition of books lent out past their return date."""
+        return and_(cls.lent_out == True, cls.return_date < today)  # noqa: E712
+
+    def to_dict(self, today=None):
+        """Return book as response dict. Pass today when serializing many books to read the clock only once."""
+        if today is None:
+            today = date.today()
         result = {
             'id': self.id,
             'title': self.title,
@@ -34,10 +51,30 @@ class Book(db.Model):
             'isActive': self.active,
             'ownerId': self.owner_id,
             'lenderId': self.lender_id,
+            'validationStatus': self.validation_status,
             'returnDate': self.return_date,
             'overdue': False
         }
 
-        if self.return_date and self.return_date < date.today():
+        if self.return_date and self.return_date < today:
             result['overdue'] = True
         return result
+
+
+# Case-insensitive duplicate checks compare lower(title) and lower(author)
+Index('ix_books_lower_title_author', func.lower(Book.title), func.lower(Book.author))
+
+
+# Column order of book rows selected with Core, and the to_dict() key of each column
+BOOK_ROW_COLUMNS = (Book.id, Book.title, Book.author, Book.description, Book.image_url, Book.reserved, Book.lent_out,
+                    Book.active, Book.owner_id, Book.lender_id, Book.validation_status, Book.return_date)
+BOOK_ROW_KEYS = ('id', 'title', 'author', 'description', 'img', 'reserved', 'lentOut', 'isActive', 'ownerId',
+                 'lenderId', 'validationStatus', 'returnDate')
+
+
+def book_row_dict(row, today):
+    """Return a row of BOOK_ROW_COLUMNS as the same dict as Book.to_dict(), without loading an ORM instance."""
+    result = dict(zip(BOOK_ROW_KEYS, row))
+    return_date = row[-1]
+    result['overdue'] = bool(return_date and return_date < today)
+    return result
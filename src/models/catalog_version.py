@@ -0,0 +1,33 @@
+from sqlalchemy import Integer, Index, event, insert
+from sqlalchemy.orm import Mapped, mapped_column
+
+from db.database import db
+
+CATALOG_VERSION_ID = 1
+
+
+class CatalogVersion(db.Model):
+    """Single row counter increased by every request that changes the books table."""
+    __tablename__ = 'catalog_version'
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class CatalogChange(db.Model):
+    """
+    Book ids changed by each catalog version, read by catalog snapshots of all workers to catch up.
+
+    A row without book_id means the change is not known book by book and snapshots reload everything.
+    """
+    __tablename__ = 'catalog_changes'
+    __table_args__ = (
+        Index('ix_catalog_changes_version', 'version'),
+    )
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False)
+    book_id: Mapped[int] = mapped_column(Integer, nullable=True)
+
+
+@event.listens_for(CatalogVersion.__table__, 'after_create')
+def _insert_counter_row(target, connection, **kw):
+    connection.execute(insert(target).values(id=CATALOG_VERSION_ID, version=0))
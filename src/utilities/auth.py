@@ -1,10 +1,57 @@
 from flask_login import LoginManager
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+
+from constants import USER_CACHE_SIZE, USER_CACHE_TTL, USER_CACHE_REPORT_EVERY
 from models.user import User
 from db.database import db
+from utilities.cache import TTLCache
+from logger.logger_config import logger
 
 login_manager = LoginManager()
 
+# Column values of recently loaded users by id. The password hash is left out, it loads on access.
+# Changes invalidate the cache of the process that wrote them only. Other workers serve the old values for at most
+# USER_CACHE_TTL seconds. Writes do not use the cached values, the return date reads the duration from the users table.
+user_cache = TTLCache(max_entries=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+CACHED_COLUMNS = tuple(column.key for column in inspect(User).column_attrs if column.key != 'password')
+
 
 @login_manager.user_loader
 def load_user(user_id):
-    return db.session.get(User, int(user_id))
+    """Return the session user, from the cache without a query when possible."""
+    user_id = int(user_id)
+    values = user_cache.get(user_id)
+    lookups = user_cache.hits + user_cache.misses
+    if lookups % USER_CACHE_REPORT_EVERY == 0:
+        logger.info("User cache hit rate %.1f%% after %s lookups", user_cache.hit_rate * 100, lookups)
+    if values is not None:
+        user = User(**values)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+    user = db.session.get(User, user_id)
+    if user is not None:
+        user_cache.set(user_id, {key: getattr(user, key) for key in CACHED_COLUMNS})
+    return user
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_changed_user(mapper, connection, target):
+    """
+    Drop a changed user from the cache at flush and again at commit.
+
+    A request that reads the user between flush and commit still sees the old row and may cache it again.
+    Core UPDATE statements on users bypass this and must invalidate the cache themselves.
+    """
+    user_cache.invalidate(target.id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('changed_user_ids', set()).add(target.id)
+
+
+@event.listens_for(Session, 'after_commit')
+@event.listens_for(Session, 'after_rollback')
+def _invalidate_users_at_transaction_end(session):
+    for user_id in session.info.pop('changed_user_ids', ()):
+        user_cache.invalidate(user_id)
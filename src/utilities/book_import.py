@@ -0,0 +1,119 @@
+import csv
+import io
+
+from sqlalchemy.exc import IntegrityError
+
+from constants import IMPORT_BATCH_SIZE, VALIDATION_PENDING
+from db.database import db
+from models.book import Book
+from utilities.service import is_well_formed_url
+from utilities.catalog_cache import bump_catalog_version
+
+CREATED = "created"
+DUPLICATE = "duplicate"
+INVALID = "invalid"
+CONFLICT = "conflict"
+
+
+def read_import_rows(request):
+    """Return import rows as dicts from a JSON array, an uploaded CSV file or a text/csv body."""
+    if 'file' in request.files:
+        text = request.files['file'].read().decode('utf-8-sig')
+        return list(csv.DictReader(io.StringIO(text)))
+    if request.mimetype == 'text/csv':
+        return list(csv.DictReader(io.StringIO(request.get_data(as_text=True))))
+    data = request.get_json(silent=True)
+    if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+        raise ValueError("Expected a JSON array of books or a CSV file")
+    return data
+
+
+def text_value(row, *keys):
+    """Return the stripped text of the first given key of row. Raise ValueError if the value is not text."""
+    for key in keys:
+        value = row.get(key)
+        if value:
+            if not isinstance(value, str):
+                raise ValueError(f"{key} must be text, got {value!r}")
+            return value.strip()
+    return ''
+
+
+def normalize_row(row):
+    """Return normalized book values or raise ValueError with the reason the row is rejected."""
+    title = text_value(row, 'title').title()
+    author = text_value(row, 'author').title()
+    image_url = text_value(row, 'imageUrl', 'image_url')
+    description = text_value(row, 'description') or None
+    if not title:
+        raise ValueError("title is missing")
+    if len(author) < 4:
+        raise ValueError(f"author value: {author} is too short.")
+    if not is_well_formed_url(image_url):
+        raise ValueError(f"Book {title} image URL is invalid")
+    return {'title': title, 'author': author, 'image_url': image_url, 'description': description}
+
+
+def import_books(rows, owner_id):
+    """
+    Insert rows as books of owner. Return a result dict per row and the (id, image_url) pairs inserted.
+
+    Rows are handled in batches: one query finds the titles of a batch that already exist, one executemany
+    insert stores the new books and one query reads their ids. Titles are unique, so a title match is a duplicate.
+    """
+    results = [None] * len(rows)
+    created = []
+    seen_titles = set()
+    for start in range(0, len(rows), IMPORT_BATCH_SIZE):
+        batch = []
+        for index in range(start, min(start + IMPORT_BATCH_SIZE, len(rows))):
+            try:
+                values = normalize_row(rows[index])
+            except ValueError as e:
+                results[index] = {"row": index, "status": INVALID, "message": str(e)}
+                continue
+            title_key = values['title'].lower()
+            if title_key in seen_titles:
+                results[index] = {"row": index, "status": DUPLICATE,
+                                  "message": f"Book {values['title']} is repeated in the import"}
+                continue
+            seen_titles.add(title_key)
+            batch.append((index, values))
+        if not batch:
+            continue
+
+        existing = set(db.session.execute(
+            db.select(db.func.lower(Book.title))
+            .where(db.func.lower(Book.title).in_([values['title'].lower() for _, values in batch]))).scalars())
+        new_rows = []
+        for index, values in batch:
+            if values['title'].lower() in existing:
+                results[index] = {"row": index, "status": DUPLICATE,
+                                  "message": f"Book {values['title']} already exists in database"}
+            else:
+                new_rows.append((index, values))
+        if not new_rows:
+            continue
+
+        try:
+            db.session.execute(
+                db.insert(Book),
+                [dict(values, owner_id=owner_id, reserved=False, lent_out=False, active=True, return_date=None,
+                      validation_status=VALIDATION_PENDING) for _, values in new_rows])
+            inserted = dict(db.session.execute(
+                db.select(Book.title, Book.id).where(Book.title.in_([values['title'] for _, values in new_rows]))
+            ).all())
+            bump_catalog_version(*inserted.values())
+            db.session.commit()
+        except IntegrityError:
+            # A book with one of the titles was added after the duplicate check
+            db.session.rollback()
+            for index, values in new_rows:
+                results[index] = {"row": index, "status": CONFLICT,
+                                  "message": f"Book {values['title']} conflicted with a concurrent change, retry"}
+            continue
+        for index, values in new_rows:
+            book_id = inserted[values['title']]
+            results[index] = {"row": index, "status": CREATED, "id": book_id}
+            created.append((book_id, values['image_url']))
+    return results, created
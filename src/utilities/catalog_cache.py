@@ -0,0 +1,76 @@
+import hashlib
+import threading
+
+from flask import current_app
+
+from db.database import db
+from models.catalog_version import CatalogVersion, CatalogChange, CATALOG_VERSION_ID
+from constants import CATALOG_CACHE_SIZE, CATALOG_CHANGES_RETAIN, CATALOG_CHANGES_PRUNE_EVERY
+
+
+def bump_catalog_version(*book_ids):
+    """
+    Increase catalog version in the current transaction. Call before committing a change to books.
+
+    When the app keeps a catalog snapshot the changed book ids are recorded for snapshots of all workers,
+    without book ids they reload all books. Every CATALOG_CHANGES_PRUNE_EVERY versions the change rows
+    older than CATALOG_CHANGES_RETAIN versions are deleted.
+    """
+    version = db.session.execute(db.update(CatalogVersion)
+                                 .where(CatalogVersion.id == CATALOG_VERSION_ID)
+                                 .values(version=CatalogVersion.version + 1)
+                                 .returning(CatalogVersion.version)).scalar_one()
+    if 'catalog_snapshot' not in current_app.extensions:
+        return
+    changes = CatalogChange.__table__
+    db.session.execute(db.insert(changes),
+                       [{'version': version, 'book_id': book_id} for book_id in book_ids or (None,)])
+    if version % CATALOG_CHANGES_PRUNE_EVERY == 0:
+        db.session.execute(db.delete(changes).where(changes.c.version <= version - CATALOG_CHANGES_RETAIN))
+    db.session.info['catalog_changed'] = True
+
+
+def current_catalog_version():
+    return db.session.execute(db.select(CatalogVersion.version)
+                              .where(CatalogVersion.id == CATALOG_VERSION_ID)).scalar() or 0
+
+
+def make_etag(version, *parts):
+    """Return ETag value for catalog version and the request arguments the response depends on."""
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()[:16]
+    return f"catalog-{version}-{digest}"
+
+
+class CatalogResponseCache:
+    """Serialized responses of the current catalog version. Older versions are dropped on first newer store."""
+
+    def __init__(self, max_entries=CATALOG_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.version = None
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, version, key):
+        with self.lock:
+            if version != self.version:
+                return None
+            return self.entries.get(key)
+
+    def set(self, version, key, body):
+        with self.lock:
+            if self.version is not None and version < self.version:
+                return
+            if version != self.version:
+                self.version = version
+                self.entries = {}
+            if len(self.entries) >= self.max_entries:
+                self.entries.pop(next(iter(self.entries)))
+            self.entries[key] = body
+
+    def clear(self):
+        with self.lock:
+            self.version = None
+            self.entries = {}
+
+
+catalog_cache = CatalogResponseCache()
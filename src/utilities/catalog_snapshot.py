@@ -0,0 +1,432 @@
+"""
+In-process snapshot of the books table for serving catalog reads without SQL.
+
+Every worker keeps all books as immutable BookRecord tuples indexed by id, owner and lender. Commits that change
+books record the changed ids in catalog_changes (see bump_catalog_version()). The committing worker catches up
+right after its commit, a background thread catches up with commits of other workers and periodically compares
+the snapshot with the database.
+"""
+import threading
+import time
+from array import array
+from bisect import bisect_right, insort
+from operator import attrgetter
+from typing import NamedTuple, Optional
+from datetime import date
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from constants import (CATALOG_SNAPSHOT_REFRESH_INTERVAL, CATALOG_SNAPSHOT_VERIFY_INTERVAL,
+                       CATALOG_SNAPSHOT_QUERY_CHUNK)
+from db.database import db
+from models.book import Book, BOOK_ROW_COLUMNS, book_row_dict
+from models.catalog_version import CatalogVersion, CatalogChange, CATALOG_VERSION_ID
+from models.user import User
+from logger.logger_config import logger
+
+EMPTY_IDS = array('q')
+
+
+class BookRecord(NamedTuple):
+    """Immutable book row in BOOK_ROW_COLUMNS order. Changes replace the whole record."""
+    id: int
+    title: str
+    author: str
+    description: Optional[str]
+    image_url: str
+    reserved: bool
+    lent_out: bool
+    active: bool
+    owner_id: int
+    lender_id: Optional[int]
+    validation_status: str
+    return_date: Optional[date]
+
+    def to_dict(self, today):
+        return book_row_dict(self, today)
+
+
+def _record(row, strings):
+    """Return BookRecord of a book row, sharing one string object between books with the same author."""
+    values = list(row)
+    values[2] = strings.setdefault(values[2], values[2])
+    values[10] = strings.setdefault(values[10], values[10])
+    return BookRecord._make(values)
+
+
+class SnapshotData:
+    """
+    Records and indexes of one snapshot. Id arrays are kept sorted.
+
+    Published id arrays are never changed, apply() replaces them with changed copies. Readers take references
+    under the snapshot lock and scan them without it.
+    """
+
+    def __init__(self):
+        self.records = {}
+        self.ids = array('q')
+        self.by_owner = {}
+        self.by_lender = {}
+        self.user_names = {}
+        self.strings = {}
+
+    def load(self, records):
+        """Add records ordered by id to a snapshot that readers don't see yet."""
+        for record in records:
+            self.records[record.id] = record
+            self.ids.append(record.id)
+            self.by_owner.setdefault(record.owner_id, array('q')).append(record.id)
+            if record.lender_id is not None:
+                self.by_lender.setdefault(record.lender_id, array('q')).append(record.id)
+
+    def apply(self, records, removed_ids):
+        """Replace or add records and remove books of removed_ids. Call with the snapshot lock held."""
+        ids = array('q', self.ids)
+        for book_id in removed_ids:
+            record = self.records.pop(book_id, None)
+            if record is None:
+                continue
+            ids.pop(bisect_right(ids, book_id) - 1)
+            _discard(self.by_owner, record.owner_id, book_id)
+            _discard(self.by_lender, record.lender_id, book_id)
+        for record in records:
+            previous = self.records.get(record.id)
+            if previous is None:
+                _insert(ids, record.id)
+            if previous is None or previous.owner_id != record.owner_id:
+                _discard(self.by_owner, previous and previous.owner_id, record.id)
+                _add(self.by_owner, record.owner_id, record.id)
+            if previous is None or previous.lender_id != record.lender_id:
+                _discard(self.by_lender, previous and previous.lender_id, record.id)
+                _add(self.by_lender, record.lender_id, record.id)
+            self.records[record.id] = record
+        self.ids = ids
+
+
+def _insert(ids, book_id):
+    if ids and book_id < ids[-1]:
+        insort(ids, book_id)
+    else:
+        ids.append(book_id)
+
+
+def _add(index, key, book_id):
+    if key is None:
+        return
+    ids = array('q', index.get(key, EMPTY_IDS))
+    _insert(ids, book_id)
+    index[key] = ids
+
+
+def _discard(index, key, book_id):
+    ids = index.get(key)
+    if not ids:
+        return
+    position = bisect_right(ids, book_id) - 1
+    if position < 0 or ids[position] != book_id:
+        return
+    ids = array('q', ids)
+    ids.pop(position)
+    if ids:
+        index[key] = ids
+    else:
+        del index[key]
+
+
+def _index_errors(data):
+    """Return ids of books missing from or wrongly placed in the id, owner and lender indexes."""
+    indexed = {(book_id, 'owner', key) for key, ids in data.by_owner.items() for book_id in ids}
+    indexed |= {(book_id, 'lender', key) for key, ids in data.by_lender.items() for book_id in ids}
+    wanted = {(record.id, 'owner', record.owner_id) for record in data.records.values()}
+    wanted |= {(record.id, 'lender', record.lender_id) for record in data.records.values()
+               if record.lender_id is not None}
+    errors = {book_id for book_id, _, _ in indexed ^ wanted}
+    if list(data.ids) != sorted(data.records):
+        errors.update(set(data.ids) ^ set(data.records))
+    return errors
+
+
+def _chunks(values, size=CATALOG_SNAPSHOT_QUERY_CHUNK):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+class CatalogSnapshot:
+    """
+    Books of one application held in memory.
+
+    Readers take the lock only to pick the id array to scan, records and published id arrays never change.
+    With CATALOG_SNAPSHOT_SYNC set the snapshot loads on first use and has no background thread, for databases
+    that can't be shared between threads. Otherwise it loads in the background and reads go to the database
+    until it is ready.
+    """
+
+    def __init__(self, app, engine):
+        self.engine = engine
+        self.sync = app.config.get('CATALOG_SNAPSHOT_SYNC', False)
+        self.refresh_interval = app.config.get('CATALOG_SNAPSHOT_REFRESH_INTERVAL', CATALOG_SNAPSHOT_REFRESH_INTERVAL)
+        self.verify_interval = app.config.get('CATALOG_SNAPSHOT_VERIFY_INTERVAL', CATALOG_SNAPSHOT_VERIFY_INTERVAL)
+        self.data = None
+        self.version = None
+        self.needs_rebuild = False
+        self.rebuilds = 0
+        self.mismatches = 0
+        self.lock = threading.Lock()
+        self.load_lock = threading.Lock()
+        self.catch_up_lock = threading.Lock()
+        self.start_lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.refresher = None
+
+    @property
+    def loaded(self):
+        return self.data is not None
+
+    def ensure_loaded(self):
+        """Return True if reads can use the snapshot, start loading it otherwise."""
+        if self.sync:
+            if not self.loaded:
+                self.rebuild()
+            return True
+        if self.stopping.is_set():
+            return False
+        if self.refresher is None or not self.refresher.is_alive():
+            with self.start_lock:
+                if self.refresher is None or not self.refresher.is_alive():
+                    self.refresher = threading.Thread(target=self._refresh_loop, name='catalog-snapshot',
+                                                      daemon=True)
+                    self.refresher.start()
+        return self.loaded and not self.needs_rebuild
+
+    def rebuild(self):
+        """Load all books and users again and replace the snapshot. Return the loaded catalog version."""
+        with self.load_lock:
+            started = time.perf_counter()
+            data = SnapshotData()
+            with self.engine.connect() as connection:
+                # Changes committed after reading the version are applied again by catch_up()
+                version = self._read_version(connection)
+                data.user_names = dict(connection.execute(select(User.id, User.first_name)).all())
+                rows = connection.execution_options(yield_per=CATALOG_SNAPSHOT_QUERY_CHUNK * 20).execute(
+                    select(*BOOK_ROW_COLUMNS).order_by(Book.id))
+                data.load(_record(row, data.strings) for row in rows)
+            with self.catch_up_lock, self.lock:
+                self.data = data
+                self.version = version
+                self.needs_rebuild = False
+                self.rebuilds += 1
+            logger.info("Catalog snapshot loaded %s books of version %s in %.1f s",
+                        len(data.records), version, time.perf_counter() - started)
+        self.catch_up()
+        return version
+
+    @staticmethod
+    def _read_version(connection):
+        return connection.execute(select(CatalogVersion.version)
+                                  .where(CatalogVersion.id == CATALOG_VERSION_ID)).scalar() or 0
+
+    def catch_up(self):
+        """Apply books changed since the snapshot version. Return the number of books read again."""
+        with self.catch_up_lock:
+            if not self.loaded:
+                return 0
+            known_version = self.version
+            changed = self._catch_up(known_version)
+        if changed is not None:
+            return changed
+        # The database was replaced, changes were pruned or a change does not name its books
+        logger.info("Catalog snapshot of version %s can't catch up, reloading", known_version)
+        if self.sync:
+            self.rebuild()
+        else:
+            self.needs_rebuild = True
+        return 0
+
+    def _catch_up(self, known_version):
+        """Apply changes after known_version. Return the number of changed books, None if all must be reloaded."""
+        with self.engine.connect() as connection:
+            version = self._read_version(connection)
+            if version == known_version:
+                return 0
+            oldest = connection.execute(select(func.min(CatalogChange.version))).scalar()
+            changed = set(connection.execute(
+                select(CatalogChange.book_id).distinct()
+                .where(CatalogChange.version > known_version, CatalogChange.version <= version)).scalars())
+            if version < known_version or oldest is None or oldest > known_version + 1 or None in changed:
+                return None
+            rows = []
+            for book_ids in _chunks(changed):
+                rows.extend(connection.execute(select(*BOOK_ROW_COLUMNS).where(Book.id.in_(book_ids))).all())
+            user_ids = {user_id for row in rows for user_id in (row.owner_id, row.lender_id)
+                        if user_id is not None and user_id not in self.data.user_names}
+            names = {}
+            for chunk in _chunks(user_ids):
+                names.update(connection.execute(select(User.id, User.first_name).where(User.id.in_(chunk))).all())
+        records = [_record(row, self.data.strings) for row in rows]
+        with self.lock:
+            self.data.user_names.update(names)
+            self.data.apply(records, changed - {record.id for record in records})
+            self.version = version
+        return len(changed)
+
+    def select(self, filters=None, where=None, after_id=0, limit=None):
+        """
+        Return (version, records) of books with id over after_id matching filters and where, ordered by id.
+
+        filters are {column name: value} equality conditions, owner_id and lender_id use the indexes.
+        where is an optional function of a record.
+        """
+        filters = dict(filters or {})
+        with self.lock:
+            version = self.version
+            data = self.data
+            if 'owner_id' in filters:
+                ids = data.by_owner.get(filters.pop('owner_id'), EMPTY_IDS)
+            elif 'lender_id' in filters:
+                ids = data.by_lender.get(filters.pop('lender_id'), EMPTY_IDS)
+            else:
+                ids = data.ids
+        # Records replaced during the scan are newer than version, removed ones are skipped
+        names = tuple(filters)
+        values = tuple(filters.values())
+        getter = attrgetter(*names) if len(names) > 1 else (lambda record: (getattr(record, names[0]),))
+        records = data.records
+        result = []
+        for position in range(bisect_right(ids, after_id), len(ids)):
+            record = records.get(ids[position])
+            if record is None:
+                continue
+            if (not names or getter(record) == values) and (where is None or where(record)):
+                result.append(record)
+                if limit is not None and len(result) >= limit:
+                    break
+        return version, result
+
+    def user_name(self, user_id):
+        return self.data.user_names.get(user_id) if user_id is not None else None
+
+    def verify(self):
+        """
+        Compare the snapshot with the database after catching up. Return ids of books that differ.
+
+        Books changed while comparing are checked again after another catch up before they count as different.
+        """
+        self.catch_up()
+        different = self._compare(None)
+        if different:
+            self.catch_up()
+            different = self._compare(different)
+        self.mismatches += len(different)
+        if different:
+            logger.warning("Catalog snapshot differs from the database for %s books, first ids %s",
+                           len(different), different[:10])
+        return different
+
+    def _compare(self, book_ids):
+        with self.lock:
+            data = self.data
+            expected = dict(data.records) if book_ids is None else {
+                book_id: data.records.get(book_id) for book_id in book_ids}
+            if book_ids is None:
+                different = _index_errors(data)
+            else:
+                different = set()
+        with self.engine.connect() as connection:
+            query = select(*BOOK_ROW_COLUMNS).order_by(Book.id)
+            if book_ids is None:
+                rows = connection.execute(query)
+            else:
+                rows = [row for chunk in _chunks(book_ids)
+                        for row in connection.execute(query.where(Book.id.in_(chunk)))]
+            for row in rows:
+                if expected.pop(row.id, None) != tuple(row):
+                    different.add(row.id)
+        different.update(book_id for book_id, record in expected.items() if record is not None)
+        return sorted(different)
+
+    def _refresh_loop(self):
+        last_verify = time.monotonic()
+        while not self.stopping.is_set():
+            try:
+                if not self.loaded or self.needs_rebuild:
+                    self.rebuild()
+                    last_verify = time.monotonic()
+                else:
+                    self.catch_up()
+                if time.monotonic() - last_verify >= self.verify_interval:
+                    last_verify = time.monotonic()
+                    if self.verify():
+                        self.needs_rebuild = True
+            except Exception:
+                logger.exception("Catalog snapshot refresh failed")
+            self.stopping.wait(self.refresh_interval)
+
+    def stop(self):
+        """Stop the background refresher, reads go to the database afterwards."""
+        self.stopping.set()
+        if self.refresher is not None:
+            self.refresher.join()
+
+    def reset_after_fork(self):
+        """Forget the refresher thread of the parent process, the loaded books stay valid."""
+        self.lock = threading.Lock()
+        self.load_lock = threading.Lock()
+        self.catch_up_lock = threading.Lock()
+        self.start_lock = threading.Lock()
+        self.refresher = None
+
+    def clear(self):
+        with self.lock:
+            self.data = None
+            self.version = None
+            self.needs_rebuild = False
+
+
+def get_snapshot(app=None):
+    """Return the catalog snapshot of app, None if the app does not use one."""
+    app = app or current_app
+    return app.extensions.get('catalog_snapshot')
+
+
+def ready_snapshot():
+    """Return the current app's snapshot if reads can use it, None when they must go to the database."""
+    snapshot = get_snapshot()
+    if snapshot is None or not snapshot.ensure_loaded():
+        return None
+    return snapshot
+
+
+@event.listens_for(Session, 'after_commit')
+def _catch_up_after_commit(session):
+    """Show the committed change in this worker's snapshot before the response is sent."""
+    if not session.info.pop('catalog_changed', False) or not has_app_context():
+        return
+    snapshot = get_snapshot()
+    if snapshot is None or not snapshot.loaded:
+        return
+    try:
+        snapshot.catch_up()
+    except Exception:
+        # The background refresher catches up later
+        logger.exception("Catalog snapshot catch up after commit failed")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back_change(session):
+    session.info.pop('catalog_changed', None)
+
+
+def init_catalog_snapshot(app):
+    """
+    Serve catalog reads of app from a snapshot unless CATALOG_SNAPSHOT is set to False.
+
+    A snapshot takes a few hundred bytes per book in every worker that is not sharing the master's copy, about
+    0.5 GB for a million books. Without preloading in the gunicorn master each worker loads its own copy.
+    """
+    if not app.config.get('CATALOG_SNAPSHOT', True):
+        return
+    with app.app_context():
+        app.extensions['catalog_snapshot'] = CatalogSnapshot(app, db.engine)
@@ -0,0 +1,71 @@
+"""
+Response compression negotiated from Accept-Encoding.
+
+Responses of a compressible type larger than COMPRESSION_MIN_SIZE are sent with brotli when the brotli package is
+installed and the client accepts it, gzip otherwise. Compressed responses get their own ETag, the plain ETag with
+the encoding appended. Streamed responses are sent as they are.
+"""
+import gzip
+
+from flask import current_app, request
+
+from constants import COMPRESSION_MIN_SIZE, COMPRESSION_GZIP_LEVEL, COMPRESSION_BROTLI_QUALITY
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'text/')
+
+
+def available_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding():
+    """Return the best encoding the client accepts, or None for an uncompressed response."""
+    return request.accept_encodings.best_match(available_encodings())
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+    # mtime=0 keeps the output identical for identical bodies
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def encoded_etag(etag, encoding):
+    return f"{etag}-{encoding}"
+
+
+def worth_compressing(size):
+    return size >= current_app.config.get('COMPRESSION_MIN_SIZE', COMPRESSION_MIN_SIZE)
+
+
+def set_encoded_body(response, body, encoding):
+    """Put an already compressed body to response with the headers that describe it."""
+    etag, weak = response.get_etag()
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    if etag:
+        response.set_etag(encoded_etag(etag, encoding), weak=weak)
+    return response
+
+
+def compress_response(response):
+    """after_request hook compressing responses the client accepts compressed."""
+    if not response.mimetype or not response.mimetype.startswith(COMPRESSIBLE_TYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    if response.status_code != 200 or response.is_streamed or 'Content-Encoding' in response.headers:
+        return response
+    body = response.get_data()
+    encoding = negotiate_encoding() if worth_compressing(len(body)) else None
+    if encoding is None:
+        return response
+    return set_encoded_body(response, compress(body, encoding), encoding)
+
+
+def init_compression(app):
+    app.after_request(compress_response)
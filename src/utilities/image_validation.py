@@ -0,0 +1,142 @@
+import random
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from functools import partial
+
+from constants import (IMAGE_VALIDATION_WORKERS, IMAGE_VALIDATION_TIMEOUT, IMAGE_VALIDATION_SWEEP_INTERVAL,
+                       VALIDATION_PENDING, VALIDATION_VALID, VALIDATION_INVALID)
+from db.database import db
+from models.book import Book
+from utilities.catalog_cache import bump_catalog_version
+from utilities.service import validate_image_url
+from logger.logger_config import logger
+
+
+class ImageValidator:
+    """Validate book image urls on a worker pool and store the result in Book.validation_status."""
+
+    def __init__(self, max_workers=IMAGE_VALIDATION_WORKERS):
+        self.max_workers = max_workers
+        self.executor = None
+        self.futures = set()
+        self.queued_ids = set()
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.sweeper = None
+
+    def submit(self, app, book_id, url):
+        """
+        Queue validation of a pending book. Return the Future of the check.
+
+        With IMAGE_VALIDATION_SYNC set the check runs before returning, for databases that can't be shared
+        between threads.
+        """
+        if app.config.get('IMAGE_VALIDATION_SYNC'):
+            future = Future()
+            future.set_result(self._validate(app, book_id, url))
+            return future
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                   thread_name_prefix='image-validator')
+            future = self.executor.submit(self._validate, app, book_id, url)
+            self.futures.add(future)
+            self.queued_ids.add(book_id)
+        future.add_done_callback(partial(self._forget, book_id))
+        return future
+
+    def _forget(self, book_id, future):
+        with self.lock:
+            self.futures.discard(future)
+            self.queued_ids.discard(book_id)
+
+    def resubmit_pending(self, app):
+        """
+        Queue validation of pending books that are not queued in this process. Return the number of queued books.
+
+        Validations queued by a worker that died are lost with it, their books would stay pending forever.
+        A book pending in another live worker is validated twice, only the first result is stored.
+        """
+        with app.app_context():
+            rows = db.session.execute(db.select(Book.id, Book.image_url)
+                                      .where(Book.validation_status == VALIDATION_PENDING)).all()
+        with self.lock:
+            rows = [row for row in rows if row.id not in self.queued_ids]
+        for book_id, url in rows:
+            self.submit(app, book_id, url)
+        if rows:
+            logger.info("Queued image validation of %s pending books again", len(rows))
+        return len(rows)
+
+    def start_sweeper(self, app):
+        """
+        Queue pending books again every IMAGE_VALIDATION_SWEEP_INTERVAL seconds on a daemon thread.
+
+        The first sweep runs after a random part of the interval, so workers started together don't all
+        validate the same books. Not started with IMAGE_VALIDATION_SYNC or an interval of 0.
+        """
+        interval = app.config.get('IMAGE_VALIDATION_SWEEP_INTERVAL', IMAGE_VALIDATION_SWEEP_INTERVAL)
+        if app.config.get('IMAGE_VALIDATION_SYNC') or not interval:
+            return
+        with self.lock:
+            if self.sweeper is not None:
+                return
+            self.stopping.clear()
+            self.sweeper = threading.Thread(target=self._sweep_loop, args=(app, interval),
+                                            name='image-validation-sweeper', daemon=True)
+            self.sweeper.start()
+
+    def _sweep_loop(self, app, interval):
+        delay = random.uniform(0, interval)
+        while not self.stopping.wait(delay):
+            try:
+                self.resubmit_pending(app)
+            except Exception:
+                logger.exception("Queueing pending image validations failed")
+            delay = interval
+
+    def _validate(self, app, book_id, url):
+        timeout = app.config.get('IMAGE_VALIDATION_TIMEOUT', IMAGE_VALIDATION_TIMEOUT)
+        status = VALIDATION_VALID if validate_image_url(url, timeout=timeout) else VALIDATION_INVALID
+        with app.app_context():
+            try:
+                # The url check makes sure a result for an outdated url is not stored
+                result = db.session.execute(
+                    db.update(Book)
+                    .where(Book.id == book_id, Book.image_url == url, Book.validation_status == VALIDATION_PENDING)
+                    .values(validation_status=status))
+                if result.rowcount:
+                    bump_catalog_version(book_id)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                logger.exception("Storing image validation result of book id %s failed", book_id)
+                raise
+        logger.info("Book id %s image validation finished: %s", book_id, status)
+        return status
+
+    def wait(self, timeout=None):
+        """Block until all queued validations are finished."""
+        with self.lock:
+            futures = set(self.futures)
+        wait(futures, timeout=timeout)
+
+    def reset_after_fork(self):
+        """Forget the executor and sweeper inherited from the parent process, their threads didn't survive fork."""
+        self.executor = None
+        self.futures = set()
+        self.queued_ids = set()
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.sweeper = None
+
+    def shutdown(self, wait_for_pending=True):
+        self.stopping.set()
+        with self.lock:
+            executor, self.executor = self.executor, None
+            self.sweeper = None
+        if executor is not None:
+            executor.shutdown(wait=wait_for_pending)
+
+
+image_validator = ImageValidator()
@@ -0,0 +1,67 @@
+"""
+Flask JSON provider encoding with orjson when it is installed, with the standard library otherwise.
+
+Output matches Flask's default provider: sorted keys, dates in HTTP date format and the same types handled by
+the default hook. orjson writes non-ASCII characters as UTF-8 instead of escape sequences.
+"""
+from datetime import date
+from functools import lru_cache
+
+from flask.json.provider import DefaultJSONProvider, _default
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+# dumps keyword arguments orjson can honour, anything else goes to the standard library
+ORJSON_KWARGS = {'indent': (None, 2), 'separators': (None, (',', ':'))}
+
+
+@lru_cache(maxsize=4096)
+def _cached_http_date(value):
+    return http_date(value)
+
+
+def default(o):
+    # Few distinct return dates repeat across a whole catalog
+    if type(o) is date:
+        return _cached_http_date(o)
+    return _default(o)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    default = staticmethod(default)
+
+    def _stdlib_encode(self, obj, indent):
+        layout = {'indent': indent} if indent else {'separators': (',', ':')}
+        return super().dumps(obj, **layout).encode()
+
+    def encode(self, obj, indent=None):
+        """Return obj as UTF-8 encoded JSON bytes."""
+        if orjson is None:
+            return self._stdlib_encode(obj, indent)
+        option = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=self.default, option=option)
+        except orjson.JSONEncodeError:
+            # Integers over 64 bits and other values only the standard library handles
+            return self._stdlib_encode(obj, indent)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or any(value not in ORJSON_KWARGS.get(name, ()) for name, value in kwargs.items()):
+            return super().dumps(obj, **kwargs)
+        return self.encode(obj, kwargs.get('indent')).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = 2 if (self.compact is None and self._app.debug) or self.compact is False else None
+        return self._app.response_class(self.encode(obj, indent) + b'\n', mimetype=self.mimetype)
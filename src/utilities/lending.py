@@ -0,0 +1,178 @@
+"""
+Book lending state machine.
+
+Every transition is a single conditional UPDATE ... RETURNING statement, so two concurrent requests can't both
+win the same transition. The book is loaded only when a transition fails, to explain why.
+Transitions don't commit, the caller bumps the catalog version and commits.
+"""
+from sqlalchemy import or_
+
+from db.database import db
+from db.expressions import date_add_days
+from models.book import Book
+from models.user import User
+
+
+class LendingError(Exception):
+    """Transition was refused. Holds the message and HTTP status for the response."""
+
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def _is_party(user_id):
+    return or_(Book.owner_id == user_id, Book.lender_id == user_id)
+
+
+def _execute_returning(statement, book_id, *columns):
+    """Run the conditional update and return the updated row or None if the conditions didn't match."""
+    statement = statement.execution_options(synchronize_session=False)
+    if db.session.get_bind().dialect.update_returning:
+        return db.session.execute(statement.returning(*columns)).first()
+    if not db.session.execute(statement).rowcount:
+        return None
+    return db.session.execute(db.select(*columns).where(Book.id == book_id)).first()
+
+
+def _load_book(book_id):
+    book = db.session.get(Book, book_id, populate_existing=True)
+    if book is None:
+        raise LendingError(f"Cannot find the book by id: {book_id}", 404)
+    return book
+
+
+def reserve(book_id, user_id):
+    """Reserve a free book to user. Return the (id, lender_id) row."""
+    row = _execute_returning(
+        db.update(Book)
+        .where(Book.id == book_id, Book.reserved == False, Book.owner_id != user_id)  # noqa: E712
+        .values(reserved=True, lender_id=user_id),
+        book_id, Book.id, Book.lender_id)
+    if row is not None:
+        return row
+    book = _load_book(book_id)
+    if book.owner_id == user_id:
+        raise LendingError("Book owner cannot reserve own book", 400)
+    raise LendingError(f"Failed to reserve book {book_id}", 400)
+
+
+def cancel_reservation(book_id, user_id):
+    """Cancel a reservation that isn't handed over yet. User must be the book owner or lender."""
+    row = _execute_returning(
+        db.update(Book)
+        .where(Book.id == book_id, Book.reserved == True, Book.lent_out == False,  # noqa: E712
+               _is_party(user_id))
+        .values(reserved=False, lender_id=None),
+        book_id, Book.id)
+    if row is not None:
+        return row
+    book = _load_book(book_id)
+    if not book.reserved:
+        raise LendingError(f"Cannot cancel reservation Book id: {book_id} Book wasn't reserved", 400)
+    if book.lent_out:
+        raise LendingError(f"Cannot cancel reservation Book id: {book_id} Book is lent out", 400)
+    raise LendingError(f"Failed to cancel book id {book_id} reservation", 401)
+
+
+def receive(book_id, user_id, today):
+    """
+    Mark a reserved book as handed over to the lender. User must be the book owner or lender.
+
+    Return date is today plus the owner's lending duration, computed in the same statement.
+    Return the (id, return_date) row.
+    """
+    owner_duration = db.select(User.duration).where(User.id == Book.owner_id).scalar_subquery()
+    row = _execute_returning(
+        db.update(Book)
+        .where(Book.id == book_id, Book.lent_out == False, Book.lender_id.is_not(None),  # noqa: E712
+               _is_party(user_id))
+        .values(lent_out=True, return_date=date_add_days(today, owner_duration)),
+        book_id, Book.id, Book.return_date)
+    if row is not None:
+        return row
+    book = _load_book(book_id)
+    if book.lent_out:
+        raise LendingError(f"Book id {book_id} is already lent out", 400)
+    if user_id not in (book.owner_id, book.lender_id):
+        raise LendingError(f"Unauthorized to receive book id {book_id}", 401)
+    raise LendingError(f"Book id {book_id} is not reserved", 400)
+
+
+def return_book(book_id, user_id):
+    """Return book to lending environment and reset its lending values. Return the (id, title) row."""
+    row = _execute_returning(
+        db.update(Book)
+        .where(Book.id == book_id, _is_party(user_id))
+        .values(return_date=None, reserved=False, lender_id=None, lent_out=False),
+        book_id, Book.id, Book.title)
+    if row is not None:
+        return row
+    _load_book(book_id)
+    raise LendingError(f"Unauthorized to return book id {book_id}", 401)
+
+
+def toggle_activity(book_id, user_id):
+    """Switch activity of the user's own book that isn't lent out. Return the (id, active) row."""
+    row = _execute_returning(
+        db.update(Book)
+        .where(Book.id == book_id, Book.owner_id == user_id, Book.lent_out == False)  # noqa: E712
+        .values(active=~Book.active),
+        book_id, Book.id, Book.active)
+    if row is not None:
+        return row
+    book = _load_book(book_id)
+    if book.owner_id != user_id:
+        raise LendingError(f"Current user id: {user_id} cannot change book id {book_id} activity toggle."
+                           f"Book owner id: {book.owner_id}", 401)
+    raise LendingError("Unable to switch book activity toggle.", 400)
+
+
+ACTIONS = ('reserve', 'cancel', 'receive', 'return', 'activity')
+
+
+def _apply(action, book_id, user_id, today):
+    """Run one transition. Return the extra response data of the updated book."""
+    if action == 'reserve':
+        return {"lenderId": reserve(book_id, user_id).lender_id}
+    if action == 'cancel':
+        cancel_reservation(book_id, user_id)
+        return {}
+    if action == 'receive':
+        return {"returnDate": receive(book_id, user_id, today).return_date.strftime("%d-%m-%Y")}
+    if action == 'return':
+        return_book(book_id, user_id)
+        return {}
+    return {"active": toggle_activity(book_id, user_id).active}
+
+
+def apply_batch(operations, user_id, today):
+    """
+    Apply (book_id, action) operations of user in order, in the current transaction.
+
+    Owners of all books are read with one query. Missing books and actions the user can never take on a book
+    are refused before running any update. Return a result dict per operation and the count of applied ones.
+    """
+    owners = dict(db.session.execute(
+        db.select(Book.id, Book.owner_id).where(Book.id.in_({book_id for book_id, _ in operations}))).all())
+    results = []
+    applied = 0
+    for book_id, action in operations:
+        result = {"bookId": book_id, "action": action}
+        try:
+            if book_id not in owners:
+                raise LendingError(f"Cannot find the book by id: {book_id}", 404)
+            if action == 'reserve' and owners[book_id] == user_id:
+                raise LendingError("Book owner cannot reserve own book", 400)
+            if action == 'activity' and owners[book_id] != user_id:
+                raise LendingError(f"Current user id: {user_id} cannot change book id {book_id} activity toggle."
+                                   f"Book owner id: {owners[book_id]}", 401)
+            result.update(_apply(action, book_id, user_id, today))
+        except LendingError as e:
+            result.update({"status": e.status, "message": e.message})
+        else:
+            result.update({"status": 200, "message": f"Book id {book_id} {action} succeeded"})
+            applied += 1
+        results.append(result)
+    return results, applied
@@ -0,0 +1,216 @@
+"""
+Request metrics in Prometheus text format.
+
+Every request records its latency, status and the number and duration of SQL statements it ran, counted with
+engine cursor events. Values live in this process, each gunicorn worker reports its own and the scraper sums them.
+Streamed response bodies finish after the request is recorded, their queries aren't counted.
+"""
+import bisect
+import threading
+import time
+from collections import defaultdict
+
+from flask import Response, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+
+from constants import METRICS_LATENCY_BUCKETS, METRICS_SQL_COUNT_BUCKETS
+from db.database import db
+from utilities.auth import user_cache
+from utilities.catalog_cache import catalog_cache
+from utilities.catalog_snapshot import get_snapshot
+from utilities.service import image_url_cache
+from logger.logger_config import logger, log_writer
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+UNMATCHED_ROUTE = 'unmatched'
+
+
+class Histogram:
+    """Bucket counts, sum and count of observed values. Not locked, the registry lock guards it."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            yield bound, total
+
+
+class RequestMetrics:
+    def __init__(self, latency_buckets=METRICS_LATENCY_BUCKETS, sql_count_buckets=METRICS_SQL_COUNT_BUCKETS):
+        self.lock = threading.Lock()
+        self.latency_buckets = latency_buckets
+        self.sql_count_buckets = sql_count_buckets
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = defaultdict(int)
+            self.in_flight = defaultdict(int)
+            self.latency = {}
+            self.sql_statements = {}
+            self.sql_seconds = defaultdict(float)
+
+    def started(self, route):
+        with self.lock:
+            self.in_flight[route] += 1
+
+    def finished(self, route):
+        with self.lock:
+            self.in_flight[route] -= 1
+
+    def observe(self, route, method, status, seconds, sql_statements, sql_seconds):
+        key = (route, method)
+        with self.lock:
+            self.requests[(route, method, status)] += 1
+            if key not in self.latency:
+                self.latency[key] = Histogram(self.latency_buckets)
+                self.sql_statements[key] = Histogram(self.sql_count_buckets)
+            self.latency[key].observe(seconds)
+            self.sql_statements[key].observe(sql_statements)
+            self.sql_seconds[key] += sql_seconds
+
+    def render(self):
+        """Return all metrics in Prometheus text exposition format."""
+        lines = []
+        with self.lock:
+            counter(lines, 'books_http_requests_total', 'Finished requests by route, method and status.',
+                    {labels(route=route, method=method, status=status): value
+                     for (route, method, status), value in sorted(self.requests.items())})
+            gauge(lines, 'books_http_requests_in_flight', 'Requests being handled by route.',
+                  {labels(route=route): value for route, value in sorted(self.in_flight.items())})
+            histogram(lines, 'books_http_request_duration_seconds', 'Request latency by route and method.',
+                      self.latency)
+            histogram(lines, 'books_http_request_sql_statements', 'SQL statements run per request.',
+                      self.sql_statements)
+            counter(lines, 'books_http_request_sql_seconds_total', 'Time spent running SQL statements.',
+                    {labels(route=route, method=method): value
+                     for (route, method), value in sorted(self.sql_seconds.items())})
+        cache_metrics(lines)
+        snapshot_metrics(lines)
+        return '\n'.join(lines) + '\n'
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def labels(**values):
+    return ','.join(f'{name}="{escape(value)}"' for name, value in values.items())
+
+
+def sample(name, label_text, value):
+    return f'{name}{{{label_text}}} {value}' if label_text else f'{name} {value}'
+
+
+def counter(lines, name, description, samples):
+    lines += [f'# HELP {name} {description}', f'# TYPE {name} counter']
+    lines += [sample(name, label_text, value) for label_text, value in samples.items()]
+
+
+def gauge(lines, name, description, samples):
+    lines += [f'# HELP {name} {description}', f'# TYPE {name} gauge']
+    lines += [sample(name, label_text, value) for label_text, value in samples.items()]
+
+
+def histogram(lines, name, description, histograms):
+    lines += [f'# HELP {name} {description}', f'# TYPE {name} histogram']
+    for (route, method), values in sorted(histograms.items()):
+        label_text = labels(route=route, method=method)
+        for bound, total in values.cumulative():
+            bound = '+Inf' if bound == float('inf') else bound
+            lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} {total}')
+        lines.append(f'{name}_sum{{{label_text}}} {values.sum}')
+        lines.append(f'{name}_count{{{label_text}}} {values.count}')
+
+
+def cache_metrics(lines):
+    caches = {'user': user_cache.stats(), 'image_url': image_url_cache.stats()}
+    gauge(lines, 'books_cache_entries', 'Entries held by in-process caches.',
+          {**{labels(cache=name): stats['size'] for name, stats in caches.items()},
+           labels(cache='catalog_response'): len(catalog_cache.entries)})
+    counter(lines, 'books_cache_hits_total', 'Cache lookups that found a fresh entry.',
+            {labels(cache=name): stats['hits'] for name, stats in caches.items()})
+    counter(lines, 'books_cache_misses_total', 'Cache lookups that found nothing or an expired entry.',
+            {labels(cache=name): stats['misses'] for name, stats in caches.items()})
+    counter(lines, 'books_log_records_dropped_total', 'Log records dropped because the log queue was full.',
+            {'': log_writer.dropped})
+
+
+def snapshot_metrics(lines):
+    snapshot = get_snapshot() if has_app_context() else None
+    if snapshot is None or not snapshot.loaded:
+        return
+    gauge(lines, 'books_catalog_snapshot_books', 'Books held by the catalog snapshot.',
+          {'': len(snapshot.data.records)})
+    gauge(lines, 'books_catalog_snapshot_version', 'Catalog version the snapshot has caught up with.',
+          {'': snapshot.version})
+    counter(lines, 'books_catalog_snapshot_rebuilds_total', 'Full reloads of the catalog snapshot.',
+            {'': snapshot.rebuilds})
+    counter(lines, 'books_catalog_snapshot_mismatches_total', 'Books found different from the database by checks.',
+            {'': snapshot.mismatches})
+
+
+request_metrics = RequestMetrics()
+
+
+def _route():
+    return request.url_rule.rule if request.url_rule is not None else UNMATCHED_ROUTE
+
+
+def _before_request():
+    g.metrics_started = time.perf_counter()
+    g.metrics_sql = [0, 0.0]
+    request_metrics.started(_route())
+
+
+def _after_request(response):
+    started = g.get('metrics_started')
+    if started is not None:
+        sql_statements, sql_seconds = g.metrics_sql
+        request_metrics.observe(_route(), request.method, response.status_code, time.perf_counter() - started,
+                                sql_statements, sql_seconds)
+    return response
+
+
+def _teardown_request(exception):
+    if g.pop('metrics_started', None) is not None:
+        request_metrics.finished(_route())
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['metrics_started'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'metrics_sql' in g:
+        g.metrics_sql[0] += 1
+        g.metrics_sql[1] += time.perf_counter() - conn.info['metrics_started']
+
+
+def metrics():
+    return Response(request_metrics.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+def init_metrics(app):
+    """Instrument every request and SQL statement of the app and serve the metrics on /metrics."""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    with app.app_context():
+        for engine in db.engines.values():
+            if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+                event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+                event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    app.add_url_rule('/metrics', 'metrics', metrics)
+    logger.debug("Request metrics enabled")
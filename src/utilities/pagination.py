@@ -0,0 +1,105 @@
+import base64
+import binascii
+
+from constants import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, MAX_ID
+from models.book import Book
+
+BOOLEAN_FILTERS = {
+    'active': Book.active,
+    'reserved': Book.reserved,
+    'lent_out': Book.lent_out,
+}
+ID_FILTERS = {
+    'owner_id': Book.owner_id,
+    'lender_id': Book.lender_id,
+}
+TRUE_VALUES = ('true', '1', 'yes')
+FALSE_VALUES = ('false', '0', 'no')
+
+
+def is_id(value):
+    """True if value is the decimal text of an id that fits a 64-bit database integer."""
+    return value.isascii() and value.isdigit() and int(value) <= MAX_ID
+
+
+def parse_id(name, value):
+    """Return the id filter value. Raise ValueError if it is not an id."""
+    if not is_id(value):
+        raise ValueError(f"Wrong {name} filter value: {value}")
+    return int(value)
+
+
+def encode_cursor(book_id):
+    """Return an opaque cursor pointing after the given book id."""
+    return base64.urlsafe_b64encode(f"b:{book_id}".encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return the book id encoded in cursor. Raise ValueError if the cursor is malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        prefix, _, book_id = base64.urlsafe_b64decode(padded.encode()).decode().partition(':')
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if prefix != 'b' or not is_id(book_id):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return int(book_id)
+
+
+def parse_limit(value):
+    """Return page size from query value. Raise ValueError if value is not in 1..MAX_PAGE_SIZE."""
+    if value is None:
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(value)
+    except (ValueError, TypeError):
+        raise ValueError(f"Wrong limit format: {value}")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"Limit must be between 1 and {MAX_PAGE_SIZE}, got {limit}")
+    return limit
+
+
+def parse_offset(value):
+    """Return result offset from query value. Raise ValueError if value is not a non-negative integer."""
+    if value is None:
+        return 0
+    if not is_id(value):
+        raise ValueError(f"Wrong offset format: {value}")
+    return int(value)
+
+
+def parse_book_filter_values(args):
+    """Return {column name: value} of the book filters in request query arguments. Raise ValueError on wrong values."""
+    values = {}
+    for name in BOOLEAN_FILTERS:
+        value = args.get(name)
+        if value is None:
+            continue
+        if value.lower() in TRUE_VALUES:
+            values[name] = True
+        elif value.lower() in FALSE_VALUES:
+            values[name] = False
+        else:
+            raise ValueError(f"Wrong {name} filter value: {value}")
+    for name in ID_FILTERS:
+        value = args.get(name)
+        if value is None:
+            continue
+        values[name] = parse_id(name, value)
+    return values
+
+
+def filter_clauses(values):
+    """Build SQLAlchemy where clauses from filter values returned by parse_book_filter_values()."""
+    columns = {**BOOLEAN_FILTERS, **ID_FILTERS}
+    return [columns[name] == value for name, value in values.items()]
+
+
+def parse_book_filters(args):
+    """Build SQLAlchemy where clauses from request query arguments."""
+    return filter_clauses(parse_book_filter_values(args))
+
+
+def is_paginated(args):
+    """Old clients send neither limit nor cursor and receive the plain book list."""
+    return 'limit' in args or 'cursor' in args
@@ -0,0 +1,73 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from constants import PASSWORD_HASH_METHOD, PASSWORD_SALT_LENGTH, PASSWORD_HASH_WORKERS
+
+
+class PasswordHasher:
+    """
+    Hash and check passwords on a bounded process pool, so key stretching doesn't hold the request worker.
+
+    At most two jobs per pool process are queued, further callers wait. With zero workers hashing runs inline.
+    """
+
+    def __init__(self):
+        self.executor = None
+        self.workers = None
+        self.slots = None
+        self.pid = None
+        self.lock = threading.Lock()
+
+    def _pool(self, workers):
+        with self.lock:
+            # A pool inherited through fork belongs to the parent process
+            if self.executor is None or self.workers != workers or self.pid != os.getpid():
+                if self.executor is not None and self.pid == os.getpid():
+                    self.executor.shutdown(wait=False)
+                self.executor = ProcessPoolExecutor(max_workers=workers,
+                                                    mp_context=multiprocessing.get_context('spawn'))
+                self.workers = workers
+                self.slots = threading.BoundedSemaphore(workers * 2)
+                self.pid = os.getpid()
+            return self.executor, self.slots
+
+    def run(self, workers, function, *args):
+        if not workers:
+            return function(*args)
+        executor, slots = self._pool(workers)
+        with slots:
+            return executor.submit(function, *args).result()
+
+    def shutdown(self):
+        with self.lock:
+            if self.executor is not None and self.pid == os.getpid():
+                self.executor.shutdown(wait=True)
+            self.executor = None
+
+
+password_hasher = PasswordHasher()
+
+
+def hash_method():
+    return current_app.config.get('PASSWORD_HASH_METHOD', PASSWORD_HASH_METHOD)
+
+
+def hash_password(password):
+    """Return a password hash with the configured method and cost."""
+    return password_hasher.run(current_app.config.get('PASSWORD_HASH_WORKERS', PASSWORD_HASH_WORKERS),
+                               generate_password_hash, password, hash_method(), PASSWORD_SALT_LENGTH)
+
+
+def verify_password(password_hash, password):
+    return password_hasher.run(current_app.config.get('PASSWORD_HASH_WORKERS', PASSWORD_HASH_WORKERS),
+                               check_password_hash, password_hash, password)
+
+
+def needs_rehash(password_hash):
+    """Return True if the hash was made with another method or cost than the configured one."""
+    return password_hash.split('$', 1)[0] != hash_method()
@@ -0,0 +1,123 @@
+"""
+Slow-query log and N+1 detection.
+
+Statements slower than SLOW_QUERY_THRESHOLD_MS are logged with their parameters and the endpoint that ran them.
+Each request counts its statements by shape, the SQL text with IN lists collapsed. A shape repeated
+N_PLUS_ONE_THRESHOLD times in one request is logged once as a likely N+1, usually a lazy relationship load in a loop.
+"""
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+
+from constants import SLOW_QUERY_THRESHOLD_MS, N_PLUS_ONE_THRESHOLD, QUERY_LOG_PARAMS_LENGTH
+from db.database import db
+from logger.logger_config import logger
+
+IN_LIST = re.compile(r'\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))*\s*\)')
+WHITESPACE = re.compile(r'\s+')
+PASSWORD_HASH = re.compile(r'^(pbkdf2|scrypt):')
+
+
+def statement_shape(statement):
+    """SQL text with whitespace normalized and placeholder lists of any length written as (?)."""
+    return IN_LIST.sub('(?)', WHITESPACE.sub(' ', statement).strip())
+
+
+def redact(value):
+    if isinstance(value, str) and PASSWORD_HASH.match(value):
+        return '<password hash>'
+    if isinstance(value, (list, tuple)):
+        return type(value)(redact(item) for item in value)
+    if isinstance(value, dict):
+        return {key: redact(item) for key, item in value.items()}
+    return value
+
+
+def format_parameters(parameters):
+    text = repr(redact(parameters))
+    if len(text) > QUERY_LOG_PARAMS_LENGTH:
+        text = f'{text[:QUERY_LOG_PARAMS_LENGTH]}...'
+    return text
+
+
+class QueryCounter:
+    """Statements run while counting, by shape."""
+
+    def __init__(self):
+        self.shapes = Counter()
+
+    @property
+    def total(self):
+        return sum(self.shapes.values())
+
+    def add(self, statement):
+        shape = statement_shape(statement)
+        self.shapes[shape] += 1
+        return shape, self.shapes[shape]
+
+    def repeated(self, threshold=N_PLUS_ONE_THRESHOLD):
+        return {shape: count for shape, count in self.shapes.items() if count >= threshold}
+
+
+def _endpoint():
+    if not has_request_context():
+        return 'background'
+    return request.endpoint or request.path
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['query_started'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info['query_started']) * 1000
+    config = current_app.config if has_app_context() else {}
+    if elapsed_ms >= config.get('SLOW_QUERY_THRESHOLD_MS', SLOW_QUERY_THRESHOLD_MS):
+        logger.warning("Slow query %.1f ms in %s: %s parameters %s",
+                       elapsed_ms, _endpoint(), statement, format_parameters(parameters))
+    if not has_request_context():
+        return
+    counter = g.get('query_counter')
+    if counter is None:
+        counter = g.query_counter = QueryCounter()
+    shape, count = counter.add(statement)
+    if count == config.get('N_PLUS_ONE_THRESHOLD', N_PLUS_ONE_THRESHOLD):
+        logger.warning("Possible N+1 in %s: query repeated %s times: %s", _endpoint(), count, shape)
+
+
+def _start_request():
+    g.query_counter = QueryCounter()
+
+
+def _end_request(exception):
+    g.pop('query_counter', None)
+
+
+def init_query_monitor(app):
+    """Watch every statement run by the engines of the app, counting shapes per request."""
+    app.before_request(_start_request)
+    app.teardown_request(_end_request)
+    with app.app_context():
+        for engine in db.engines.values():
+            if not event.contains(engine, 'after_cursor_execute', _after_cursor_execute):
+                event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+                event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+@contextmanager
+def count_queries(engine):
+    """Count the statements engine runs inside the block."""
+    counter = QueryCounter()
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        counter.add(statement)
+
+    event.listen(engine, 'after_cursor_execute', record)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'after_cursor_execute', record)
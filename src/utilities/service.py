@@ -1,17 +1,81 @@
+from urllib.parse import urlsplit
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from constants import (IMAGE_VALIDATION_WORKERS, IMAGE_VALIDATION_TIMEOUT, IMAGE_CACHE_SIZE, IMAGE_CACHE_VALID_TTL,
+                       IMAGE_CACHE_INVALID_TTL)
 from logger.logger_config import logger
+from utilities.cache import TTLCache
+
+# HEAD is answered with these by hosts that only serve GET
+HEAD_NOT_SUPPORTED = (403, 405, 501)
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# Validation results by normalized url, shared by every caller of validate_image_url
+image_url_cache = TTLCache(max_entries=IMAGE_CACHE_SIZE, ttl=IMAGE_CACHE_VALID_TTL)
+
+http_session = requests.Session()
+http_session.mount('http://', HTTPAdapter(pool_connections=IMAGE_VALIDATION_WORKERS,
+                                          pool_maxsize=IMAGE_VALIDATION_WORKERS))
+http_session.mount('https://', HTTPAdapter(pool_connections=IMAGE_VALIDATION_WORKERS,
+                                           pool_maxsize=IMAGE_VALIDATION_WORKERS))
+
+
+def is_well_formed_url(url):
+    """Return True if url is an absolute http(s) url with a host."""
+    if not isinstance(url, str):
+        return False
+    parts = urlsplit(url)
+    return parts.scheme in ('http', 'https') and bool(parts.hostname)
+
+
+def normalize_url(url):
+    """Lowercase scheme and host, drop the default port and the fragment."""
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    netloc = parts.hostname or ''
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{parts.port}"
+    if parts.username:
+        netloc = f"{parts.username}@{netloc}"
+    return parts._replace(scheme=scheme, netloc=netloc, fragment='').geturl()
+
+
+def is_image_response(response):
+    return response.status_code in (200, 206) and 'image' in response.headers.get('Content-Type', '')
+
+
+def validate_image_url(url, timeout=IMAGE_VALIDATION_TIMEOUT):
+    """
+    Check image url and return True if it exists and points to an image.
+
+    Results are cached by normalized url, failures for a shorter time than successes.
+    """
+    if not is_well_formed_url(url):
+        logger.info("Url %s validation failure", url)
+        return False
+    key = normalize_url(url)
+    valid = image_url_cache.get(key)
+    if valid is None:
+        valid = fetch_image_headers(url, timeout)
+        image_url_cache.set(key, valid, ttl=IMAGE_CACHE_VALID_TTL if valid else IMAGE_CACHE_INVALID_TTL)
+    if valid:
+        logger.info("Url %s validation was successful", url)
+    else:
+        logger.info("Url %s validation failure", url)
+    return valid
 
 
-def validate_image_url(url):
-    """Check image url and return True if it exists and image file is correct and undamaged."""
+def fetch_image_headers(url, timeout):
+    """Fetch only headers of url: HEAD first, a ranged GET of the first byte if the host doesn't support HEAD."""
     try:
-        response = requests.get(url)
-        if response.status_code == 200 and 'image' in response.headers['Content-Type']:
-            logger.info(f"Url {url} validation was successful")
-            return True
-        else:
-            logger.info(f"Url {url} validation failure")
-            return False
+        response = http_session.head(url, timeout=timeout, allow_redirects=True)
+        if response.status_code in HEAD_NOT_SUPPORTED or (response.ok and 'Content-Type' not in response.headers):
+            with http_session.get(url, timeout=timeout, stream=True, headers={'Range': 'bytes=0-0'}) as response:
+                return is_image_response(response)
+        return is_image_response(response)
     except requests.exceptions.RequestException as e:
-        print(f"Error checking URL: {e}")
+        logger.info("Error checking URL %s: %s", url, e)
         return False
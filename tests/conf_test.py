@@ -1,3 +1,6 @@
+import shutil
+from contextlib import contextmanager
+
 import pytest
 
 from auth_helper import logout
@@ -6,20 +9,110 @@ from configuration.config import TestConfig
 from db.database import db
 from models.book import Book
 from models.user import User
+from utilities.catalog_cache import catalog_cache
+from utilities.catalog_snapshot import CatalogSnapshot
+from utilities.auth import user_cache
+from utilities.image_validation import image_validator
+from utilities.query_monitor import count_queries
+from constants import N_PLUS_ONE_THRESHOLD
+from image_stub_server import start_image_server
 from werkzeug.security import generate_password_hash
 
 
 app = create_app(config_class=TestConfig)
+TEST_PASSWORD_HASH = generate_password_hash('123456', method=TestConfig.PASSWORD_HASH_METHOD, salt_length=8)
 
 
 @pytest.fixture
 def client():
     with app.app_context():
-        db.create_all()
+        db.create_all(bind_key=None)
+        catalog_cache.clear()
+        user_cache.clear()
         with app.test_client() as client:
             yield client
             logout(client)
-        db.drop_all()
+        image_validator.wait()
+        db.drop_all(bind_key=None)
+
+
+@pytest.fixture
+def file_db_app(tmp_path):
+    """Application on a SQLite file database, for tests that use several connections at once."""
+    config_class = type('FileTestConfig', (TestConfig,),
+                        {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'books.db'}"})
+    file_app = create_app(config_class=config_class)
+    user_cache.clear()
+    yield file_app
+    with file_app.app_context():
+        image_validator.wait()
+        db.drop_all(bind_key=None)
+        db.engine.dispose()
+
+
+@pytest.fixture
+def replica_app(tmp_path):
+    """
+    Application on a SQLite file database with a copy of the file as its read replica.
+
+    The copy is taken after adding Juhan with two books, later changes reach only the primary.
+    """
+    primary_uri = f"sqlite:///{tmp_path / 'books.db'}"
+    seed_app = create_app(config_class=type('PrimaryTestConfig', (TestConfig,),
+                                            {'SQLALCHEMY_DATABASE_URI': primary_uri}))
+    with seed_app.app_context():
+        owner = User(first_name='Juhan', last_name='Viik', email='juhan.viik@gmail.com', password=TEST_PASSWORD_HASH,
+                     duration=28)
+        db.session.add(owner)
+        db.session.flush()
+        db.session.add_all([Book(title=title, author='Robert Kiyosaki', image_url='https://example.com/a.jpg',
+                                 owner_id=owner.id) for title in ('Rich Dad Poor Dad', 'Before You Quit Your Job')])
+        db.session.commit()
+        # Closing the connections checkpoints the WAL into the file before it is copied
+        db.engine.dispose()
+    shutil.copy(tmp_path / 'books.db', tmp_path / 'replica.db')
+    config_class = type('ReplicaTestConfig', (TestConfig,), {
+        'SQLALCHEMY_DATABASE_URI': primary_uri, 'SQLALCHEMY_REPLICA_URI': f"sqlite:///{tmp_path / 'replica.db'}"})
+    replica_app = create_app(config_class=config_class)
+    user_cache.clear()
+    catalog_cache.clear()
+    yield replica_app
+    with replica_app.app_context():
+        image_validator.wait()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def catalog_snapshot(client):
+    """Serve catalog reads of the test app from a snapshot during the test. It loads on first read."""
+    with app.app_context():
+        app.extensions['catalog_snapshot'] = CatalogSnapshot(app, db.engine)
+    yield app.extensions['catalog_snapshot']
+    del app.extensions['catalog_snapshot']
+
+
+@pytest.fixture
+def query_budget():
+    """Fail the test when a block runs more than max_statements or repeats one query shape max_repeats times."""
+    @contextmanager
+    def budget(max_statements, max_repeats=N_PLUS_ONE_THRESHOLD, flask_app=app):
+        with flask_app.app_context():
+            engine = db.engine
+        with count_queries(engine) as counter:
+            yield counter
+        assert counter.total <= max_statements, f"{counter.total} statements over budget of {max_statements}"
+        repeated = counter.repeated(max_repeats)
+        assert not repeated, f"Queries repeated {max_repeats} or more times: {repeated}"
+    return budget
+
+
+@pytest.fixture
+def image_server():
+    server, base_url = start_image_server()
+    yield base_url
+    server.shutdown()
+    server.server_close()
 
 
 @pytest.fixture
@@ -29,7 +122,7 @@ def first_user_with_books(client):
                         first_name='Juhan',
                         last_name='Viik',
                         email='juhan.viik@gmail.com',
-                        password=generate_password_hash('123456', method='pbkdf2:sha256', salt_length=8),
+                        password=TEST_PASSWORD_HASH,
                         duration=28
                         )
         db.session.add(new_user)
@@ -57,7 +150,7 @@ def second_user_with_books(client):
         new_user = User(first_name='Priit',
                         last_name='pätt',
                         email='priit.patt@gmail.com',
-                        password=generate_password_hash('123456', method='pbkdf2:sha256', salt_length=8),
+                        password=TEST_PASSWORD_HASH,
                         duration=28
                         )
         db.session.add(new_user)
@@ -86,7 +179,7 @@ def third_user_with_books(client):
             first_name='Toomas',
             last_name='Kruus',
             email='toomas.kruus@gmail.com',
-            password=generate_password_hash('123456', method='pbkdf2:sha256', salt_length=8),
+            password=TEST_PASSWORD_HASH,
             duration=28
         )
         db.session.add(new_user)
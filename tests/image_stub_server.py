@@ -0,0 +1,53 @@
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class ImageStubHandler(BaseHTTPRequestHandler):
+    """
+    Answer like an image host.
+
+    /cover.png is an image, /get_only.jpg is an image that refuses HEAD, /page.html is not an image,
+    /slow.png answers after two seconds and everything else is missing.
+    """
+    requests_seen = []
+
+    def do_HEAD(self):
+        self.answer(send_body=False)
+
+    def do_GET(self):
+        self.answer(send_body=True)
+
+    def answer(self, send_body):
+        self.requests_seen.append((self.command, self.path, self.headers.get('Range')))
+        if self.path == '/slow.png':
+            time.sleep(2)
+        if self.path == '/get_only.jpg' and self.command == 'HEAD':
+            self.send_response(405)
+            self.end_headers()
+            return
+        content_types = {'/cover.png': 'image/png', '/get_only.jpg': 'image/jpeg', '/slow.png': 'image/png',
+                         '/page.html': 'text/html'}
+        if self.path not in content_types:
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = b'0123456789'
+        ranged = self.headers.get('Range') == 'bytes=0-0'
+        self.send_response(206 if ranged else 200)
+        self.send_header('Content-Type', content_types[self.path])
+        self.send_header('Content-Length', '1' if ranged else str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body[:1] if ranged else body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_image_server():
+    """Start stub image host in a daemon thread. Return the server and its base url."""
+    ImageStubHandler.requests_seen = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ImageStubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
@@ -88,6 +88,13 @@ def test_add_book_wrong_url(client, first_user_with_books):
     response = client.post(BookEndpoints.ADD_BOOK, json={
         'title': 'Rich Dad Poor Dad',
         'author': 'R. Kiyosaki',
-        'imageUrl': 'https://upload.wikimedia.org/wikipedia'
+        'imageUrl': 'upload.wikimedia.org/wikipedia'
     })
     assert response.status_code == 409
+
+
+def test_add_book_title_taken_by_other_author(client, first_user_with_books):
+    login(client, TestUserEmail.JUHAN)
+    response = client.post(BookEndpoints.ADD_BOOK, json=dict(rich_dad, author='Someone Else'))
+    assert response.status_code == 409
+    assert Book.query.count() == 2
@@ -0,0 +1,74 @@
+from sqlalchemy import event
+
+from db.database import db
+from models.book import Book
+from conf_test import client, first_user_with_books, second_user_with_books, third_user_with_books
+from auth_helper import login
+from test_constants import TestUserEmail, BookEndpoints
+
+
+def operations(*pairs):
+    return {'operations': [{'bookId': book_id, 'action': action} for book_id, action in pairs]}
+
+
+def test_batch_reserve_and_receive(client, first_user_with_books, second_user_with_books, third_user_with_books):
+    login(client, TestUserEmail.TOOMAS)
+    response = client.patch(BookEndpoints.BATCH_LENDING,
+                            json=operations((1, 'reserve'), (3, 'reserve'), (1, 'receive')))
+    assert response.status_code == 200
+    assert [result['status'] for result in response.json['data']] == [200, 200, 200]
+    assert response.json['data'][0]['lenderId'] == 3
+    assert response.json['data'][2]['returnDate']
+    book = db.get_or_404(Book, 1)
+    assert book.lent_out
+    assert db.get_or_404(Book, 3).reserved
+
+
+def test_batch_return_all(client, first_user_with_books, third_user_with_books):
+    login(client, TestUserEmail.TOOMAS)
+    client.patch(BookEndpoints.BATCH_LENDING, json=operations((1, 'reserve'), (2, 'reserve'), (1, 'receive')))
+    response = client.patch(BookEndpoints.BATCH_LENDING, json=operations((1, 'return'), (2, 'cancel')))
+    assert [result['status'] for result in response.json['data']] == [200, 200]
+    books = Book.query.all()
+    assert not any(book.reserved or book.lent_out or book.lender_id for book in books)
+
+
+def test_batch_reports_failures_per_item(client, first_user_with_books, second_user_with_books,
+                                         third_user_with_books):
+    login(client, TestUserEmail.PRIIT)
+    response = client.patch(BookEndpoints.BATCH_LENDING,
+                            json=operations((1, 'reserve'), (3, 'reserve'), (9, 'reserve'), (2, 'activity'),
+                                            (2, 'return'), (1, 'reserve'), (2, 'cancel')))
+    statuses = [result['status'] for result in response.json['data']]
+    assert statuses == [200, 400, 404, 401, 401, 400, 400]
+    assert db.get_or_404(Book, 1).lender_id == 2
+    assert db.get_or_404(Book, 2).active
+
+
+def test_batch_reads_books_once(client, first_user_with_books, third_user_with_books):
+    login(client, TestUserEmail.TOOMAS)
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        client.patch(BookEndpoints.BATCH_LENDING, json=operations((1, 'reserve'), (2, 'reserve')))
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert len([statement for statement in statements if statement.startswith('SELECT books')]) == 1
+    assert len([statement for statement in statements if statement.startswith('UPDATE books')]) == 2
+
+
+def test_batch_wrong_input(client, first_user_with_books):
+    login(client, TestUserEmail.JUHAN)
+    for payload in ({}, [], {'operations': [{'bookId': 1, 'action': 'steal'}]},
+                    {'operations': [{'bookId': '1', 'action': 'reserve'}]}):
+        response = client.patch(BookEndpoints.BATCH_LENDING, json=payload)
+        assert response.status_code == 400
+
+
+def test_batch_not_authenticated(client, first_user_with_books):
+    response = client.patch(BookEndpoints.BATCH_LENDING, json=operations((1, 'reserve')))
+    assert response.status_code == 401
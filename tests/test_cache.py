@@ -0,0 +1,49 @@
+from utilities.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_hit_and_miss_counters():
+    cache = TTLCache(max_entries=10, ttl=60)
+    assert cache.get('a') is None
+    cache.set('a', 1)
+    assert cache.get('a') == 1
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 1, "hitRate": 0.5}
+
+
+def test_cache_entries_expire():
+    clock = FakeClock()
+    cache = TTLCache(max_entries=10, ttl=60, clock=clock)
+    cache.set('long', True)
+    cache.set('short', False, ttl=5)
+    clock.now = 10
+    assert cache.get('short') is None
+    assert cache.get('long') is True
+    clock.now = 61
+    assert cache.get('long') is None
+    assert len(cache.entries) == 0
+
+
+def test_cache_evicts_least_recently_used():
+    cache = TTLCache(max_entries=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+
+
+def test_cache_invalidate():
+    cache = TTLCache(max_entries=2, ttl=60)
+    cache.set('a', 1)
+    cache.invalidate('a')
+    cache.invalidate('missing')
+    assert cache.get('a') is None
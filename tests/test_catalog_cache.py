@@ -0,0 +1,55 @@
+from db.database import db
+from models.book import Book
+from conf_test import client, first_user_with_books, second_user_with_books
+from auth_helper import login
+from test_constants import TestUserEmail, BookEndpoints
+from utilities.catalog_cache import current_catalog_version
+
+
+def test_fetch_books_sets_etag(client, first_user_with_books):
+    response = client.get(BookEndpoints.FETCH_BOOKS)
+    assert response.status_code == 200
+    assert response.headers['ETag']
+    assert len(response.json) == 2
+
+
+def test_fetch_books_not_modified(client, first_user_with_books):
+    etag = client.get(BookEndpoints.FETCH_BOOKS).headers['ETag']
+    response = client.get(BookEndpoints.FETCH_BOOKS, headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+
+
+def test_fetch_books_etag_depends_on_arguments(client, first_user_with_books):
+    etag = client.get(BookEndpoints.FETCH_BOOKS).headers['ETag']
+    response = client.get(f'{BookEndpoints.FETCH_BOOKS}?limit=1', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert len(response.json['data']) == 1
+
+
+def test_mutations_bump_catalog_version(client, first_user_with_books, second_user_with_books):
+    login(client, TestUserEmail.JUHAN)
+    etag = client.get(BookEndpoints.FETCH_BOOKS).headers['ETag']
+    version = current_catalog_version()
+    client.patch(f'{BookEndpoints.RESERVE_BOOK}/3')
+    assert current_catalog_version() == version + 1
+    response = client.get(BookEndpoints.FETCH_BOOKS, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.json[2]['reserved']
+    client.patch(f'{BookEndpoints.RECEIVE_BOOK}/3')
+    client.patch(f'{BookEndpoints.RETURN_BOOK}/3')
+    client.patch(f'{BookEndpoints.RESERVE_BOOK}/3')
+    client.patch(f'{BookEndpoints.CANCEL_RESERVATION}/3')
+    client.patch(f'{BookEndpoints.BOOK_ACTIVITY}/1')
+    client.delete(f'{BookEndpoints.REMOVE_BOOK}/2')
+    assert current_catalog_version() == version + 7
+
+
+def test_cached_response_is_reused_within_version(client, first_user_with_books):
+    first = client.get(BookEndpoints.FETCH_BOOKS)
+    book = db.get_or_404(Book, 1)
+    book.title = 'Changed without version bump'
+    db.session.commit()
+    second = client.get(BookEndpoints.FETCH_BOOKS)
+    assert second.data == first.data
@@ -0,0 +1,224 @@
+import time
+from datetime import date, timedelta
+
+from db.database import db
+from main import create_app, reset_after_fork
+from models.book import Book
+from models.catalog_version import CatalogChange
+from models.user import User
+from configuration.config import TestConfig
+from utilities.catalog_cache import bump_catalog_version, current_catalog_version, catalog_cache
+from utilities.catalog_snapshot import CatalogSnapshot, get_snapshot
+from utilities.query_monitor import count_queries
+from conf_test import (client, catalog_snapshot, file_db_app, first_user_with_books, second_user_with_books,
+                       third_user_with_books, TEST_PASSWORD_HASH)
+from auth_helper import login
+from test_constants import TestUserEmail, BookEndpoints, UserEndpoints, AppEndpoints
+from test_utils import reserve_and_receive_book
+
+READ_URLS = (
+    BookEndpoints.FETCH_BOOKS,
+    f'{BookEndpoints.FETCH_BOOKS}?reserved=true',
+    f'{BookEndpoints.FETCH_BOOKS}?owner_id=2&active=true',
+    f'{BookEndpoints.FETCH_BOOKS}?lender_id=3&limit=1',
+    f'{BookEndpoints.FETCH_BOOKS}?limit=2&cursor=Yjox',
+    BookEndpoints.OVERDUE,
+    f'{BookEndpoints.OVERDUE}?owner_id=1&limit=1',
+    UserEndpoints.MY_BOOKS,
+    f'{UserEndpoints.MY_BOOKS}/owned?limit=1',
+    f'{UserEndpoints.MY_BOOKS}/reserved',
+    f'{UserEndpoints.MY_BOOKS}/borrowed',
+)
+
+
+def read_all(client):
+    catalog_cache.clear()
+    return {url: client.get(url).json for url in READ_URLS}
+
+
+def lend_some_books(client):
+    login(client, TestUserEmail.TOOMAS)
+    reserve_and_receive_book(client, 1)
+    reserve_and_receive_book(client, 2)
+    client.patch(f'{BookEndpoints.RESERVE_BOOK}/3')
+    book = db.get_or_404(Book, 1)
+    book.return_date = date.today() - timedelta(days=2)
+    bump_catalog_version(book.id)
+    db.session.commit()
+
+
+def test_snapshot_serves_same_books_as_database(client, catalog_snapshot, first_user_with_books,
+                                                second_user_with_books, third_user_with_books):
+    lend_some_books(client)
+    from_snapshot = read_all(client)
+    assert catalog_snapshot.loaded
+    del client.application.extensions['catalog_snapshot']
+    try:
+        from_database = read_all(client)
+    finally:
+        client.application.extensions['catalog_snapshot'] = catalog_snapshot
+    assert from_snapshot == from_database
+    assert [book['id'] for book in from_snapshot[BookEndpoints.OVERDUE]] == [1]
+    assert from_snapshot[UserEndpoints.MY_BOOKS]['borrowed'][0]['ownerName'] == 'Juhan'
+
+
+def test_snapshot_reads_run_no_sql(client, catalog_snapshot, first_user_with_books, second_user_with_books,
+                                   third_user_with_books):
+    lend_some_books(client)
+    read_all(client)
+    with count_queries(db.engine) as counter:
+        read_all(client)
+    assert counter.total == 0
+
+
+def test_lending_updates_snapshot_incrementally(client, catalog_snapshot, first_user_with_books,
+                                                second_user_with_books, third_user_with_books):
+    login(client, TestUserEmail.TOOMAS)
+    client.get(BookEndpoints.FETCH_BOOKS)
+    reserve_and_receive_book(client, 1)
+    client.patch(f'{BookEndpoints.RESERVE_BOOK}/3')
+    client.patch(f'{BookEndpoints.CANCEL_RESERVATION}/3')
+    client.patch(f'{BookEndpoints.RETURN_BOOK}/1')
+    client.patch(f'{BookEndpoints.RESERVE_BOOK}/4')
+    login(client, TestUserEmail.JUHAN)
+    client.patch(f'{BookEndpoints.BOOK_ACTIVITY}/2')
+    client.delete(f'{BookEndpoints.REMOVE_BOOK}/1')
+    added = client.post(BookEndpoints.ADD_BOOK, json={'title': 'Atomic Habits', 'author': 'James Clear',
+                                                      'imageUrl': 'https://example.com/atomic.jpg'})
+    assert added.status_code == 201
+
+    assert catalog_snapshot.rebuilds == 1
+    assert catalog_snapshot.version == current_catalog_version()
+    assert catalog_snapshot.verify() == []
+    books = {book['id']: book for book in client.get(BookEndpoints.FETCH_BOOKS).json}
+    assert set(books) == {2, 3, 4, added.json['data']['id']}
+    assert not books[2]['isActive']
+    assert books[4]['lenderId'] == 3
+    assert not books[3]['reserved']
+    assert [book['id'] for book in client.get(f'{BookEndpoints.FETCH_BOOKS}?lender_id=3').json] == [4]
+
+
+def test_snapshot_catches_up_with_commits_of_other_workers(client, catalog_snapshot, first_user_with_books):
+    client.get(BookEndpoints.FETCH_BOOKS)
+    db.session.execute(db.update(Book).where(Book.id == 2).values(title='Cashflow Quadrant'))
+    bump_catalog_version(2)
+    # Another worker's commit does not reach this worker's commit hook
+    db.session.info.pop('catalog_changed')
+    db.session.commit()
+    assert client.get(BookEndpoints.FETCH_BOOKS).json[1]['title'] == 'Before You Quit Your Job'
+    assert catalog_snapshot.catch_up() == 1
+    assert client.get(BookEndpoints.FETCH_BOOKS).json[1]['title'] == 'Cashflow Quadrant'
+
+
+def test_change_without_book_ids_reloads_snapshot(client, catalog_snapshot, first_user_with_books):
+    client.get(BookEndpoints.FETCH_BOOKS)
+    db.session.execute(db.update(Book).values(active=False))
+    bump_catalog_version()
+    db.session.commit()
+    assert catalog_snapshot.rebuilds == 2
+    assert client.get(f'{BookEndpoints.FETCH_BOOKS}?active=false').json[0]['id'] == 1
+
+
+def test_old_changes_are_pruned(client, catalog_snapshot, first_user_with_books, monkeypatch):
+    monkeypatch.setattr('utilities.catalog_cache.CATALOG_CHANGES_PRUNE_EVERY', 2)
+    monkeypatch.setattr('utilities.catalog_cache.CATALOG_CHANGES_RETAIN', 1)
+    client.get(BookEndpoints.FETCH_BOOKS)
+    for _ in range(4):
+        bump_catalog_version(1)
+        db.session.commit()
+    assert db.session.execute(db.select(CatalogChange.version)).scalars().all() == [4]
+    assert catalog_snapshot.rebuilds == 1
+
+
+def test_rebuild_command_reloads_snapshot(client, catalog_snapshot, first_user_with_books):
+    client.get(BookEndpoints.FETCH_BOOKS)
+    db.session.execute(db.update(Book).where(Book.id == 1).values(title='Changed Without A Bump'))
+    db.session.commit()
+    result = client.application.test_cli_runner().invoke(args=['rebuild-catalog-snapshot'])
+    assert result.exit_code == 0
+    catalog_snapshot.catch_up()
+    assert catalog_snapshot.rebuilds == 2
+    assert client.get(BookEndpoints.FETCH_BOOKS).json[0]['title'] == 'Changed Without A Bump'
+
+
+def test_forked_worker_catches_up_with_preloaded_snapshot(file_db_app):
+    with file_db_app.app_context():
+        snapshot = file_db_app.extensions['catalog_snapshot'] = CatalogSnapshot(file_db_app, db.engine)
+        owner = User(first_name='Juhan', last_name='Viik', email='juhan.viik@gmail.com', password=TEST_PASSWORD_HASH)
+        db.session.add(owner)
+        db.session.flush()
+        db.session.add_all([Book(title=title, author='Robert Kiyosaki', image_url='https://example.com/a.jpg',
+                                 owner_id=owner.id) for title in ('Rich Dad Poor Dad', 'Cashflow Quadrant')])
+        db.session.commit()
+        # Loaded by the gunicorn master before fork
+        snapshot.rebuild()
+        db.session.execute(db.update(Book).where(Book.id == 2).values(active=False))
+        bump_catalog_version(2)
+        db.session.info.pop('catalog_changed')
+        db.session.commit()
+    reset_after_fork(file_db_app)
+    assert snapshot.rebuilds == 1
+    assert [record.id for record in snapshot.select({'active': True})[1]] == [1]
+
+
+def test_verify_finds_changes_missed_by_snapshot(client, catalog_snapshot, first_user_with_books):
+    client.get(BookEndpoints.FETCH_BOOKS)
+    db.session.execute(db.update(Book).where(Book.id == 2).values(lender_id=1, reserved=True))
+    db.session.execute(db.delete(Book).where(Book.id == 1))
+    db.session.commit()
+    assert catalog_snapshot.verify() == [1, 2]
+    assert catalog_snapshot.mismatches == 2
+    catalog_snapshot.rebuild()
+    assert catalog_snapshot.verify() == []
+    assert [book['id'] for book in client.get(f'{BookEndpoints.FETCH_BOOKS}?lender_id=1').json] == [2]
+
+
+def test_snapshot_metrics(client, catalog_snapshot, first_user_with_books):
+    client.get(BookEndpoints.FETCH_BOOKS)
+    text = client.get(AppEndpoints.METRICS).get_data(as_text=True)
+    assert 'books_catalog_snapshot_books 2' in text
+    assert 'books_catalog_snapshot_rebuilds_total 1' in text
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Condition was not met in time"
+        time.sleep(0.02)
+
+
+def test_background_snapshot_follows_other_workers(tmp_path):
+    database_uri = f"sqlite:///{tmp_path / 'books.db'}"
+    worker = create_app(config_class=type('SnapshotConfig', (TestConfig,), {
+        'SQLALCHEMY_DATABASE_URI': database_uri, 'CATALOG_SNAPSHOT': True, 'CATALOG_SNAPSHOT_SYNC': False,
+        'CATALOG_SNAPSHOT_REFRESH_INTERVAL': 0.02}))
+    other_worker = create_app(config_class=type('OtherConfig', (TestConfig,), {
+        'SQLALCHEMY_DATABASE_URI': database_uri, 'CATALOG_SNAPSHOT': True}))
+    snapshot = get_snapshot(worker)
+    try:
+        with other_worker.app_context():
+            owner = User(first_name='Juhan', last_name='Viik', email='juhan.viik@gmail.com',
+                         password=TEST_PASSWORD_HASH)
+            db.session.add(owner)
+            db.session.flush()
+            db.session.add(Book(title='Rich Dad Poor Dad', author='Robert Kiyosaki',
+                                image_url='https://example.com/a.jpg', owner_id=owner.id))
+            bump_catalog_version()
+            db.session.commit()
+        catalog_cache.clear()
+        with worker.test_client() as worker_client:
+            # Served from the database until the background load finishes
+            assert len(worker_client.get(BookEndpoints.FETCH_BOOKS).json) == 1
+            wait_for(lambda: snapshot.loaded)
+            with other_worker.app_context():
+                db.session.execute(db.update(Book).where(Book.id == 1).values(active=False))
+                bump_catalog_version(1)
+                db.session.commit()
+            wait_for(lambda: not worker_client.get(BookEndpoints.FETCH_BOOKS).json[0]['isActive'])
+        assert snapshot.rebuilds == 1
+    finally:
+        snapshot.stop()
+        get_snapshot(other_worker).stop()
+        for flask_app in (worker, other_worker):
+            with flask_app.app_context():
+                db.engine.dispose()
@@ -0,0 +1,101 @@
+import gzip
+
+import pytest
+
+from conf_test import app, client, first_user_with_books, second_user_with_books
+from auth_helper import login
+from test_constants import TestUserEmail, BookEndpoints, UserEndpoints
+from utilities import compression
+
+GZIP = {'Accept-Encoding': 'gzip, deflate'}
+
+
+@pytest.fixture
+def small_threshold():
+    app.config['COMPRESSION_MIN_SIZE'] = 100
+    yield
+    app.config.pop('COMPRESSION_MIN_SIZE')
+
+
+@pytest.fixture
+def compress_calls(monkeypatch):
+    calls = []
+    compress = compression.compress
+
+    def counting_compress(body, encoding):
+        calls.append(encoding)
+        return compress(body, encoding)
+
+    monkeypatch.setattr('api.controller.compress', counting_compress)
+    return calls
+
+
+def test_fetch_books_gzip(client, first_user_with_books, second_user_with_books, small_threshold):
+    plain = client.get(BookEndpoints.FETCH_BOOKS)
+    response = client.get(BookEndpoints.FETCH_BOOKS, headers=GZIP)
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.vary
+    assert gzip.decompress(response.get_data()) == plain.get_data()
+    assert len(response.get_data()) < len(plain.get_data())
+    assert response.get_etag()[0] == f"{plain.get_etag()[0]}-gzip"
+
+
+def test_compressed_body_cached_per_version(client, first_user_with_books, second_user_with_books,
+                                            small_threshold, compress_calls):
+    first = client.get(BookEndpoints.FETCH_BOOKS, headers=GZIP)
+    second = client.get(BookEndpoints.FETCH_BOOKS, headers=GZIP)
+    assert compress_calls == ['gzip']
+    assert second.get_data() == first.get_data()
+
+    login(client, TestUserEmail.PRIIT)
+    client.patch(f'{BookEndpoints.RESERVE_BOOK}/1')
+    changed = client.get(BookEndpoints.FETCH_BOOKS, headers=GZIP)
+    assert compress_calls == ['gzip', 'gzip']
+    assert changed.get_etag() != first.get_etag()
+
+
+def test_not_modified_with_compressed_etag(client, first_user_with_books, small_threshold):
+    etag = client.get(BookEndpoints.FETCH_BOOKS, headers=GZIP).get_etag()[0]
+    response = client.get(BookEndpoints.FETCH_BOOKS, headers={**GZIP, 'If-None-Match': f'"{etag}"'})
+    assert response.status_code == 304
+    assert response.get_etag()[0] == etag
+
+
+def test_not_modified_small_body_keeps_plain_etag(client, first_user_with_books):
+    response = client.get(BookEndpoints.FETCH_BOOKS, headers=GZIP)
+    assert 'Content-Encoding' not in response.headers
+    etag = response.get_etag()[0]
+    response = client.get(BookEndpoints.FETCH_BOOKS, headers={**GZIP, 'If-None-Match': f'"{etag}"'})
+    assert response.status_code == 304
+    assert response.get_etag()[0] == etag
+
+
+def test_small_and_refused_responses_are_not_compressed(client, first_user_with_books):
+    response = client.get(BookEndpoints.FETCH_BOOKS, headers=GZIP)
+    assert 'Content-Encoding' not in response.headers
+    app.config['COMPRESSION_MIN_SIZE'] = 100
+    try:
+        response = client.get(BookEndpoints.FETCH_BOOKS, headers={'Accept-Encoding': 'gzip;q=0, identity'})
+        assert 'Content-Encoding' not in response.headers
+    finally:
+        app.config.pop('COMPRESSION_MIN_SIZE')
+
+
+def test_other_endpoints_compressed_after_request(client, first_user_with_books, small_threshold):
+    login(client, TestUserEmail.JUHAN)
+    plain = client.get(UserEndpoints.MY_BOOKS)
+    response = client.get(UserEndpoints.MY_BOOKS, headers=GZIP)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.get_data()) == plain.get_data()
+    export = client.get(BookEndpoints.EXPORT, headers=GZIP)
+    assert 'Content-Encoding' not in export.headers
+
+
+def test_brotli_preferred_when_installed(client, monkeypatch):
+    monkeypatch.setattr(compression, 'brotli', object())
+    with app.test_request_context(headers={'Accept-Encoding': 'gzip, br'}):
+        assert compression.negotiate_encoding() == 'br'
+    monkeypatch.setattr(compression, 'brotli', None)
+    with app.test_request_context(headers={'Accept-Encoding': 'gzip, br'}):
+        assert compression.negotiate_encoding() == 'gzip'
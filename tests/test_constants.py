@@ -10,6 +10,12 @@ class Prefix:
 
 
 class BookEndpoints:
+    FETCH_BOOKS = f'{Prefix.BOOK}/fetch_books'
+    SEARCH = f'{Prefix.BOOK}/search'
+    EXPORT = f'{Prefix.BOOK}/export'
+    IMPORT_BOOKS = f'{Prefix.BOOK}/import_books'
+    BATCH_LENDING = f'{Prefix.BOOK}/batch_lending'
+    OVERDUE = f'{Prefix.BOOK}/overdue'
     ADD_BOOK = f'{Prefix.BOOK}/add_new_book'
     BOOK_ACTIVITY = f'{Prefix.BOOK}/activity'
     RESERVE_BOOK = f'{Prefix.BOOK}/reserve_book'
@@ -21,6 +27,12 @@ class BookEndpoints:
 
 class UserEndpoints:
     CHANGE_DURATION = f'{Prefix.USER}/change_duration'
+    CURRENT_USER = f'{Prefix.USER}/current_user'
+    MY_BOOKS = f'{Prefix.USER}/my_books'
     REGISTER = f'{Prefix.USER}/register'
     LOGIN = f'{Prefix.USER}/login'
     LOGOUT = f'{Prefix.USER}/logout'
+
+
+class AppEndpoints:
+    METRICS = '/metrics'
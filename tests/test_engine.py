@@ -0,0 +1,65 @@
+import sqlite3
+import time
+
+from sqlalchemy import text
+
+from db.database import db
+from db.engine import engine_options
+from models.book import Book
+from models.user import User
+from conf_test import app, client, file_db_app, TEST_PASSWORD_HASH
+from constants import DB_POOL_SIZE, SQLITE_BUSY_TIMEOUT_MS
+from test_constants import BookEndpoints
+
+
+def pragma(name):
+    return db.session.execute(text(f'PRAGMA {name}')).scalar()
+
+
+def test_file_database_uses_wal_and_pragmas(file_db_app):
+    with file_db_app.app_context():
+        assert pragma('journal_mode') == 'wal'
+        assert pragma('synchronous') == 1
+        assert pragma('busy_timeout') == SQLITE_BUSY_TIMEOUT_MS
+        assert pragma('cache_size') < 0
+        assert db.engine.pool.size() == DB_POOL_SIZE
+
+
+def test_memory_database_has_no_pool_sizing(client):
+    assert 'pool_size' not in engine_options(app)
+    assert pragma('busy_timeout') == SQLITE_BUSY_TIMEOUT_MS
+
+
+def test_explicit_engine_options_win(file_db_app):
+    file_db_app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'pool_size': 3}
+    file_db_app.config['DB_MAX_OVERFLOW'] = 7
+    options = engine_options(file_db_app)
+    assert options['pool_size'] == 3
+    assert options['max_overflow'] == 7
+
+
+def test_fetch_books_reads_during_lending_write(file_db_app):
+    with file_db_app.app_context():
+        owner = User(first_name='Juhan', last_name='Viik', email='juhan@example.com', password=TEST_PASSWORD_HASH)
+        db.session.add(owner)
+        db.session.commit()
+        db.session.add(Book(title='Rich Dad', author='Robert Kiyosaki', image_url='https://example.com/a.png',
+                            owner_id=owner.id))
+        db.session.commit()
+        database = db.engine.url.database
+
+    writer = sqlite3.connect(database, isolation_level=None)
+    try:
+        writer.execute('BEGIN EXCLUSIVE')
+        writer.execute('UPDATE books SET reserved = 1, lender_id = 1 WHERE id = 1')
+        started = time.perf_counter()
+        with file_db_app.test_client() as reader:
+            response = reader.get(BookEndpoints.FETCH_BOOKS)
+        elapsed = time.perf_counter() - started
+    finally:
+        writer.execute('ROLLBACK')
+        writer.close()
+
+    assert response.status_code == 200
+    assert response.get_json()[0]['reserved'] is False
+    assert elapsed < 1
@@ -0,0 +1,28 @@
+import json
+
+from conf_test import client, first_user_with_books, second_user_with_books
+from test_constants import BookEndpoints
+
+
+def test_export_streams_ndjson(client, first_user_with_books, second_user_with_books):
+    response = client.get(BookEndpoints.EXPORT)
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == 'application/x-ndjson'
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [row['id'] for row in rows] == [1, 2, 3, 4]
+    assert rows[0] == client.get(BookEndpoints.FETCH_BOOKS).json[0]
+
+
+def test_export_filters(client, first_user_with_books, second_user_with_books):
+    response = client.get(f'{BookEndpoints.EXPORT}?owner_id=2')
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [row['id'] for row in rows] == [3, 4]
+    response = client.get(f'{BookEndpoints.EXPORT}?active=perhaps')
+    assert response.status_code == 400
+
+
+def test_export_empty_catalog(client):
+    response = client.get(BookEndpoints.EXPORT)
+    assert response.status_code == 200
+    assert response.data == b''
@@ -0,0 +1,55 @@
+from conf_test import client, first_user_with_books, second_user_with_books, third_user_with_books
+from auth_helper import login
+from test_constants import TestUserEmail, BookEndpoints
+from utilities.pagination import encode_cursor
+
+
+def test_fetch_books_without_pagination_returns_list(client, first_user_with_books, second_user_with_books):
+    response = client.get(BookEndpoints.FETCH_BOOKS)
+    assert response.status_code == 200
+    assert isinstance(response.json, list)
+    assert [book['id'] for book in response.json] == [1, 2, 3, 4]
+
+
+def test_fetch_books_pages_follow_cursor(client, first_user_with_books, second_user_with_books):
+    response = client.get(f'{BookEndpoints.FETCH_BOOKS}?limit=3')
+    assert response.status_code == 200
+    assert [book['id'] for book in response.json['data']] == [1, 2, 3]
+    next_cursor = response.json['next']
+    assert next_cursor
+    response = client.get(f'{BookEndpoints.FETCH_BOOKS}?limit=3&cursor={next_cursor}')
+    assert [book['id'] for book in response.json['data']] == [4]
+    assert response.json['next'] is None
+
+
+def test_fetch_books_exact_page_has_no_next_cursor(client, first_user_with_books):
+    response = client.get(f'{BookEndpoints.FETCH_BOOKS}?limit=2')
+    assert len(response.json['data']) == 2
+    assert response.json['next'] is None
+
+
+def test_fetch_books_filters(client, first_user_with_books, second_user_with_books, third_user_with_books):
+    login(client, TestUserEmail.TOOMAS)
+    client.patch(f'{BookEndpoints.RESERVE_BOOK}/3')
+    response = client.get(f'{BookEndpoints.FETCH_BOOKS}?owner_id=2&limit=10')
+    assert [book['id'] for book in response.json['data']] == [3, 4]
+    response = client.get(f'{BookEndpoints.FETCH_BOOKS}?reserved=true')
+    assert [book['id'] for book in response.json] == [3]
+    response = client.get(f'{BookEndpoints.FETCH_BOOKS}?lender_id=3&lent_out=false&limit=10')
+    assert [book['id'] for book in response.json['data']] == [3]
+    response = client.get(f'{BookEndpoints.FETCH_BOOKS}?reserved=false&active=true&limit=10')
+    assert [book['id'] for book in response.json['data']] == [1, 2, 4]
+
+
+def test_fetch_books_wrong_arguments(client, first_user_with_books):
+    for query in ('limit=0', 'limit=a', 'limit=100000', 'cursor=abc', 'reserved=maybe', 'owner_id=x'):
+        response = client.get(f'{BookEndpoints.FETCH_BOOKS}?{query}')
+        assert response.status_code == 400
+
+
+def test_fetch_books_ids_out_of_range(client, first_user_with_books):
+    huge = '9' * 25
+    for query in (f'owner_id={huge}', f'lender_id={huge}', f'cursor={encode_cursor(huge)}', 'owner_id=²'):
+        response = client.get(f'{BookEndpoints.FETCH_BOOKS}?{query}')
+        assert response.status_code == 400
+    assert client.get(f'{BookEndpoints.FETCH_BOOKS}?owner_id={2 ** 63 - 1}').json == []
@@ -0,0 +1,151 @@
+import time
+
+from werkzeug.security import generate_password_hash
+
+from db.database import db
+from models.book import Book
+from models.user import User
+from conf_test import client, first_user_with_books, image_server, file_db_app
+from auth_helper import login
+from image_stub_server import ImageStubHandler
+from test_constants import TestUserEmail, BookEndpoints
+from utilities.image_validation import image_validator
+from utilities.service import validate_image_url, normalize_url, image_url_cache
+
+
+def new_book(image_url):
+    return {
+        'title': 'The Cashflow Quadrant',
+        'author': 'Robert Kiyosaki',
+        'imageUrl': image_url,
+        'description': 'Cashflow description'
+    }
+
+
+def add_user(app):
+    with app.app_context():
+        db.session.add(User(first_name='Juhan', last_name='Viik', email=TestUserEmail.JUHAN,
+                            password=generate_password_hash('123456', method='pbkdf2:sha256:1000')))
+        db.session.commit()
+
+
+def stored_status(app):
+    with app.app_context():
+        return db.session.execute(db.select(Book.validation_status)
+                                  .where(Book.title == 'The Cashflow Quadrant')).scalar()
+
+
+def test_add_book_is_pending_until_validated(file_db_app, image_server):
+    file_db_app.config['IMAGE_VALIDATION_SYNC'] = False
+    add_user(file_db_app)
+    with file_db_app.test_client() as client:
+        login(client, TestUserEmail.JUHAN)
+        response = client.post(BookEndpoints.ADD_BOOK, json=new_book(f'{image_server}/cover.png'))
+    assert response.status_code == 201
+    assert response.json['data']['validationStatus'] == 'pending_validation'
+    image_validator.wait()
+    assert stored_status(file_db_app) == 'valid'
+
+
+def test_add_book_does_not_wait_for_slow_image_host(file_db_app, image_server):
+    file_db_app.config['IMAGE_VALIDATION_SYNC'] = False
+    add_user(file_db_app)
+    with file_db_app.test_client() as client:
+        login(client, TestUserEmail.JUHAN)
+        started = time.monotonic()
+        response = client.post(BookEndpoints.ADD_BOOK, json=new_book(f'{image_server}/slow.png'))
+        assert time.monotonic() - started < 1
+    assert response.status_code == 201
+    assert stored_status(file_db_app) == 'pending_validation'
+    image_validator.wait()
+    assert stored_status(file_db_app) == 'invalid'
+
+
+def test_add_book_with_broken_image_is_marked_invalid(client, first_user_with_books, image_server):
+    login(client, TestUserEmail.JUHAN)
+    response = client.post(BookEndpoints.ADD_BOOK, json=new_book(f'{image_server}/missing.png'))
+    assert response.status_code == 201
+    book = db.session.execute(db.select(Book).where(Book.title == 'The Cashflow Quadrant')).scalar()
+    assert book.validation_status == 'invalid'
+
+
+def test_validate_image_url_uses_head(image_server):
+    assert validate_image_url(f'{image_server}/cover.png')
+    assert ImageStubHandler.requests_seen == [('HEAD', '/cover.png', None)]
+
+
+def test_validate_image_url_falls_back_to_ranged_get(image_server):
+    assert validate_image_url(f'{image_server}/get_only.jpg')
+    assert ImageStubHandler.requests_seen == [('HEAD', '/get_only.jpg', None), ('GET', '/get_only.jpg', 'bytes=0-0')]
+
+
+def test_validate_image_url_rejects_non_images(image_server):
+    assert not validate_image_url(f'{image_server}/page.html')
+    assert not validate_image_url(f'{image_server}/missing.png')
+    assert not validate_image_url(f'{image_server}/slow.png', timeout=0.5)
+    assert not validate_image_url('not a url')
+    assert not validate_image_url(None)
+
+
+def test_validation_results_are_cached_by_normalized_url(image_server):
+    hits = image_url_cache.hits
+    assert validate_image_url(f'{image_server}/cover.png')
+    assert validate_image_url(f"{image_server.replace('http', 'HTTP')}/cover.png#front")
+    assert not validate_image_url(f'{image_server}/missing.png')
+    assert not validate_image_url(f'{image_server}/missing.png')
+    assert ImageStubHandler.requests_seen == [('HEAD', '/cover.png', None), ('HEAD', '/missing.png', None)]
+    assert image_url_cache.hits == hits + 2
+
+
+def test_invalid_results_expire_sooner(image_server):
+    validate_image_url(f'{image_server}/cover.png')
+    validate_image_url(f'{image_server}/missing.png')
+    valid_expiry = image_url_cache.entries[normalize_url(f'{image_server}/cover.png')][1]
+    invalid_expiry = image_url_cache.entries[normalize_url(f'{image_server}/missing.png')][1]
+    assert invalid_expiry < valid_expiry
+
+
+def test_normalize_url():
+    assert normalize_url('HTTPS://Example.COM:443/Cover.png?size=2#x') == 'https://example.com/Cover.png?size=2'
+    assert normalize_url('http://example.com:8080/a') == 'http://example.com:8080/a'
+
+
+def add_pending_book(app, image_url):
+    """Pending book whose validation was queued by a worker that died."""
+    with app.app_context():
+        db.session.add(Book(title='The Cashflow Quadrant', author='Robert Kiyosaki', image_url=image_url,
+                            owner_id=1, validation_status='pending_validation'))
+        db.session.commit()
+
+
+def test_pending_books_are_validated_again(file_db_app, image_server):
+    add_user(file_db_app)
+    add_pending_book(file_db_app, f'{image_server}/cover.png')
+    assert image_validator.resubmit_pending(file_db_app) == 1
+    assert stored_status(file_db_app) == 'valid'
+    assert image_validator.resubmit_pending(file_db_app) == 0
+
+
+def test_books_queued_in_this_process_are_not_validated_again(file_db_app, image_server):
+    file_db_app.config['IMAGE_VALIDATION_SYNC'] = False
+    add_user(file_db_app)
+    with file_db_app.test_client() as client:
+        login(client, TestUserEmail.JUHAN)
+        client.post(BookEndpoints.ADD_BOOK, json=new_book(f'{image_server}/slow.png'))
+    assert image_validator.resubmit_pending(file_db_app) == 0
+    image_validator.wait()
+    assert stored_status(file_db_app) == 'invalid'
+
+
+def test_sweeper_validates_pending_books(file_db_app, image_server):
+    file_db_app.config.update(IMAGE_VALIDATION_SYNC=False, IMAGE_VALIDATION_SWEEP_INTERVAL=0.05)
+    add_user(file_db_app)
+    add_pending_book(file_db_app, f'{image_server}/cover.png')
+    image_validator.start_sweeper(file_db_app)
+    try:
+        deadline = time.monotonic() + 10
+        while stored_status(file_db_app) != 'valid':
+            assert time.monotonic() < deadline, "Pending book was not validated"
+            time.sleep(0.02)
+    finally:
+        image_validator.shutdown()
@@ -0,0 +1,90 @@
+import io
+
+from sqlalchemy import event
+
+from db.database import db
+from models.book import Book
+from conf_test import client, first_user_with_books
+from auth_helper import login
+from test_constants import TestUserEmail, BookEndpoints
+from utilities import book_import
+
+
+def book_row(number, **values):
+    row = {'title': f'imported book {number}', 'author': 'some author',
+           'imageUrl': f'http://127.0.0.1:9/{number}.png'}
+    row.update(values)
+    return row
+
+
+def test_import_json_reports_every_row(client, first_user_with_books):
+    login(client, TestUserEmail.JUHAN)
+    rows = [book_row(1), book_row(2, author='R K'), book_row(3, imageUrl='nope'),
+            book_row(4, title='rich dad poor dad'), book_row(5), book_row(6, title='IMPORTED BOOK 5')]
+    response = client.post(BookEndpoints.IMPORT_BOOKS, json=rows)
+    assert response.status_code == 200
+    statuses = [result['status'] for result in response.json['data']]
+    assert statuses == ['created', 'invalid', 'invalid', 'duplicate', 'created', 'duplicate']
+    assert response.json['data'][0]['id'] == 3
+    book = db.get_or_404(Book, 3)
+    assert book.title == 'Imported Book 1'
+    assert book.author == 'Some Author'
+    assert book.owner_id == 1
+    assert book.validation_status in ('pending_validation', 'invalid')
+    assert Book.query.count() == 4
+
+
+def test_import_csv_upload_and_body(client, first_user_with_books):
+    login(client, TestUserEmail.JUHAN)
+    csv_text = ('title,author,imageUrl,description\n'
+                'Csv Book,Csv Author,https://example.com/c.png,From csv\n')
+    response = client.post(BookEndpoints.IMPORT_BOOKS,
+                           data={'file': (io.BytesIO(csv_text.encode()), 'books.csv')},
+                           content_type='multipart/form-data')
+    assert [result['status'] for result in response.json['data']] == ['created']
+    response = client.post(BookEndpoints.IMPORT_BOOKS, data=csv_text.replace('Csv Book', 'Other Book'),
+                           content_type='text/csv')
+    assert [result['status'] for result in response.json['data']] == ['created']
+    assert db.get_or_404(Book, 3).description == 'From csv'
+
+
+def test_import_batches_use_set_based_queries(client, first_user_with_books, monkeypatch):
+    login(client, TestUserEmail.JUHAN)
+    monkeypatch.setattr(book_import, 'IMPORT_BATCH_SIZE', 50)
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if 'books' in statement:
+            statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.post(BookEndpoints.IMPORT_BOOKS, json=[book_row(number) for number in range(120)])
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert response.status_code == 200
+    assert Book.query.count() == 122
+    assert len([statement for statement in statements if statement.startswith('SELECT')]) == 6
+    assert len([statement for statement in statements if statement.startswith('INSERT')]) == 3
+
+
+def test_import_reports_non_text_values_as_invalid(client, first_user_with_books):
+    login(client, TestUserEmail.JUHAN)
+    response = client.post(BookEndpoints.IMPORT_BOOKS, json=[
+        {'title': 5, 'author': 'abcd', 'imageUrl': 'http://x.y/a.png'},
+        {'title': 'Numbers', 'author': ['a', 'b'], 'imageUrl': 'http://x.y/a.png'},
+        book_row(1)])
+    assert response.status_code == 200
+    assert [row['status'] for row in response.json['data']] == ['invalid', 'invalid', 'created']
+    assert response.json['data'][0]['message'] == "title must be text, got 5"
+
+
+def test_import_wrong_input(client, first_user_with_books):
+    login(client, TestUserEmail.JUHAN)
+    response = client.post(BookEndpoints.IMPORT_BOOKS, json={'title': 'not a list'})
+    assert response.status_code == 400
+
+
+def test_import_not_authenticated(client):
+    response = client.post(BookEndpoints.IMPORT_BOOKS, json=[book_row(1)])
+    assert response.status_code == 401
@@ -0,0 +1,53 @@
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+from flask.json.provider import DefaultJSONProvider
+
+from db.database import db
+from models.book import Book, BOOK_ROW_COLUMNS, book_row_dict
+from conf_test import app, client, first_user_with_books, second_user_with_books
+from utilities import json_provider
+from utilities.json_provider import FastJSONProvider
+
+PAYLOAD = {
+    'title': 'Rich Dad Poor Dad',
+    'returnDate': date(2024, 5, 17),
+    'updated': datetime(2024, 5, 17, 10, 30, tzinfo=timezone.utc),
+    'price': Decimal('9.90'),
+    'ids': [3, 1, 2],
+    'nested': {'b': None, 'a': True},
+}
+
+
+def test_output_matches_default_provider():
+    fast = FastJSONProvider(app).response(PAYLOAD).get_data()
+    default = DefaultJSONProvider(app).response(PAYLOAD).get_data()
+    assert fast == default
+    assert b'"returnDate":"Fri, 17 May 2024 00:00:00 GMT"' in fast
+
+
+def test_standard_library_fallback(monkeypatch):
+    monkeypatch.setattr(json_provider, 'orjson', None)
+    provider = FastJSONProvider(app)
+    assert provider.response(PAYLOAD).get_data() == DefaultJSONProvider(app).response(PAYLOAD).get_data()
+    assert provider.loads(provider.dumps(PAYLOAD))['ids'] == [3, 1, 2]
+
+
+def test_values_orjson_cannot_encode_fall_back():
+    provider = FastJSONProvider(app)
+    assert provider.dumps({'big': 2 ** 70}) == '{"big":1180591620717411303424}'
+    assert provider.dumps({1: 'a'}) == '{"1":"a"}'
+    assert provider.loads('{"name": "Priit pätt"}') == {'name': 'Priit pätt'}
+    assert provider.dumps([1], indent=4) == '[\n    1\n]'
+
+
+def test_book_row_dict_matches_to_dict(client, first_user_with_books, second_user_with_books):
+    today = date.today()
+    book = db.session.get(Book, 1)
+    book.reserved, book.lent_out, book.lender_id = True, True, 2
+    book.return_date = today - timedelta(days=1)
+    db.session.commit()
+    books = db.session.execute(db.select(Book).order_by(Book.id)).scalars().all()
+    rows = db.session.execute(db.select(*BOOK_ROW_COLUMNS).order_by(Book.id)).all()
+    assert [book_row_dict(row, today) for row in rows] == [book.to_dict(today) for book in books]
+    assert book_row_dict(rows[0], today)['overdue'] is True
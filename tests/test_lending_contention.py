@@ -0,0 +1,90 @@
+import threading
+
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+
+from db.database import db
+from models.book import Book
+from models.user import User
+from conf_test import client, first_user_with_books, third_user_with_books, file_db_app
+from auth_helper import login
+from test_constants import TestUserEmail, BookEndpoints
+
+CONTENDERS = 12
+
+
+def add_users_and_book(app):
+    with app.app_context():
+        users = [User(first_name=f'User{number}', last_name='Test', email=f'user{number}@example.com',
+                      password=generate_password_hash('123456', method='pbkdf2:sha256:1000'))
+                 for number in range(CONTENDERS + 1)]
+        db.session.add_all(users)
+        db.session.commit()
+        db.session.add(Book(title='Popular Book', author='Famous Author', image_url='https://example.com/a.png',
+                            owner_id=users[0].id))
+        db.session.commit()
+
+
+def test_concurrent_reservations_have_one_winner(file_db_app):
+    add_users_and_book(file_db_app)
+    start = threading.Barrier(CONTENDERS)
+    results = {}
+
+    def contend(number):
+        with file_db_app.test_client() as contender:
+            login(contender, f'user{number}@example.com')
+            start.wait()
+            response = contender.patch(f'{BookEndpoints.RESERVE_BOOK}/1')
+            results[number] = response.status_code
+
+    threads = [threading.Thread(target=contend, args=(number,)) for number in range(1, CONTENDERS + 1)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    winners = [number for number, status in results.items() if status == 200]
+    assert len(results) == CONTENDERS
+    assert len(winners) == 1
+    assert sorted(set(results.values())) == [200, 400]
+    with file_db_app.app_context():
+        book = db.session.get(Book, 1)
+        assert book.reserved
+        assert book.lender_id == winners[0] + 1
+
+
+def test_transition_is_single_statement(client, first_user_with_books, third_user_with_books):
+    login(client, TestUserEmail.TOOMAS)
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        client.patch(f'{BookEndpoints.RESERVE_BOOK}/1')
+        client.patch(f'{BookEndpoints.RECEIVE_BOOK}/1')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    book_statements = [statement for statement in statements if 'books' in statement]
+    assert len(book_statements) == 2
+    assert all(statement.startswith('UPDATE books') and 'RETURNING' in statement for statement in book_statements)
+
+
+def test_receive_requires_reservation(client, first_user_with_books):
+    login(client, TestUserEmail.JUHAN)
+    response = client.patch(f'{BookEndpoints.RECEIVE_BOOK}/1')
+    assert response.status_code == 400
+    book = db.get_or_404(Book, 1)
+    assert not book.lent_out
+
+
+def test_cannot_cancel_lent_out_book(client, first_user_with_books, third_user_with_books):
+    login(client, TestUserEmail.TOOMAS)
+    client.patch(f'{BookEndpoints.RESERVE_BOOK}/1')
+    client.patch(f'{BookEndpoints.RECEIVE_BOOK}/1')
+    response = client.patch(f'{BookEndpoints.CANCEL_RESERVATION}/1')
+    assert response.status_code == 400
+    book = db.get_or_404(Book, 1)
+    assert book.lent_out
+    assert book.lender_id == 2
@@ -0,0 +1,58 @@
+import logging
+import os
+
+from logging.handlers import RotatingFileHandler
+
+from logger.logger_config import logger, BoundedQueueHandler, LogWriter
+
+
+def make_logger(name, handler):
+    test_logger = logging.getLogger(name)
+    test_logger.propagate = False
+    test_logger.setLevel(logging.INFO)
+    test_logger.handlers = [handler]
+    return test_logger
+
+
+def test_app_logger_writes_through_queue():
+    assert [type(handler) for handler in logger.handlers] == [BoundedQueueHandler]
+
+
+def test_full_queue_drops_info_records():
+    writer = LogWriter([logging.NullHandler()], max_size=2)
+    writer.queue_handler.block_timeout = 0.01
+    test_logger = make_logger('test-drop', writer.queue_handler)
+    for number in range(5):
+        test_logger.info("record %s", number)
+    assert writer.dropped == 3
+    test_logger.warning("waits for space, then gives up")
+    assert writer.dropped == 4
+
+
+def test_listener_rotates_log_file(tmp_path):
+    location = tmp_path / 'app.log'
+    writer = LogWriter([RotatingFileHandler(location, maxBytes=200, backupCount=2)])
+    writer.start()
+    test_logger = make_logger('test-rotate', writer.queue_handler)
+    for number in range(50):
+        test_logger.info("Book id %s image validation finished: %s", number, 'valid')
+    writer.stop()
+    assert writer.dropped == 0
+    assert os.path.exists(f'{location}.1')
+    assert os.path.exists(f'{location}.2')
+    assert not os.path.exists(f'{location}.3')
+    assert os.path.getsize(location) <= 200
+
+
+def test_restart_after_fork_keeps_logging(tmp_path):
+    location = tmp_path / 'app.log'
+    writer = LogWriter([logging.FileHandler(location)])
+    writer.start()
+    inherited_queue, inherited_listener = writer.queue_handler.queue, writer.listener
+    writer.restart_after_fork()
+    inherited_listener.stop()
+    test_logger = make_logger('test-fork', writer.queue_handler)
+    test_logger.info("User id: %s logged in successfully", 1)
+    writer.stop()
+    assert writer.queue_handler.queue is not inherited_queue
+    assert location.read_text() == "User id: 1 logged in successfully\n"
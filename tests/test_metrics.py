@@ -0,0 +1,64 @@
+import re
+
+from conf_test import client, first_user_with_books
+from test_constants import AppEndpoints, BookEndpoints
+from utilities.metrics import request_metrics, labels
+
+FETCH_BOOKS_LABELS = 'route="/book_api/fetch_books",method="GET"'
+
+
+def metric_value(text, sample):
+    match = re.search(rf'^{re.escape(sample)} (\S+)$', text, re.MULTILINE)
+    assert match, f'{sample} missing'
+    return float(match.group(1))
+
+
+def scrape(client):
+    response = client.get(AppEndpoints.METRICS)
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    return response.get_data(as_text=True)
+
+
+def test_requests_are_counted_per_route(client, first_user_with_books):
+    request_metrics.reset()
+    client.get(BookEndpoints.FETCH_BOOKS)
+    client.get(BookEndpoints.FETCH_BOOKS)
+    client.get(f'{BookEndpoints.SEARCH}')
+    client.get('/no_such_page')
+    text = scrape(client)
+
+    assert metric_value(text, f'books_http_requests_total{{{FETCH_BOOKS_LABELS},status="200"}}') == 2
+    assert metric_value(text, 'books_http_requests_total{route="/book_api/search",method="GET",status="400"}') == 1
+    assert metric_value(text, 'books_http_requests_total{route="unmatched",method="GET",status="404"}') == 1
+    assert metric_value(text, 'books_http_requests_in_flight{route="/metrics"}') == 1
+    assert metric_value(text, 'books_http_requests_in_flight{route="/book_api/fetch_books"}') == 0
+    assert metric_value(text, f'books_http_request_duration_seconds_count{{{FETCH_BOOKS_LABELS}}}') == 2
+    assert metric_value(text, f'books_http_request_duration_seconds_bucket{{{FETCH_BOOKS_LABELS},le="+Inf"}}') == 2
+
+
+def test_sql_statements_are_counted_per_request(client, first_user_with_books):
+    request_metrics.reset()
+    client.get(BookEndpoints.FETCH_BOOKS)
+    text = scrape(client)
+
+    statements = metric_value(text, f'books_http_request_sql_statements_sum{{{FETCH_BOOKS_LABELS}}}')
+    assert 1 <= statements <= 5
+    assert metric_value(text, f'books_http_request_sql_statements_bucket{{{FETCH_BOOKS_LABELS},le="0"}}') == 0
+    assert metric_value(text, f'books_http_request_sql_seconds_total{{{FETCH_BOOKS_LABELS}}}') > 0
+
+    request_metrics.reset()
+    client.get(BookEndpoints.FETCH_BOOKS)
+    cached = metric_value(scrape(client), f'books_http_request_sql_statements_sum{{{FETCH_BOOKS_LABELS}}}')
+    assert cached < statements
+
+
+def test_cache_and_log_metrics(client):
+    text = scrape(client)
+    assert 'books_cache_entries{cache="user"}' in text
+    assert 'books_cache_hits_total{cache="image_url"}' in text
+    assert metric_value(text, 'books_log_records_dropped_total') == 0
+
+
+def test_label_values_are_escaped():
+    assert labels(route='a"b\\c\nd') == 'route="a\\"b\\\\c\\nd"'
@@ -0,0 +1,62 @@
+from sqlalchemy import create_engine, inspect, text
+
+from db.migrations import upgrade, MIGRATIONS
+from conf_test import client
+
+OLD_SCHEMA = (
+    """CREATE TABLE users (id INTEGER NOT NULL PRIMARY KEY, first_name VARCHAR(250) NOT NULL,
+        last_name VARCHAR(250) NOT NULL, email VARCHAR(250) NOT NULL UNIQUE, password VARCHAR(250) NOT NULL,
+        duration INTEGER NOT NULL)""",
+    """CREATE TABLE books (id INTEGER NOT NULL PRIMARY KEY, title VARCHAR(250) NOT NULL UNIQUE,
+        author VARCHAR(250) NOT NULL, description VARCHAR(4000), image_url VARCHAR(250) NOT NULL, return_date DATE,
+        reserved BOOLEAN NOT NULL, lent_out BOOLEAN NOT NULL, active BOOLEAN NOT NULL,
+        owner_id INTEGER NOT NULL REFERENCES users (id), lender_id INTEGER REFERENCES users (id))""",
+    "INSERT INTO users VALUES (1, 'Juhan', 'Viik', 'juhan.viik@gmail.com', 'x', 28)",
+    """INSERT INTO books VALUES (1, 'Rich Dad Poor Dad', 'Robert Kiyosaki', NULL, 'https://example.com/a.png',
+        NULL, 0, 0, 1, 1, NULL)""",
+)
+
+
+def old_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        for statement in OLD_SCHEMA:
+            connection.execute(text(statement))
+    return engine
+
+
+def test_upgrade_old_database(tmp_path):
+    engine = old_database(tmp_path)
+    assert upgrade(engine) == [version for version, _, _ in MIGRATIONS]
+    inspector = inspect(engine)
+    assert 'validation_status' in {column['name'] for column in inspector.get_columns('books')}
+    assert 'catalog_version' in inspector.get_table_names()
+    with engine.connect() as connection:
+        indexes = set(connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars())
+        assert {'ix_books_owner_id', 'ix_books_lender_id', 'ix_books_state', 'ix_books_lent_out_return_date',
+                'ix_books_lower_title_author'} <= indexes
+        assert connection.execute(text("SELECT validation_status FROM books")).scalar() == 'valid'
+        assert connection.execute(text("SELECT rowid FROM books_fts WHERE books_fts MATCH 'kiyosaki'")).all() == [(1,)]
+    engine.dispose()
+
+
+def test_upgrade_is_repeatable(tmp_path):
+    engine = old_database(tmp_path)
+    upgrade(engine)
+    assert upgrade(engine) == []
+    engine.dispose()
+
+
+def test_upgrade_fresh_database_only_records_versions(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'new.db'}")
+    assert upgrade(engine) == [version for version, _, _ in MIGRATIONS]
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT count(*) FROM books_fts")).scalar() == 0
+    engine.dispose()
+
+
+def test_migrate_command(client):
+    result = client.application.test_cli_runner().invoke(args=['migrate'])
+    assert result.exit_code == 0
+    result = client.application.test_cli_runner().invoke(args=['migrate'])
+    assert 'Database is up to date' in result.output
@@ -0,0 +1,79 @@
+from sqlalchemy import event
+
+from db.database import db
+from conf_test import client, first_user_with_books, second_user_with_books, third_user_with_books
+from auth_helper import login
+from test_constants import TestUserEmail, BookEndpoints, UserEndpoints
+from test_utils import reserve_and_receive_book
+
+
+def count_statements(client, url):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return response, statements
+
+
+def test_my_books(client, first_user_with_books, second_user_with_books, third_user_with_books):
+    login(client, TestUserEmail.TOOMAS)
+    reserve_and_receive_book(client, 1)
+    client.patch(f'{BookEndpoints.RESERVE_BOOK}/3')
+    response = client.get(UserEndpoints.MY_BOOKS)
+    assert response.status_code == 200
+    assert response.json['user']['id'] == 3
+    assert response.json['owned'] == []
+    assert [book['id'] for book in response.json['reserved']] == [3]
+    assert [book['id'] for book in response.json['borrowed']] == [1]
+    assert response.json['borrowed'][0]['ownerName'] == 'Juhan'
+    assert response.json['borrowed'][0]['lenderName'] == 'Toomas'
+
+
+def test_my_books_query_count_does_not_grow(client, first_user_with_books, second_user_with_books,
+                                            third_user_with_books):
+    login(client, TestUserEmail.TOOMAS)
+    for book_id in (1, 2, 3, 4):
+        client.patch(f'{BookEndpoints.RESERVE_BOOK}/{book_id}')
+    response, statements = count_statements(client, UserEndpoints.MY_BOOKS)
+    assert len(response.json['reserved']) == 4
+    # user, owned books with lenders, reserved books with owners
+    assert len([statement for statement in statements if 'FROM books' in statement]) == 2
+    assert len(statements) <= 4
+    login(client, TestUserEmail.JUHAN)
+    response, statements = count_statements(client, UserEndpoints.MY_BOOKS)
+    assert [book['lenderName'] for book in response.json['owned']] == ['Toomas', 'Toomas']
+    assert len([statement for statement in statements if 'FROM books' in statement]) == 2
+    assert len(statements) <= 4
+
+
+def test_my_books_pages(client, first_user_with_books, second_user_with_books, third_user_with_books):
+    login(client, TestUserEmail.TOOMAS)
+    for book_id in (1, 2, 3):
+        client.patch(f'{BookEndpoints.RESERVE_BOOK}/{book_id}')
+    reserve_and_receive_book(client, 4)
+    response, statements = count_statements(client, f'{UserEndpoints.MY_BOOKS}/reserved?limit=2')
+    assert [book['id'] for book in response.json['data']] == [1, 2]
+    assert {book['ownerName'] for book in response.json['data']} == {'Juhan'}
+    assert len([statement for statement in statements if 'FROM books' in statement]) == 1
+    assert len(statements) <= 2
+    response = client.get(f"{UserEndpoints.MY_BOOKS}/reserved?limit=2&cursor={response.json['next']}")
+    assert [book['id'] for book in response.json['data']] == [3]
+    assert response.json['next'] is None
+    response = client.get(f'{UserEndpoints.MY_BOOKS}/borrowed')
+    assert [book['id'] for book in response.json['data']] == [4]
+    login(client, TestUserEmail.PRIIT)
+    response = client.get(f'{UserEndpoints.MY_BOOKS}/owned')
+    assert [(book['id'], book['lenderName']) for book in response.json['data']] == [(3, 'Toomas'), (4, 'Toomas')]
+
+
+def test_my_books_wrong_input(client, first_user_with_books):
+    assert client.get(UserEndpoints.MY_BOOKS).status_code == 401
+    login(client, TestUserEmail.JUHAN)
+    assert client.get(f'{UserEndpoints.MY_BOOKS}/stolen').status_code == 404
+    assert client.get(f'{UserEndpoints.MY_BOOKS}/owned?limit=0').status_code == 400
@@ -0,0 +1,48 @@
+from datetime import date, timedelta
+
+from db.database import db
+from models.book import Book
+from conf_test import client, first_user_with_books, second_user_with_books, third_user_with_books
+from auth_helper import login
+from test_constants import TestUserEmail, BookEndpoints
+from test_utils import reserve_and_receive_book
+
+
+def lend_and_backdate(client, book_id, days_late):
+    reserve_and_receive_book(client, book_id)
+    book = db.get_or_404(Book, book_id)
+    book.return_date = date.today() - timedelta(days=days_late)
+    db.session.commit()
+
+
+def test_overdue_books(client, first_user_with_books, second_user_with_books, third_user_with_books):
+    login(client, TestUserEmail.TOOMAS)
+    lend_and_backdate(client, 1, 3)
+    lend_and_backdate(client, 3, 1)
+    reserve_and_receive_book(client, 4)
+    response = client.get(BookEndpoints.OVERDUE)
+    assert response.status_code == 200
+    assert [book['id'] for book in response.json] == [1, 3]
+    assert all(book['overdue'] for book in response.json)
+    response = client.get(f'{BookEndpoints.OVERDUE}?owner_id=2&limit=5')
+    assert [book['id'] for book in response.json['data']] == [3]
+
+
+def test_book_due_today_is_not_overdue(client, first_user_with_books, third_user_with_books):
+    login(client, TestUserEmail.TOOMAS)
+    lend_and_backdate(client, 1, 0)
+    assert client.get(BookEndpoints.OVERDUE).json == []
+    assert not client.get(BookEndpoints.FETCH_BOOKS).json[0]['overdue']
+
+
+def test_overdue_wrong_arguments(client, first_user_with_books):
+    assert client.get(f'{BookEndpoints.OVERDUE}?owner_id=x').status_code == 400
+    assert client.get(f'{BookEndpoints.OVERDUE}?owner_id={"9" * 25}').status_code == 400
+    assert client.get(f'{BookEndpoints.OVERDUE}?limit=0').status_code == 400
+
+
+def test_to_dict_uses_given_day(client, first_user_with_books):
+    book = db.get_or_404(Book, 1)
+    book.return_date = date(2024, 5, 10)
+    assert book.to_dict(date(2024, 5, 11))['overdue']
+    assert not book.to_dict(date(2024, 5, 10))['overdue']
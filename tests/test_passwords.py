@@ -0,0 +1,44 @@
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from db.database import db
+from models.user import User
+from conf_test import app, client, first_user_with_books
+from auth_helper import login
+from test_constants import TestUserEmail
+from utilities.passwords import hash_password, verify_password, needs_rehash, password_hasher
+
+
+def test_login_rehashes_outdated_hash(client, first_user_with_books):
+    user = db.get_or_404(User, 1)
+    user.password = generate_password_hash('123456', method='pbkdf2:sha256:2000')
+    db.session.commit()
+    response = login(client, TestUserEmail.JUHAN)
+    assert response.status_code == 202
+    user = db.get_or_404(User, 1)
+    assert user.password.startswith('pbkdf2:sha256:1000$')
+    assert check_password_hash(user.password, '123456')
+
+
+def test_login_keeps_current_hash(client, first_user_with_books):
+    password_hash = db.get_or_404(User, 1).password
+    login(client, TestUserEmail.JUHAN)
+    assert db.get_or_404(User, 1).password == password_hash
+
+
+def test_needs_rehash(client):
+    assert not needs_rehash(generate_password_hash('secret', method='pbkdf2:sha256:1000'))
+    assert needs_rehash(generate_password_hash('secret', method='pbkdf2:sha256:600'))
+    assert needs_rehash(generate_password_hash('secret', method='scrypt'))
+
+
+def test_hashing_on_process_pool(client):
+    app.config['PASSWORD_HASH_WORKERS'] = 2
+    try:
+        password_hash = hash_password('secret')
+        assert password_hash.startswith('pbkdf2:sha256:1000$')
+        assert verify_password(password_hash, 'secret')
+        assert not verify_password(password_hash, 'wrong')
+        assert password_hasher.executor is not None
+    finally:
+        app.config['PASSWORD_HASH_WORKERS'] = 0
+        password_hasher.shutdown()
@@ -0,0 +1,39 @@
+import os
+import runpy
+from concurrent.futures import ThreadPoolExecutor
+
+from db.database import db
+from conf_test import file_db_app
+from main import reset_after_fork
+from utilities.image_validation import image_validator
+
+GUNICORN_CONFIG = os.path.join(os.path.dirname(__file__), '..', 'src', 'gunicorn.conf.py')
+
+
+def test_gunicorn_config_from_environment(monkeypatch):
+    monkeypatch.setenv('GUNICORN_WORKERS', '3')
+    monkeypatch.setenv('GUNICORN_THREADS', '8')
+    monkeypatch.setenv('GUNICORN_MAX_REQUESTS', '500')
+    config = runpy.run_path(GUNICORN_CONFIG)
+    assert config['workers'] == 3
+    assert config['threads'] == 8
+    assert config['max_requests'] == 500
+    assert config['worker_class'] == 'gthread'
+    assert config['preload_app'] is True
+    assert callable(config['post_fork'])
+
+
+def test_reset_after_fork_drops_inherited_state(file_db_app):
+    with file_db_app.app_context():
+        with db.engine.connect():
+            pass
+        assert db.engine.pool.checkedin() == 1
+    inherited_executor = ThreadPoolExecutor(max_workers=1)
+    image_validator.executor = inherited_executor
+
+    reset_after_fork(file_db_app)
+
+    with file_db_app.app_context():
+        assert db.engine.pool.checkedin() == 0
+    assert image_validator.executor is None
+    inherited_executor.shutdown()
@@ -0,0 +1,79 @@
+import logging
+
+import pytest
+
+from db.database import db
+from models.book import Book
+from conf_test import (app, client, first_user_with_books, second_user_with_books, third_user_with_books,
+                       query_budget)
+from auth_helper import login
+from test_constants import TestUserEmail, BookEndpoints, UserEndpoints
+from utilities.query_monitor import statement_shape, format_parameters
+
+
+@pytest.fixture
+def monitor_config():
+    previous = dict(app.config)
+    yield app.config
+    app.config.clear()
+    app.config.update(previous)
+
+
+def test_statement_shape_collapses_in_lists():
+    assert (statement_shape('SELECT id FROM books\n WHERE id IN (?, ?, ?)')
+            == statement_shape('SELECT id FROM books WHERE id IN (?)')
+            == 'SELECT id FROM books WHERE id IN (?)')
+    assert statement_shape('SELECT id FROM books WHERE id = ?') != statement_shape('SELECT id FROM users WHERE id = ?')
+
+
+def test_parameters_are_redacted_and_truncated():
+    assert format_parameters(('pbkdf2:sha256:1000$salt$hash', 'juhan')) == "('<password hash>', 'juhan')"
+    assert len(format_parameters(('x' * 1000,))) == 503
+
+
+def test_slow_query_is_logged_with_endpoint(client, first_user_with_books, monitor_config, caplog):
+    monitor_config['SLOW_QUERY_THRESHOLD_MS'] = 0
+    with caplog.at_level(logging.WARNING, logger='books-backend'):
+        client.get(f'{BookEndpoints.SEARCH}?q=rich')
+    slow = [record.getMessage() for record in caplog.records if record.getMessage().startswith('Slow query')]
+    assert slow
+    assert all(' in book_api.search_books: ' in message for message in slow)
+    assert any("parameters" in message and 'rich' in message for message in slow)
+
+
+def test_lazy_loads_in_loop_are_flagged(client, first_user_with_books, second_user_with_books,
+                                        third_user_with_books, monitor_config, caplog):
+    monitor_config['N_PLUS_ONE_THRESHOLD'] = 2
+    db.session.remove()
+    with caplog.at_level(logging.WARNING, logger='books-backend'), app.test_request_context('/'):
+        books = db.session.execute(db.select(Book)).scalars().all()
+        owners = {book.book_owner.first_name for book in books}
+    assert owners == {'Juhan', 'Priit'}
+    flagged = [record.getMessage() for record in caplog.records if record.getMessage().startswith('Possible N+1')]
+    assert len(flagged) == 1
+    assert 'repeated 2 times' in flagged[0]
+    assert 'FROM users' in flagged[0]
+
+
+def test_query_budget_fails_over_budget(client, first_user_with_books, query_budget):
+    with pytest.raises(AssertionError, match='over budget'):
+        with query_budget(1):
+            db.session.execute(db.select(Book)).all()
+            db.session.execute(db.select(Book.id)).all()
+    with pytest.raises(AssertionError, match='repeated'):
+        with query_budget(10, max_repeats=2):
+            for book_id in (1, 2):
+                db.session.execute(db.select(Book).where(Book.id == book_id)).all()
+
+
+def test_endpoints_stay_within_budget(client, first_user_with_books, second_user_with_books,
+                                      third_user_with_books, query_budget):
+    with query_budget(4):
+        assert client.get(BookEndpoints.FETCH_BOOKS).status_code == 200
+    login(client, TestUserEmail.TOOMAS)
+    with query_budget(4):
+        assert client.patch(f'{BookEndpoints.RESERVE_BOOK}/1').status_code == 200
+    with query_budget(4):
+        assert client.patch(f'{BookEndpoints.RECEIVE_BOOK}/1').status_code == 202
+    with query_budget(4):
+        assert client.get(UserEndpoints.MY_BOOKS).status_code == 200
@@ -0,0 +1,83 @@
+import re
+
+from sqlalchemy import event
+
+from db.database import db
+from conf_test import client, first_user_with_books, second_user_with_books, third_user_with_books
+from auth_helper import logout
+from test_constants import TestUserEmail, BookEndpoints, UserEndpoints
+
+FULL_SCAN = re.compile(r'\bSCAN (?!.*\b(USING (COVERING )?INDEX|USING INTEGER PRIMARY KEY|VIRTUAL TABLE)\b)')
+
+
+class StatementRecorder:
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.split(None, 1)[0] in ('SELECT', 'UPDATE', 'DELETE', 'INSERT'):
+            self.statements.append((statement, parameters))
+
+
+def full_scans(statements):
+    """Return (statement, plan line) pairs of statements whose query plan reads a whole table."""
+    scans = []
+    connection = db.session.connection()
+    for statement, parameters in statements:
+        plan = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+        scans.extend((statement, row[-1]) for row in plan if FULL_SCAN.search(row[-1]))
+    return scans
+
+
+def record(client, calls):
+    recorder = StatementRecorder()
+    event.listen(db.engine, 'before_cursor_execute', recorder)
+    try:
+        for method, url, payload in calls:
+            response = getattr(client, method)(url, json=payload)
+            assert response.status_code < 500, url
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', recorder)
+    return recorder.statements
+
+
+def test_endpoint_queries_use_indexes(client, first_user_with_books, second_user_with_books,
+                                      third_user_with_books):
+    """Unpaginated fetch_books and export are left out, reading every row is their purpose."""
+    new_book = {'title': 'New Book', 'author': 'New Author', 'imageUrl': 'http://127.0.0.1:9/a.png'}
+    statements = record(client, [
+        ('post', UserEndpoints.LOGIN, {'email': TestUserEmail.TOOMAS, 'password': '123456'}),
+        ('get', f'{BookEndpoints.FETCH_BOOKS}?limit=2', None),
+        ('get', f'{BookEndpoints.FETCH_BOOKS}?limit=2&owner_id=2', None),
+        ('get', f'{BookEndpoints.FETCH_BOOKS}?limit=2&lender_id=3', None),
+        ('get', f'{BookEndpoints.SEARCH}?q=harry', None),
+        ('get', BookEndpoints.OVERDUE, None),
+        ('get', f'{BookEndpoints.OVERDUE}?owner_id=1', None),
+        ('patch', f'{BookEndpoints.RESERVE_BOOK}/1', None),
+        ('patch', f'{BookEndpoints.RESERVE_BOOK}/1', None),
+        ('patch', f'{BookEndpoints.RECEIVE_BOOK}/1', None),
+        ('patch', f'{BookEndpoints.RETURN_BOOK}/1', None),
+        ('patch', f'{BookEndpoints.RESERVE_BOOK}/2', None),
+        ('patch', f'{BookEndpoints.CANCEL_RESERVATION}/2', None),
+        ('patch', BookEndpoints.BATCH_LENDING, [{'bookId': 3, 'action': 'reserve'}]),
+        ('post', BookEndpoints.ADD_BOOK, new_book),
+        ('post', BookEndpoints.ADD_BOOK, new_book),
+        ('post', BookEndpoints.IMPORT_BOOKS, [dict(new_book, title='Imported Book')]),
+        ('patch', f'{BookEndpoints.BOOK_ACTIVITY}/5', None),
+        ('delete', f'{BookEndpoints.REMOVE_BOOK}/5', None),
+        ('patch', f'{UserEndpoints.CHANGE_DURATION}/3', {'duration': 14}),
+        ('get', UserEndpoints.CURRENT_USER, None),
+        ('get', UserEndpoints.MY_BOOKS, None),
+        ('get', f'{UserEndpoints.MY_BOOKS}/owned?limit=2', None),
+        ('get', f'{UserEndpoints.MY_BOOKS}/reserved?limit=2', None),
+        ('get', f'{UserEndpoints.MY_BOOKS}/borrowed?limit=2', None),
+    ])
+    logout(client)
+    assert len(statements) > 20
+    assert full_scans(statements) == []
+
+
+def test_full_scan_is_detected(client, first_user_with_books):
+    statements = [("SELECT books.id FROM books WHERE books.description = ?", ('First book',)),
+                  ("SELECT books.id FROM books WHERE books.owner_id = ?", (1,))]
+    assert [statement for statement, _ in full_scans(statements)] == [statements[0][0]]
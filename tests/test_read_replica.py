@@ -0,0 +1,73 @@
+import sqlite3
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from db.database import db
+from db.replica import REPLICA_BIND
+from models.book import Book
+from models.user import User
+from conf_test import replica_app
+from auth_helper import login
+from test_constants import TestUserEmail, BookEndpoints, UserEndpoints
+
+
+def change_primary(app):
+    """Change a book title and the user's duration on the primary only, outside of any request."""
+    with app.app_context():
+        db.session.execute(db.update(Book).where(Book.id == 1).values(title='Changed On Primary'))
+        db.session.execute(db.update(User).where(User.id == 1).values(duration=14))
+        db.session.commit()
+
+
+def replica_row(app, statement):
+    with app.app_context():
+        path = db.engines[REPLICA_BIND].url.database
+    with sqlite3.connect(path) as connection:
+        return connection.execute(statement).fetchone()
+
+
+def test_get_requests_read_from_replica(replica_app):
+    change_primary(replica_app)
+    with replica_app.test_client() as client:
+        assert client.get(BookEndpoints.FETCH_BOOKS).json[0]['title'] == 'Rich Dad Poor Dad'
+        login(client, TestUserEmail.JUHAN)
+        assert client.get(UserEndpoints.CURRENT_USER).json['duration'] == 28
+
+
+def test_writes_go_to_primary(replica_app):
+    with replica_app.test_client() as client:
+        login(client, TestUserEmail.JUHAN)
+        response = client.patch(f'{BookEndpoints.BOOK_ACTIVITY}/2')
+        assert response.status_code == 200
+    with replica_app.app_context():
+        assert db.session.get(Book, 2).active is False
+    assert replica_row(replica_app, 'SELECT active FROM books WHERE id = 2') == (1,)
+
+
+def test_request_reads_its_own_writes_from_primary(replica_app):
+    change_primary(replica_app)
+    with replica_app.test_request_context(BookEndpoints.FETCH_BOOKS, method='GET'):
+        title = db.select(Book.title).where(Book.id == 1)
+        assert db.session.execute(title).scalar() == 'Rich Dad Poor Dad'
+        db.session.execute(db.update(Book).where(Book.id == 2).values(author='Written In Request'))
+        assert db.session.execute(title).scalar() == 'Changed On Primary'
+        assert db.session.execute(db.select(Book.author).where(Book.id == 2)).scalar() == 'Written In Request'
+        db.session.rollback()
+
+
+def test_pending_changes_are_read_from_primary(replica_app):
+    change_primary(replica_app)
+    with replica_app.test_request_context(BookEndpoints.FETCH_BOOKS, method='GET'):
+        db.session.add(Book(title='New Book', author='Some Author', image_url='https://example.com/b.jpg',
+                            owner_id=1))
+        titles = db.session.execute(db.select(Book.title).order_by(Book.id)).scalars().all()
+        assert titles == ['Changed On Primary', 'Before You Quit Your Job', 'New Book']
+        db.session.rollback()
+
+
+def test_replica_is_read_only(replica_app):
+    with replica_app.app_context():
+        with pytest.raises(OperationalError, match='readonly'):
+            with db.engines[REPLICA_BIND].begin() as connection:
+                connection.execute(db.delete(Book))
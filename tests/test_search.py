@@ -0,0 +1,76 @@
+from db.database import db
+from models.book import Book
+from db.search import create_search_index, drop_search_index
+from conf_test import client, first_user_with_books, second_user_with_books
+from auth_helper import login
+from test_constants import TestUserEmail, BookEndpoints
+
+
+def test_search_by_title_prefix(client, first_user_with_books, second_user_with_books):
+    response = client.get(f'{BookEndpoints.SEARCH}?q=harry pot')
+    assert response.status_code == 200
+    assert sorted(book['id'] for book in response.json['data']) == [3, 4]
+    assert response.json['next'] is None
+
+
+def test_search_ranks_title_match_first(client, first_user_with_books, second_user_with_books):
+    book = db.get_or_404(Book, 4)
+    book.description = 'Not the first Rich Dad book'
+    db.session.commit()
+    response = client.get(f'{BookEndpoints.SEARCH}?q=rich dad')
+    assert [book['id'] for book in response.json['data']] == [1, 4]
+
+
+def test_search_by_author_and_description(client, first_user_with_books, second_user_with_books):
+    response = client.get(f'{BookEndpoints.SEARCH}?q=kiyosaki')
+    assert sorted(book['id'] for book in response.json['data']) == [1, 2]
+    response = client.get(f'{BookEndpoints.SEARCH}?q=first')
+    assert [book['id'] for book in response.json['data']] == [1]
+
+
+def test_search_index_follows_changes(client, first_user_with_books):
+    login(client, TestUserEmail.JUHAN)
+    client.delete(f'{BookEndpoints.REMOVE_BOOK}/1')
+    response = client.get(f'{BookEndpoints.SEARCH}?q=poor')
+    assert response.json['data'] == []
+    book = db.get_or_404(Book, 2)
+    book.title = 'Rich Dad Poor Dad'
+    db.session.commit()
+    response = client.get(f'{BookEndpoints.SEARCH}?q=poor')
+    assert [book['id'] for book in response.json['data']] == [2]
+    response = client.get(f'{BookEndpoints.SEARCH}?q=quit')
+    assert response.json['data'] == []
+
+
+def test_search_index_rebuilt_after_bulk_load(client, first_user_with_books):
+    drop_search_index(db.session.connection())
+    db.session.execute(Book.__table__.insert(), [{'title': 'Secret Garden', 'author': 'Frances Burnett',
+                                                  'image_url': 'https://example.com/a.png', 'owner_id': 1}])
+    create_search_index(db.session.connection())
+    db.session.commit()
+    response = client.get(f'{BookEndpoints.SEARCH}?q=garden')
+    assert [book['title'] for book in response.json['data']] == ['Secret Garden']
+    response = client.get(f'{BookEndpoints.SEARCH}?q=rich')
+    assert [book['id'] for book in response.json['data']] == [1]
+
+
+def test_search_pagination(client, first_user_with_books, second_user_with_books):
+    response = client.get(f'{BookEndpoints.SEARCH}?q=harry&limit=1')
+    assert len(response.json['data']) == 1
+    assert response.json['next'] == 1
+    second_page = client.get(f'{BookEndpoints.SEARCH}?q=harry&limit=1&offset=1')
+    assert len(second_page.json['data']) == 1
+    assert second_page.json['data'][0]['id'] != response.json['data'][0]['id']
+    assert second_page.json['next'] is None
+
+
+def test_search_special_characters_and_missing_query(client, first_user_with_books):
+    response = client.get(BookEndpoints.SEARCH, query_string={'q': '"rich" (dad* -'})
+    assert response.status_code == 200
+    assert [book['id'] for book in response.json['data']] == [1]
+    response = client.get(BookEndpoints.SEARCH)
+    assert response.status_code == 400
+    for query in ('!!!', '"', '  -* '):
+        response = client.get(BookEndpoints.SEARCH, query_string={'q': query})
+        assert response.status_code == 400
+        assert response.json['message'] == "Search query is missing"
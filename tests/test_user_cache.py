@@ -0,0 +1,92 @@
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+
+from constants import USER_CACHE_TTL
+from db.database import db
+from models.user import User
+from conf_test import file_db_app
+from auth_helper import login
+from test_constants import UserEndpoints
+from utilities.auth import user_cache
+
+
+def add_user(app):
+    with app.app_context():
+        db.session.add(User(first_name='Juhan', last_name='Viik', email='juhan.viik@gmail.com',
+                            password=generate_password_hash('123456', method='pbkdf2:sha256:1000')))
+        db.session.commit()
+
+
+def user_queries(app, client, url, method='get', **kwargs):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM users' in statement:
+            statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = getattr(client, method)(url, **kwargs)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    return response, statements
+
+
+def test_loader_reads_user_from_cache(file_db_app):
+    add_user(file_db_app)
+    with file_db_app.test_client() as client:
+        login(client, 'juhan.viik@gmail.com')
+        response, statements = user_queries(file_db_app, client, UserEndpoints.CURRENT_USER)
+        assert response.json['name'] == 'Juhan'
+        assert len(statements) == 1
+        hits = user_cache.hits
+        response, statements = user_queries(file_db_app, client, UserEndpoints.CURRENT_USER)
+        assert response.json == {"id": 1, "name": "Juhan", "email": "juhan.viik@gmail.com", "duration": 28}
+        assert statements == []
+        assert user_cache.hits == hits + 1
+
+
+def test_change_duration_invalidates_cached_user(file_db_app):
+    add_user(file_db_app)
+    with file_db_app.test_client() as client:
+        login(client, 'juhan.viik@gmail.com')
+        client.get(UserEndpoints.CURRENT_USER)
+        response = client.patch(f'{UserEndpoints.CHANGE_DURATION}/1', json={'duration': 14})
+        assert response.status_code == 200
+        assert user_cache.get(1) is None
+        response, statements = user_queries(file_db_app, client, UserEndpoints.CURRENT_USER)
+        assert response.json['duration'] == 14
+        assert len(statements) == 1
+
+
+def test_cached_user_is_attached_to_session(file_db_app):
+    add_user(file_db_app)
+    with file_db_app.test_client() as client:
+        login(client, 'juhan.viik@gmail.com')
+        client.get(UserEndpoints.CURRENT_USER)
+        response = client.get(UserEndpoints.MY_BOOKS)
+        assert response.status_code == 200
+        assert response.json['owned'] == []
+        response = client.patch(f'{UserEndpoints.CHANGE_DURATION}/1', json={'duration': 21})
+        assert response.status_code == 200
+    with file_db_app.app_context():
+        assert db.session.get(User, 1).duration == 21
+
+
+def test_other_worker_change_is_served_after_ttl(file_db_app, monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(user_cache, 'clock', lambda: now[0])
+    add_user(file_db_app)
+    with file_db_app.test_client() as client:
+        login(client, 'juhan.viik@gmail.com')
+        client.get(UserEndpoints.CURRENT_USER)
+        with file_db_app.app_context():
+            # Another worker's commit does not reach the cache of this one
+            with db.engine.begin() as connection:
+                connection.execute(db.update(User).where(User.id == 1).values(duration=14))
+        now[0] += USER_CACHE_TTL - 1
+        assert client.get(UserEndpoints.CURRENT_USER).json['duration'] == 28
+        now[0] += 1
+        assert client.get(UserEndpoints.CURRENT_USER).json['duration'] == 14